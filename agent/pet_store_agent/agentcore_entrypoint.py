@@ -8,7 +8,7 @@ logger.setLevel(logging.INFO)
 app = BedrockAgentCoreApp()
 
 @app.entrypoint
-def handler(payload):
+async def handler(payload):
     """AgentCore handler function with LaunchDarkly integration"""
     prompt = payload.get('prompt', 'A new user is asking about the price of Doggy Delights?')
 
@@ -26,7 +26,7 @@ def handler(payload):
 
     # Process with LaunchDarkly-enhanced agent
     agent = get_agent()
-    return agent.invoke(prompt, user_context)
+    return await agent.ainvoke(prompt, user_context)
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Approximate Nearest-Neighbour Index for Pet Store Agent
+IVF-flat index (spherical k-means coarse quantizer + inverted lists) in pure NumPy
+
+Query cost is roughly nlist + nprobe * (n / nlist) dot products instead of n, so with
+nlist ~ sqrt(n) latency grows with the square root of the catalog size.
+
+Usage:
+    python ann_index.py build ./storage                  # nlist = sqrt(n), persisted next to the store
+    python ann_index.py build ./storage --nlist 256
+    python ann_index.py eval ./storage --nprobe 4,8,16   # recall@k vs brute force
+"""
+
+from typing import List, Optional, Tuple
+from pathlib import Path
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows assigned per block during k-means, bounding the (rows x nlist) score matrix
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def ivf_path(storage_dir: Path, namespace: str = "default") -> Path:
+    return Path(storage_dir) / f"{namespace}__vector_store.ivf.npz"
+
+
+def default_nlist(count: int) -> int:
+    return max(1, int(math.sqrt(count)))
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest (highest cosine) centroid for every row"""
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], ASSIGN_BLOCK_ROWS):
+        block = np.asarray(matrix[start:start + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        labels[start:start + ASSIGN_BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def spherical_kmeans(matrix: np.ndarray, nlist: int, iterations: int = 10,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster normalized rows by cosine similarity; returns (centroids, labels)"""
+    rng = np.random.default_rng(seed)
+    count = matrix.shape[0]
+    nlist = min(nlist, count)
+    centroids = np.asarray(matrix[np.sort(rng.choice(count, nlist, replace=False))], dtype=np.float32)
+    labels = np.zeros(count, dtype=np.int32)
+
+    for _ in range(iterations):
+        labels = _assign(matrix, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, np.asarray(matrix, dtype=np.float32))
+        sizes = np.bincount(labels, minlength=nlist)
+        empty = np.flatnonzero(sizes == 0)
+        if empty.size:
+            # Re-seed empty clusters with random rows so every list stays useful
+            sums[empty] = matrix[rng.choice(count, empty.size, replace=False)]
+        centroids = _normalize(sums)
+
+    return centroids, _assign(matrix, centroids)
+
+
+class IVFFlatIndex:
+    """Inverted lists of matrix row numbers grouped by nearest centroid.
+
+    Only row numbers are stored; candidate rows are scored against the vector
+    store's own matrix (float32 or a quantized copy), so the index adds about
+    4 bytes per vector plus the centroids.
+    """
+
+    def __init__(self, centroids: np.ndarray, lists: List[np.ndarray]):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.lists = lists
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def count(self) -> int:
+        return sum(len(rows) for rows in self.lists)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None, iterations: int = 10,
+              seed: int = 0) -> "IVFFlatIndex":
+        started = time.perf_counter()
+        nlist = nlist or default_nlist(matrix.shape[0])
+        centroids, labels = spherical_kmeans(matrix, nlist, iterations=iterations, seed=seed)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(centroids.shape[0] + 1))
+        lists = [order[bounds[i]:bounds[i + 1]].astype(np.int64) for i in range(centroids.shape[0])]
+        logger.info(f"Built IVF index: {matrix.shape[0]} vectors, {centroids.shape[0]} lists "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return cls(centroids, lists)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> "IVFFlatIndex":
+        """Return a copy with new rows inserted into their nearest lists (centroids unchanged)"""
+        labels = _assign(vectors, self.centroids)
+        lists = list(self.lists)
+        for label in np.unique(labels):
+            lists[label] = np.concatenate([lists[label], np.asarray(rows)[labels == label].astype(np.int64)])
+        return IVFFlatIndex(self.centroids, lists)
+
+    def remap(self, old_to_new: np.ndarray) -> "IVFFlatIndex":
+        """Return a copy after rows were deleted/moved; old_to_new[row] is -1 for dropped rows"""
+        lists = []
+        for rows in self.lists:
+            mapped = old_to_new[rows]
+            lists.append(mapped[mapped >= 0].astype(np.int64))
+        return IVFFlatIndex(self.centroids, lists)
+
+    def probe(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted candidate rows from the nprobe lists whose centroids are closest to q"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ q
+        if nprobe < self.nlist:
+            nearest = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            nearest = np.arange(self.nlist)
+        candidates = [self.lists[i] for i in nearest if len(self.lists[i])]
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        # Sorted rows keep memory-mapped reads sequential
+        return np.sort(np.concatenate(candidates))
+
+    def save(self, path: Path, count: int) -> None:
+        """Persist as CSR (offsets + concatenated rows) with the matrix row count it was built for"""
+        offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(rows) for rows in self.lists])
+        rows = np.concatenate(self.lists) if self.lists else np.empty(0, dtype=np.int64)
+        tmp = Path(path).with_name(f".{Path(path).name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, offsets=offsets, rows=rows, count=np.int64(count))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, count: int) -> Optional["IVFFlatIndex"]:
+        """Load a persisted index, or None if it was built for a different matrix"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["count"]) != count:
+                logger.warning(f"Ignoring stale IVF index {path}: built for {int(data['count'])} "
+                               f"vectors, store has {count}")
+                return None
+            offsets = data["offsets"]
+            rows = data["rows"]
+            lists = [rows[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            return cls(data["centroids"], lists)
+
+
+def _recall(storage_dir: Path, nprobes: List[int], k: int, queries: int) -> None:
+    from binary_index import load_vector_store
+
+    store = load_vector_store(storage_dir)
+    state = store.state
+    if state.ivf_index() is None:
+        state.build_ivf_index()
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(store), min(queries, len(store)))
+    for nprobe in nprobes:
+        hits = 0
+        started = time.perf_counter()
+        for row in picks:
+            exact, _ = store.search(state.matrix[row], k)
+            approx, _ = store.search(state.matrix[row], k, index_type="ivf", nprobe=nprobe)
+            hits += len(set(exact) & set(approx))
+        elapsed = (time.perf_counter() - started) / max(len(picks), 1) * 1e6
+        print(f"nprobe={nprobe:<4} recall@{k}={hits / (len(picks) * k):.3f}  ({elapsed:.0f}us per query pair)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF-flat ANN index for the RAG vector store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="Build and persist the IVF index for a storage directory")
+    build_parser.add_argument("storage_dir")
+    build_parser.add_argument("--nlist", type=int, default=0, help="Number of lists (default sqrt(n))")
+    build_parser.add_argument("--iterations", type=int, default=10, help="k-means iterations")
+
+    eval_parser = sub.add_parser("eval", help="Measure recall@k against brute-force search")
+    eval_parser.add_argument("storage_dir")
+    eval_parser.add_argument("--nprobe", default="1,4,8,16")
+    eval_parser.add_argument("--k", type=int, default=5)
+    eval_parser.add_argument("--queries", type=int, default=200)
+
+    args = parser.parse_args()
+    storage_dir = Path(args.storage_dir)
+
+    if args.command == "build":
+        from binary_index import load_vector_store
+
+        store = load_vector_store(storage_dir)
+        if not len(store):
+            print(f"❌ No vectors found in {storage_dir}")
+            sys.exit(1)
+        index = IVFFlatIndex.build(store.state.matrix, nlist=args.nlist or None, iterations=args.iterations)
+        index.save(ivf_path(storage_dir), len(store))
+        print(f"✅ Wrote IVF index ({index.nlist} lists, {len(store)} vectors) to {ivf_path(storage_dir)}")
+    else:
+        _recall(storage_dir, [int(n) for n in args.nprobe.split(",")], args.k, args.queries)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,74 @@
+"""
+AWS Clients for Pet Store Agent
+Process-wide boto3 clients keyed by (service, region, profile) with pooled, keep-alive connections
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import logging
+import os
+import threading
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment (clients are shared process-wide, not per LaunchDarkly variation)
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_TCP_KEEPALIVE = os.environ.get("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+AWS_RETRY_MODE = os.environ.get("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "120"))
+
+
+def client_config() -> Config:
+    """Connection pool, keep-alive, timeouts and retry policy shared by every client"""
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=AWS_TCP_KEEPALIVE,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": AWS_RETRY_MODE},
+    )
+
+
+_sessions: Dict[Optional[str], boto3.Session] = {}
+_clients: Dict[Tuple[str, str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str, region_name: str, profile_name: Optional[str] = None):
+    """Return the shared client for (service, region, profile), creating it on first use.
+
+    ``profile_name`` defaults to AWS_PROFILE; without one the default credential
+    chain is used. boto3 clients are thread-safe, but sessions are not, so
+    creation happens under a lock.
+    """
+    profile_name = profile_name or os.environ.get("AWS_PROFILE") or None
+    key = (service_name, region_name, profile_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            session = _sessions.get(profile_name)
+            if session is None:
+                session = boto3.Session(profile_name=profile_name) if profile_name else boto3.Session()
+                _sessions[profile_name] = session
+            client = session.client(service_name, region_name=region_name, config=client_config())
+            _clients[key] = client
+            logger.info(f"Created {service_name} client for {region_name}"
+                        f"{f' (profile {profile_name})' if profile_name else ''}")
+    return client
+
+
+def client_stats() -> Dict[str, Any]:
+    return {
+        "clients": [f"{service}@{region}" + (f"/{profile}" if profile else "")
+                    for service, region, profile in list(_clients)],
+        "max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+        "retry_mode": AWS_RETRY_MODE,
+        "max_attempts": AWS_MAX_ATTEMPTS,
+    }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Retrieval Benchmark for Pet Store Agent
+Compares vector precisions (float32 / float16 / int8, with and without float32 re-scoring)
+on recall@k against exact search, memory footprint (quantized copy and float32 + copy)
+and query latency.
+
+Runs on the vectors in a storage directory and on synthetically scaled copies of them,
+so the LaunchDarkly custom parameters `llamaindex_vector_precision` and
+`llamaindex_rescore_candidates` can be chosen per deployment.
+
+Usage:
+    python benchmark_retrieval.py                              # ./storage, scales 1,100,1000
+    python benchmark_retrieval.py --scales 1,10000 --k 5       # Larger synthetic catalog
+    python benchmark_retrieval.py --rescore 10,50 --queries 500
+"""
+
+from typing import Dict, Any, List
+from pathlib import Path
+import argparse
+import time
+import numpy as np
+
+from binary_index import load_vector_store
+from vector_store import MatrixState, NumpyVectorStore, normalize_rows
+
+
+def scaled_state(base: np.ndarray, scale: int, noise: float, rng: np.random.Generator) -> MatrixState:
+    """Replicate the base vectors `scale` times with gaussian jitter to mimic a bigger catalog"""
+    if scale <= 1:
+        matrix = np.asarray(base, dtype=np.float32)
+    else:
+        copies = np.repeat(np.asarray(base, dtype=np.float32), scale, axis=0)
+        copies += rng.normal(0.0, noise, copies.shape).astype(np.float32)
+        matrix = normalize_rows(copies)
+    ids = tuple(f"node-{i}" for i in range(matrix.shape[0]))
+    return MatrixState(ids=ids, ref_doc_ids=(None,) * len(ids), metadata=({},) * len(ids), matrix=matrix)
+
+
+def make_queries(state: MatrixState, count: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """Queries near random stored vectors, like paraphrases of indexed content"""
+    picks = rng.integers(0, state.matrix.shape[0], count)
+    queries = state.matrix[picks] + rng.normal(0.0, noise * 2, (count, state.matrix.shape[1])).astype(np.float32)
+    return normalize_rows(queries)
+
+
+def run_config(store: NumpyVectorStore, queries: np.ndarray, k: int, truth: List[set],
+               precision: str, rescore: int) -> Dict[str, Any]:
+    state = store.state
+    # The float32 matrix stays loaded next to any quantized copy (it is needed for re-scoring)
+    float32_bytes = state.matrix.nbytes
+    quantized_bytes = state.quantized_matrix(precision).nbytes if precision != "float32" else 0
+
+    latencies = []
+    recall = 0.0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        ids, _ = store.search(query, k, precision=precision, rescore_candidates=rescore)
+        latencies.append(time.perf_counter() - started)
+        recall += len(expected.intersection(ids)) / max(len(expected), 1)
+
+    latencies_us = np.asarray(latencies) * 1e6
+    return {
+        "config": precision if not rescore else f"{precision}+rescore{rescore}",
+        "recall": recall / len(queries),
+        "quantized_mb": quantized_bytes / (1024 * 1024),
+        "memory_mb": (float32_bytes + quantized_bytes) / (1024 * 1024),
+        "p50_us": float(np.percentile(latencies_us, 50)),
+        "p95_us": float(np.percentile(latencies_us, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector search")
+    parser.add_argument("--storage", default=str(Path(__file__).parent / "storage"), help="Storage directory")
+    parser.add_argument("--scales", default="1,100,1000", help="Comma-separated catalog multipliers")
+    parser.add_argument("--k", type=int, default=5, help="Top-k (llamaindex_similarity_top_k)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per configuration")
+    parser.add_argument("--rescore", default="20", help="Comma-separated rescore_candidates values to try")
+    parser.add_argument("--noise", type=float, default=0.02, help="Jitter for synthetic copies")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base = load_vector_store(Path(args.storage)).state.matrix
+    rescores = [int(r) for r in args.rescore.split(",") if r.strip()]
+    configs = [("float32", 0)]
+    for precision in ("float16", "int8"):
+        configs.append((precision, 0))
+        configs.extend((precision, r) for r in rescores)
+
+    print(f"Base index: {base.shape[0]} vectors x {base.shape[1]} dims from {args.storage}\n")
+    for scale in (int(s) for s in args.scales.split(",")):
+        store = NumpyVectorStore(state=scaled_state(base, scale, args.noise, rng))
+        queries = make_queries(store.state, args.queries, args.noise, rng)
+        truth = [set(store.search(q, args.k)[0]) for q in queries]
+
+        print(f"=== {len(store)} vectors (scale x{scale}), recall@{args.k} vs exact float32 ===")
+        print(f"{'config':<22}{'recall':>8}{'quantized MB':>14}{'resident MB':>13}{'p50 us':>10}{'p95 us':>10}")
+        for precision, rescore in configs:
+            row = run_config(store, queries, args.k, truth, precision, rescore)
+            print(f"{row['config']:<22}{row['recall']:>8.3f}{row['quantized_mb']:>14.2f}{row['memory_mb']:>13.2f}"
+                  f"{row['p50_us']:>10.1f}{row['p95_us']:>10.1f}")
+        print()
+    print("resident MB = float32 matrix + quantized copy, as for a store parsed from JSON. The binary index\n"
+          "persists the quantized copy too, so both blocks are memory-mapped and shared through the page cache;\n"
+          "queries then touch the quantized block, and the float32 block only for re-scoring.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Binary Index Format for Pet Store Agent
+Memory-mapped embedding block plus a compact id/metadata file, with a converter from the JSON store
+
+Layout inside a storage directory (next to the LlamaIndex JSON files):
+    default__vector_store.npy        float32 (n, dim) matrix, rows L2-normalized
+    default__vector_store.float16.npy / .int8.npy / .int8_scales.npy
+                                     quantized copies of the same rows (int8 with one scale per row)
+    default__vector_store.meta.json  node ids, ref doc ids and de-duplicated metadata
+    docstore.kv.bin / .kv.json       node texts for the memory-mapped docstore (see shared_docstore.py)
+
+Usage:
+    python binary_index.py convert ./storage            # Convert default__vector_store.json
+    python binary_index.py convert ./storage --verify   # Convert and compare top-k with the JSON store
+    python binary_index.py info ./storage               # Show what the loader would use
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import argparse
+import json
+import logging
+import os
+import sys
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Lower-precision copies written next to the float32 block for `llamaindex_vector_precision`
+QUANTIZED_PRECISIONS = ("float16", "int8")
+
+
+def json_path(storage_dir: Path, namespace: str = "default") -> Path:
+    return Path(storage_dir) / f"{namespace}__vector_store.json"
+
+
+def vectors_path(storage_dir: Path, namespace: str = "default") -> Path:
+    return Path(storage_dir) / f"{namespace}__vector_store.npy"
+
+
+def meta_path(storage_dir: Path, namespace: str = "default") -> Path:
+    return Path(storage_dir) / f"{namespace}__vector_store.meta.json"
+
+
+def quantized_path(storage_dir: Path, precision: str, namespace: str = "default") -> Path:
+    return Path(storage_dir) / f"{namespace}__vector_store.{precision}.npy"
+
+
+def scales_path(storage_dir: Path, namespace: str = "default") -> Path:
+    return Path(storage_dir) / f"{namespace}__vector_store.int8_scales.npy"
+
+
+def has_binary_index(storage_dir: Path, namespace: str = "default") -> bool:
+    """True when a binary index exists and is at least as new as the JSON store"""
+    vectors, meta = vectors_path(storage_dir, namespace), meta_path(storage_dir, namespace)
+    if not (vectors.exists() and meta.exists()):
+        return False
+    source = json_path(storage_dir, namespace)
+    if source.exists() and source.stat().st_mtime_ns > min(vectors.stat().st_mtime_ns, meta.stat().st_mtime_ns):
+        logger.warning(f"Binary index in {storage_dir} is older than {source.name}; ignoring it")
+        return False
+    return True
+
+
+def _atomic_write(path: Path, write) -> None:
+    """Write via a temp file and rename so a hot-reloading reader never sees a partial file"""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def write_binary_index(storage_dir: Path, ids: List[str], ref_doc_ids: List[Optional[str]],
+                       metadata: List[Dict[str, Any]], matrix: np.ndarray,
+                       namespace: str = "default") -> None:
+    """Persist normalized vectors and their ids/metadata in the binary layout"""
+    from vector_store import QuantizedMatrix, normalize_rows
+
+    storage_dir = Path(storage_dir)
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(ids), -1 if len(ids) else 0)
+    matrix = normalize_rows(matrix)
+
+    # Most nodes share a handful of metadata dicts (one per source file/page), so store each once
+    table: List[Dict[str, Any]] = []
+    positions: Dict[str, int] = {}
+    index: List[int] = []
+    for meta in metadata:
+        key = json.dumps(meta or {}, sort_keys=True)
+        if key not in positions:
+            positions[key] = len(table)
+            table.append(meta or {})
+        index.append(positions[key])
+
+    header = {
+        "version": FORMAT_VERSION,
+        "count": len(ids),
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "dtype": "float32",
+        "ids": list(ids),
+        "ref_doc_ids": list(ref_doc_ids),
+        "metadata_table": table,
+        "metadata_index": index,
+        "quantized": list(QUANTIZED_PRECISIONS),
+    }
+
+    # Vectors first: the metadata file is what marks the set as complete
+    _atomic_write(vectors_path(storage_dir, namespace), lambda f: np.save(f, matrix, allow_pickle=False))
+    for precision in QUANTIZED_PRECISIONS:
+        quantized = QuantizedMatrix(matrix, precision)
+        _atomic_write(quantized_path(storage_dir, precision, namespace),
+                      lambda f: np.save(f, quantized.data, allow_pickle=False))
+        if quantized.scales is not None:
+            _atomic_write(scales_path(storage_dir, namespace),
+                          lambda f: np.save(f, quantized.scales, allow_pickle=False))
+    _atomic_write(
+        meta_path(storage_dir, namespace),
+        lambda f: f.write(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+    )
+
+
+def read_binary_index(storage_dir: Path, namespace: str = "default",
+                      mmap: bool = True) -> Tuple[List[str], List[Optional[str]], List[Dict[str, Any]], np.ndarray]:
+    """Load ids/metadata and the (memory-mapped) vector block"""
+    with open(meta_path(storage_dir, namespace), "r") as f:
+        header = json.load(f)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary index version {header.get('version')} in {storage_dir}")
+
+    # mmap_mode="r" pages vectors in on first touch instead of reading the whole block
+    matrix = np.load(vectors_path(storage_dir, namespace), mmap_mode="r" if mmap else None, allow_pickle=False)
+    if matrix.shape[0] != header["count"]:
+        raise ValueError(f"Binary index in {storage_dir} is inconsistent: "
+                         f"{matrix.shape[0]} vectors for {header['count']} ids")
+
+    table = header["metadata_table"]
+    metadata = [table[i] for i in header["metadata_index"]]
+    return header["ids"], header["ref_doc_ids"], metadata, matrix
+
+
+def read_quantized(storage_dir: Path, namespace: str = "default", mmap: bool = True) -> Dict[str, Any]:
+    """Memory-map the persisted quantized copies listed in the metadata file (precision -> QuantizedMatrix)"""
+    from vector_store import QuantizedMatrix
+
+    with open(meta_path(storage_dir, namespace), "r") as f:
+        header = json.load(f)
+    mode = "r" if mmap else None
+    quantized = {}
+    for precision in header.get("quantized", []):
+        path = quantized_path(storage_dir, precision, namespace)
+        if not path.exists():
+            logger.warning(f"Quantized vectors {path} are missing; they will be rebuilt in memory")
+            continue
+        data = np.load(path, mmap_mode=mode, allow_pickle=False)
+        scales = np.load(scales_path(storage_dir, namespace), mmap_mode=mode,
+                         allow_pickle=False) if precision == "int8" else None
+        if data.shape[0] != header["count"] or (scales is not None and scales.shape[0] != header["count"]):
+            logger.warning(f"Ignoring {path}: {data.shape[0]} rows for {header['count']} ids")
+            continue
+        quantized[precision] = QuantizedMatrix.from_arrays(precision, data, scales)
+    return quantized
+
+
+def convert(storage_dir: Path, namespace: str = "default") -> int:
+    """Convert <namespace>__vector_store.json into the binary layout; returns the node count"""
+    with open(json_path(storage_dir, namespace), "r") as f:
+        data = json.load(f)
+
+    embedding_dict = data.get("embedding_dict", {})
+    ref_map = data.get("text_id_to_ref_doc_id", {})
+    meta_map = data.get("metadata_dict", {}) or {}
+
+    ids = list(embedding_dict.keys())
+    matrix = np.asarray([embedding_dict[i] for i in ids], dtype=np.float32)
+    write_binary_index(
+        storage_dir,
+        ids=ids,
+        ref_doc_ids=[ref_map.get(i) for i in ids],
+        metadata=[meta_map.get(i) or {} for i in ids],
+        matrix=matrix,
+        namespace=namespace,
+    )
+    return len(ids)
+
+
+def load_vector_store(storage_dir: Path, namespace: str = "default"):
+    """Return a NumpyVectorStore, preferring the memory-mapped binary layout over JSON"""
+    from vector_store import MatrixState, NumpyVectorStore
+
+    storage_dir = Path(storage_dir)
+    if has_binary_index(storage_dir, namespace):
+        ids, ref_doc_ids, metadata, matrix = read_binary_index(storage_dir, namespace)
+        state = MatrixState(
+            ids=tuple(ids),
+            ref_doc_ids=tuple(ref_doc_ids),
+            metadata=tuple(metadata),
+            matrix=matrix,
+        )
+        # Quantized scoring then reads the shared mapped copy instead of building one per process
+        state.quantized.update(read_quantized(storage_dir, namespace))
+        logger.debug(f"Memory-mapped {len(ids)} vectors from {vectors_path(storage_dir, namespace)}")
+        store = NumpyVectorStore(state=state)
+    else:
+        store = NumpyVectorStore.from_persist_dir(str(storage_dir), namespace=namespace)
+    _attach_ivf_index(store, storage_dir, namespace)
+    return store
+
+
+def _attach_ivf_index(store, storage_dir: Path, namespace: str) -> None:
+    """Use a persisted IVF index when it is newer than the vectors it was built from"""
+    from ann_index import IVFFlatIndex, ivf_path
+
+    path = ivf_path(storage_dir, namespace)
+    if not path.exists():
+        return
+    sources = [p for p in (json_path(storage_dir, namespace), vectors_path(storage_dir, namespace)) if p.exists()]
+    if any(p.stat().st_mtime_ns > path.stat().st_mtime_ns for p in sources):
+        logger.warning(f"Ignoring IVF index {path}: older than the vector store")
+        return
+    index = IVFFlatIndex.load(path, len(store))
+    if index is not None:
+        store.state.ann["ivf"] = index
+
+
+def _verify(storage_dir: Path, namespace: str, top_k: int = 5) -> bool:
+    """Check that every stored vector finds the same neighbours in both layouts"""
+    from vector_store import NumpyVectorStore
+
+    json_store = NumpyVectorStore.from_persist_dir(str(storage_dir), namespace=namespace)
+    binary_store = load_vector_store(storage_dir, namespace)
+    for query in json_store.state.matrix:
+        expected, _ = json_store.search(query, top_k)
+        actual, _ = binary_store.search(query, top_k)
+        if expected != actual:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary, memory-mapped vector index for the RAG tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = sub.add_parser("convert", help="Convert the JSON vector store to the binary layout")
+    convert_parser.add_argument("storage_dir", help="LlamaIndex storage directory (e.g. ./storage)")
+    convert_parser.add_argument("--namespace", default="default", help="Vector store namespace")
+    convert_parser.add_argument("--verify", action="store_true", help="Compare top-k results after converting")
+
+    info_parser = sub.add_parser("info", help="Show which layout the loader would use")
+    info_parser.add_argument("storage_dir")
+    info_parser.add_argument("--namespace", default="default")
+
+    args = parser.parse_args()
+    storage_dir = Path(args.storage_dir)
+
+    if args.command == "convert":
+        if not json_path(storage_dir, args.namespace).exists():
+            print(f"❌ {json_path(storage_dir, args.namespace)} not found")
+            sys.exit(1)
+        count = convert(storage_dir, args.namespace)
+        size = vectors_path(storage_dir, args.namespace).stat().st_size
+        print(f"✅ Wrote {count} vectors ({size / 1024:.1f} KB) to {vectors_path(storage_dir, args.namespace)}")
+
+        from shared_docstore import blob_path, docstore_json_path, write_shared_docstore
+
+        if docstore_json_path(storage_dir).exists():
+            nodes = write_shared_docstore(storage_dir)
+            size = blob_path(storage_dir).stat().st_size
+            print(f"✅ Wrote {nodes} nodes ({size / 1024:.1f} KB) to {blob_path(storage_dir)}")
+        if args.verify:
+            if _verify(storage_dir, args.namespace):
+                print("✅ Top-k results match the JSON store")
+            else:
+                print("❌ Top-k results differ from the JSON store")
+                sys.exit(1)
+    else:
+        if has_binary_index(storage_dir, args.namespace):
+            _, _, _, matrix = read_binary_index(storage_dir, args.namespace)
+            print(f"Binary index: {matrix.shape[0]} vectors x {matrix.shape[1]} dims (memory-mapped)")
+        else:
+            print("No up-to-date binary index; the loader will parse the JSON store")
+
+        from shared_docstore import has_shared_docstore
+
+        if has_shared_docstore(storage_dir):
+            print("Docstore: memory-mapped (docstore.kv.bin)")
+        else:
+            print("Docstore: docstore.json (parsed per process)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,167 @@
+"""
+Checkpointing for Pet Store Agent
+In-memory LangGraph checkpointer bounded by thread count, bytes and idle time; picks the durable backend when configured
+"""
+
+from typing import Dict, Any, List
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment (one checkpointer per agent process)
+CHECKPOINT_BACKEND = os.environ.get("CHECKPOINT_BACKEND", "memory")
+CHECKPOINT_MAX_THREADS = int(os.environ.get("CHECKPOINT_MAX_THREADS", "1000"))
+CHECKPOINT_MAX_BYTES = int(os.environ.get("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+CHECKPOINT_TTL = float(os.environ.get("CHECKPOINT_TTL", "3600"))
+
+
+def _stored_size(value: Any) -> int:
+    """Bytes held by a stored checkpoint/write/blob (serialized payloads are bytes)"""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_stored_size(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_stored_size(v) for v in value)
+    return 0
+
+
+def _thread_id(config: Dict[str, Any]) -> str:
+    return config["configurable"]["thread_id"]
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver that evicts whole conversation threads.
+
+    Threads are kept in LRU order by last read or write. When there are more
+    than max_threads, or their serialized checkpoints exceed max_bytes, the
+    least recently used threads are deleted; threads idle for longer than ttl
+    seconds are deleted as well. The thread being written is never evicted.
+    """
+
+    def __init__(self, max_threads: int = CHECKPOINT_MAX_THREADS, max_bytes: int = CHECKPOINT_MAX_BYTES,
+                 ttl: float = CHECKPOINT_TTL, **kwargs):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # thread_id -> [bytes, last access]
+        self._threads: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._bytes = 0
+        self._bounds_lock = threading.RLock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _touch(self, thread_id: str, added_bytes: int = 0) -> None:
+        now = time.monotonic()
+        with self._bounds_lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                entry = self._threads[thread_id] = [0, now]
+            entry[0] += added_bytes
+            entry[1] = now
+            self._bytes += added_bytes
+            self._threads.move_to_end(thread_id)
+            self._enforce(thread_id, now)
+
+    def _enforce(self, current: str, now: float) -> None:
+        while len(self._threads) > 1:
+            oldest, (_, last_access) = next(iter(self._threads.items()))
+            if oldest == current:
+                break
+            if self.ttl > 0 and now - last_access > self.ttl:
+                self._drop(oldest)
+                self.expired += 1
+            elif len(self._threads) > self.max_threads or self._bytes > self.max_bytes:
+                self._drop(oldest)
+                self.evicted += 1
+            else:
+                break
+
+    def _drop(self, thread_id: str) -> None:
+        entry = self._threads.pop(thread_id, None)
+        if entry is not None:
+            self._bytes -= entry[0]
+        self._delete_stored(thread_id)
+        logger.debug(f"Evicted checkpoint thread {thread_id}")
+
+    def _delete_stored(self, thread_id: str) -> None:
+        if hasattr(MemorySaver, "delete_thread"):
+            MemorySaver.delete_thread(self, thread_id)
+            return
+        # Older langgraph releases have no delete_thread
+        self.storage.pop(thread_id, None)
+        for store in (self.writes, getattr(self, "blobs", {})):
+            for key in [key for key in store if key[0] == thread_id]:
+                del store[key]
+
+    def get_tuple(self, config):
+        result = super().get_tuple(config)
+        if result is not None:
+            self._touch(_thread_id(config))
+        return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = _thread_id(config)
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        added = _stored_size(self.storage[thread_id][checkpoint_ns].get(checkpoint["id"]))
+        blobs = getattr(self, "blobs", {})
+        for channel, version in new_versions.items():
+            added += _stored_size(blobs.get((thread_id, checkpoint_ns, channel, version)))
+        self._touch(thread_id, added)
+        return result
+
+    def put_writes(self, config, writes, task_id, *args, **kwargs):
+        key = (_thread_id(config), config["configurable"].get("checkpoint_ns", ""),
+               config["configurable"]["checkpoint_id"])
+        before = _stored_size(self.writes.get(key))
+        result = super().put_writes(config, writes, task_id, *args, **kwargs)
+        self._touch(key[0], _stored_size(self.writes.get(key)) - before)
+        return result
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._bounds_lock:
+            entry = self._threads.pop(thread_id, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+            self._delete_stored(thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._bounds_lock:
+            return {
+                "threads": len(self._threads),
+                "bytes": self._bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+
+def build_checkpointer() -> BaseCheckpointSaver:
+    """Checkpointer for conversation threads (callers that pass a thread_id).
+
+    ``memory`` keeps threads in this process only; ``sqlite`` persists them
+    (see durable_checkpointer.py) so any replica sharing the store can continue
+    a conversation.
+    """
+    if CHECKPOINT_BACKEND == "memory":
+        return BoundedMemorySaver()
+    if CHECKPOINT_BACKEND == "sqlite":
+        from durable_checkpointer import DurableCheckpointSaver, SQLiteCheckpointStore
+
+        return DurableCheckpointSaver(SQLiteCheckpointStore())
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND '{CHECKPOINT_BACKEND}' (expected memory or sqlite)")
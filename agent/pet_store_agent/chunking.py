@@ -0,0 +1,169 @@
+"""
+Chunking for Pet Store Agent
+Structure-aware chunks for the catalog and care guide, plus filterable metadata (species, category, source)
+"""
+
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import re
+
+from product_catalog import parse_products
+
+# Metadata keys the RAG tools can filter on
+ATTRIBUTE_KEYS = ("species", "category", "source")
+
+SPECIES_TERMS: Dict[str, Tuple[str, ...]] = {
+    "dog": ("dog", "dogs", "puppy", "puppies", "canine"),
+    "cat": ("cat", "cats", "kitten", "kittens", "feline"),
+    "small_pet": ("small pet", "small pets", "hamster", "hamsters", "guinea pig", "guinea pigs",
+                  "rabbit", "rabbits"),
+    "bird": ("bird", "birds", "parrot", "parrots", "finch", "finches"),
+}
+_SPECIES_PATTERNS = {
+    species: re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b")
+    for species, terms in SPECIES_TERMS.items()
+}
+SECTION_UNDERLINE = re.compile(r"^=+$")
+GUIDE_UNDERLINE = re.compile(r"^-{3,}$")
+CATEGORY_LINE = re.compile(r"^Category:\s*(.+)$", re.MULTILINE)
+
+
+def normalize_species(value: Optional[str]) -> Optional[str]:
+    """Map user wording ("Dogs", "kitten", "small pets") onto a species attribute value"""
+    if not value:
+        return None
+    text = " ".join(value.replace("_", " ").lower().split())
+    for species, terms in SPECIES_TERMS.items():
+        if text == species.replace("_", " ") or text in terms:
+            return species
+    return detect_species(text)
+
+
+def detect_species(text: str) -> Optional[str]:
+    """Species mentioned most often in the text, or None if none is mentioned"""
+    mentioned = mentioned_species(text)
+    return mentioned[0] if mentioned else None
+
+
+def mentioned_species(text: str) -> List[str]:
+    """Every species the text mentions, most often mentioned first"""
+    lowered = text.lower()
+    counts = {species: len(pattern.findall(lowered)) for species, pattern in _SPECIES_PATTERNS.items()}
+    return [species for species, count in sorted(counts.items(), key=lambda item: -item[1]) if count]
+
+
+def section_headings(text: str) -> List[Tuple[int, str]]:
+    """(character offset, heading) for every line underlined with ===="""
+    headings = []
+    offset = 0
+    previous: Optional[Tuple[int, str]] = None
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if SECTION_UNDERLINE.match(stripped) and previous and previous[1]:
+            headings.append(previous)
+        previous = (offset, stripped)
+        offset += len(line)
+    return headings
+
+
+def section_at(headings: List[Tuple[int, str]], offset: int) -> str:
+    section = ""
+    for start, heading in headings:
+        if start > offset:
+            break
+        section = heading
+    return section
+
+
+def chunk_attributes(text: str, source: str, section: str = "", single_species: bool = False) -> Dict[str, Any]:
+    """Filter attributes for one chunk; unknown values are left out rather than guessed.
+
+    ``species`` lists every species the section heading and text mention, so a
+    care chunk comparing dogs and cats matches either filter. A product block
+    is for one animal: with ``single_species`` it gets the section's species,
+    or the one its text mentions most.
+    """
+    attributes: Dict[str, Any] = {"source": source}
+    if single_species:
+        species = detect_species(section) if section else None
+        species = species or detect_species(text)
+        if species:
+            attributes["species"] = species
+    else:
+        species_list = mentioned_species(section) if section else []
+        species_list += [s for s in mentioned_species(text) if s not in species_list]
+        if species_list:
+            attributes["species"] = species_list
+    categories = {c.strip().lower() for c in CATEGORY_LINE.findall(text)}
+    if len(categories) == 1:
+        attributes["category"] = categories.pop()
+    return attributes
+
+
+def product_chunks(text: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """One chunk per `Product:` block with its parsed fields as metadata"""
+    chunks = []
+    for record in parse_products(text):
+        fields: Dict[str, Any] = chunk_attributes(record.text, "catalog", record.section, single_species=True)
+        fields.update({
+            "sku": record.sku,
+            "product_name": record.name,
+            "section": record.section,
+            "stock_status": record.stock_status,
+        })
+        if record.price is not None:
+            fields["price"] = record.price
+        chunks.append((record.text, fields))
+    return chunks
+
+
+def care_guide_chunks(text: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """One chunk per sub-heading (Bathing:, Feeding:, ...) of each breed/animal guide.
+
+    Every chunk starts with its guide title so it reads on its own; a guide's
+    introduction becomes an "Overview" chunk.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    chunks: List[Tuple[str, Dict[str, Any]]] = []
+    section = guide = topic = ""
+    body: List[str] = []
+
+    def finish():
+        if guide and body:
+            fields = chunk_attributes(" ".join([guide] + body), "care_guide", section)
+            fields.update({"guide": guide, "topic": topic or "Overview", "section": section.title()})
+            heading = f"{guide} - {topic}" if topic else guide
+            chunks.append(("\n".join([heading] + body), fields))
+
+    for position, line in enumerate(lines):
+        following = lines[position + 1] if position + 1 < len(lines) else ""
+        if not line or SECTION_UNDERLINE.match(line) or GUIDE_UNDERLINE.match(line):
+            continue
+        if SECTION_UNDERLINE.match(following):
+            finish()
+            section, guide, topic, body = line, "", "", []
+        elif GUIDE_UNDERLINE.match(following):
+            finish()
+            guide, topic, body = line, "", []
+        elif line.endswith(":") and not line.startswith(("-", "*")):
+            finish()
+            topic, body = line[:-1].strip(), []
+        else:
+            body.append(line)
+    finish()
+    return chunks
+
+
+# Files with a known layout; everything else (e.g. PDFs) goes through the sentence splitter
+STRUCTURED_CHUNKERS: Dict[str, Callable[[str], List[Tuple[str, Dict[str, Any]]]]] = {
+    "products.txt": product_chunks,
+    "pet_care.txt": care_guide_chunks,
+}
+
+
+def structured_chunks(file_name: str, text: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """(text, metadata) chunks for a file with a known layout, or None to fall back to generic splitting"""
+    chunker = STRUCTURED_CHUNKERS.get(file_name)
+    if chunker is None:
+        return None
+    chunks = chunker(text)
+    return chunks or None
@@ -0,0 +1,175 @@
+"""
+Context Payloads for Pet Store Agent
+Turns retrieved nodes into deduplicated, score-filtered, budgeted per-node records for the LLM
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for English text; good enough for budgeting and metrics
+CHARS_PER_TOKEN = 4
+
+# A chunk cut down to fewer characters than this is dropped rather than truncated
+MIN_TRUNCATED_CHARS = 200
+
+# Appended to a truncated chunk; counted against the budget it was cut to
+TRUNCATION_MARKER = " ..."
+
+# Shortest shared prefix/suffix treated as chunk overlap when deduplicating
+MIN_OVERLAP_CHARS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _content_text(content: Any) -> str:
+    """Record content as the model sees it (structured records are serialized JSON)"""
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+def _overlap(kept: str, text: str) -> int:
+    """Length of the longest suffix of `kept` that is also a prefix of `text`"""
+    probe = text[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = kept.find(probe)
+    while start >= 0:
+        if text.startswith(kept[start:]):
+            return len(kept) - start
+        start = kept.find(probe, start + 1)
+    return 0
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut at the last sentence (or word) boundary so the result, marker included, fits max_chars"""
+    limit = max(0, max_chars - len(TRUNCATION_MARKER))
+    cut = text[:limit]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < limit // 2:
+        boundary = cut.rfind(" ")
+    return (cut[:boundary + 1] if boundary > 0 else cut).rstrip() + TRUNCATION_MARKER
+
+
+def node_source(node: Any, default_source: str) -> str:
+    metadata = getattr(node, "metadata", None) or {}
+    name = metadata.get("file_name")
+    if not name:
+        return default_source
+    page = metadata.get("page_label")
+    return f"{name} p.{page}" if page else name
+
+
+def build_payload(nodes: List[Any], default_source: str, max_tokens: int = 0, max_chars: int = 0,
+                  min_score: Optional[float] = None, mode: str = "vector",
+                  structured: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Per-node records in rank order plus counters for this call.
+
+    ``structured`` records (catalog answers) come first and are charged
+    against the budget by their serialized size; they are never truncated.
+    Nodes scoring below ``min_score`` are skipped when ``mode`` is ``vector``;
+    hybrid (RRF) and lexical (BM25) scores are not on the cosine scale the
+    threshold is written for, so it is not applied to them. A chunk contained in one
+    already kept is dropped, and the part of a chunk that repeats the tail of
+    an earlier chunk from the same document (splitter overlap) is trimmed.
+    Records are added until the character budget (the tighter of
+    ``max_chars`` and ``max_tokens``; 0 means unlimited) runs out.
+    """
+    budgets = [b for b in (max_chars, max_tokens * CHARS_PER_TOKEN) if b > 0]
+    remaining = min(budgets) if budgets else None
+    if mode != "vector":
+        min_score = None
+    structured = structured or []
+    counts = {"nodes_in": len(nodes), "structured_in": len(structured), "below_threshold": 0,
+              "deduplicated": 0, "truncated": 0, "over_budget": 0}
+
+    records: List[Dict[str, Any]] = []
+    for record in structured:
+        size = len(_content_text(record["content"]))
+        if remaining is not None and size > remaining:
+            counts["over_budget"] += 1
+            continue
+        records.append(record)
+        if remaining is not None:
+            remaining -= size
+
+    kept: List[Tuple[Optional[str], str]] = []
+    for node_with_score in nodes:
+        score = node_with_score.score
+        if min_score is not None and score is not None and score < min_score:
+            counts["below_threshold"] += 1
+            continue
+
+        node = node_with_score.node
+        text = node.get_content().strip()
+        ref_doc_id = getattr(node, "ref_doc_id", None)
+        if not text or node.node_id in {r.get("node_id") for r in records} or any(text in k for _, k in kept):
+            counts["deduplicated"] += 1
+            continue
+        for doc_id, kept_text in kept:
+            if doc_id == ref_doc_id:
+                shared = _overlap(kept_text, text)
+                if shared:
+                    text = text[shared:].lstrip()
+                    break
+        if not text:
+            counts["deduplicated"] += 1
+            continue
+
+        if remaining is not None and len(text) > remaining:
+            if remaining < MIN_TRUNCATED_CHARS:
+                counts["over_budget"] += 1
+                continue
+            text = _truncate(text, remaining)
+            counts["truncated"] += 1
+
+        kept.append((ref_doc_id, node.get_content()))
+        records.append({
+            "content": text,
+            "relevance_score": round(float(score), 4) if score is not None else None,
+            "source": node_source(node, default_source),
+            "node_id": node.node_id,
+            "doc_id": ref_doc_id,
+        })
+        if remaining is not None:
+            remaining -= len(text)
+
+    counts["nodes_kept"] = len(records)
+    counts["chars"] = sum(len(_content_text(r["content"])) for r in records)
+    counts["tokens"] = sum(estimate_tokens(_content_text(r["content"])) for r in records)
+    get_payload_stats().record(counts)
+    logger.debug(f"Retrieval payload: {counts}")
+    return records, counts
+
+
+class PayloadStats:
+    """Process-wide totals of what retrieval injected into the model context"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.totals: Dict[str, int] = {}
+
+    def record(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            self.calls += 1
+            for name, value in counts.items():
+                self.totals[name] = self.totals.get(name, 0) + value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {"calls": self.calls, **self.totals}
+            stats["avg_tokens_per_call"] = self.totals.get("tokens", 0) / self.calls if self.calls else 0.0
+            return stats
+
+
+_stats = PayloadStats()
+
+
+def get_payload_stats() -> PayloadStats:
+    return _stats
@@ -0,0 +1,438 @@
+"""
+Durable Checkpointer for Pet Store Agent
+LangGraph checkpointer over a key-value store (SQLite locally) with write batching, compressed records and compaction
+
+Conversation state that outlives the process and is visible to every replica
+sharing the store, so a follow-up turn with the same thread_id can land anywhere.
+
+Records are keyed by (thread_id, checkpoint_ns, checkpoint_id); pending writes
+add (task_id, idx). CheckpointStore is the whole storage contract - a shared
+KV service (Redis, DynamoDB) implements the same methods with thread_id as the
+partition key and checkpoint_id as the sort key.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import abc
+import asyncio
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment
+CHECKPOINT_PATH = os.environ.get("CHECKPOINT_PATH", "./checkpoints.db")
+CHECKPOINT_FLUSH_INTERVAL = float(os.environ.get("CHECKPOINT_FLUSH_INTERVAL", "0.5"))
+CHECKPOINT_FLUSH_RECORDS = int(os.environ.get("CHECKPOINT_FLUSH_RECORDS", "64"))
+CHECKPOINT_KEEP_LAST = int(os.environ.get("CHECKPOINT_KEEP_LAST", "2"))
+CHECKPOINT_COMPACT_INTERVAL = float(os.environ.get("CHECKPOINT_COMPACT_INTERVAL", "300"))
+CHECKPOINT_RETENTION = float(os.environ.get("CHECKPOINT_RETENTION", str(7 * 24 * 3600)))
+CHECKPOINT_COMPRESSION_LEVEL = int(os.environ.get("CHECKPOINT_COMPRESSION_LEVEL", "6"))
+
+# (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint, metadata, updated_at)
+CheckpointRow = Tuple[str, str, str, Optional[str], bytes, bytes, float]
+# (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value, task_path)
+WriteRow = Tuple[str, str, str, str, int, str, bytes, str]
+
+
+def encode(serde: Any, value: Any, level: int = CHECKPOINT_COMPRESSION_LEVEL) -> bytes:
+    """Serializer type tag + zlib-compressed payload in one blob.
+
+    Every checkpoint carries the full message history, so it compresses well.
+    """
+    type_, data = serde.dumps_typed(value)
+    return type_.encode("utf-8") + b"\x00" + zlib.compress(data, level)
+
+
+def decode(serde: Any, blob: bytes) -> Any:
+    type_, _, data = bytes(blob).partition(b"\x00")
+    return serde.loads_typed((type_.decode("utf-8"), zlib.decompress(data)))
+
+
+class CheckpointStore(abc.ABC):
+    """Storage contract for DurableCheckpointSaver"""
+
+    @abc.abstractmethod
+    def write_batch(self, checkpoints: List[CheckpointRow], writes: List[WriteRow]) -> None:
+        """Persist checkpoints then writes atomically; special writes (idx < 0) replace, others never do"""
+
+    @abc.abstractmethod
+    def checkpoint(self, thread_id: str, checkpoint_ns: str,
+                   checkpoint_id: Optional[str] = None) -> Optional[CheckpointRow]:
+        """The given checkpoint, or the newest one of the thread when checkpoint_id is None"""
+
+    @abc.abstractmethod
+    def checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                    before_id: Optional[str] = None) -> Iterator[CheckpointRow]:
+        """Checkpoints newest first, optionally for one thread/namespace and older than before_id"""
+
+    @abc.abstractmethod
+    def writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[WriteRow]:
+        """Pending writes recorded against one checkpoint, in (task_id, idx) order"""
+
+    @abc.abstractmethod
+    def delete_thread(self, thread_id: str) -> None:
+        """Drop every checkpoint and write of the thread"""
+
+    @abc.abstractmethod
+    def compact(self, keep_last: int, older_than: float) -> Dict[str, int]:
+        """Keep the newest keep_last checkpoints per thread; drop threads untouched since older_than"""
+
+    def size_bytes(self) -> int:
+        """Bytes used by the store, when the backend can tell (0 otherwise)"""
+        return 0
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """CheckpointStore in one SQLite file (WAL mode, so several processes on a host can share it)"""
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+                " parent_checkpoint_id TEXT, checkpoint BLOB NOT NULL, metadata BLOB NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, value BLOB NOT NULL,"
+                " task_path TEXT NOT NULL DEFAULT '',"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+
+    def write_batch(self, checkpoints: List[CheckpointRow], writes: List[WriteRow]) -> None:
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)", checkpoints)
+            self._db.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [w for w in writes if w[4] < 0])
+            self._db.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [w for w in writes if w[4] >= 0])
+
+    def checkpoint(self, thread_id: str, checkpoint_ns: str,
+                   checkpoint_id: Optional[str] = None) -> Optional[CheckpointRow]:
+        with self._lock:
+            if checkpoint_id:
+                return self._db.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            return self._db.execute(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+
+    def checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                    before_id: Optional[str] = None) -> Iterator[CheckpointRow]:
+        clauses, params = [], []
+        for column, value in (("thread_id", thread_id), ("checkpoint_ns", checkpoint_ns)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if before_id:
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM checkpoints{where} ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC",
+                params).fetchall()
+        return iter(rows)
+
+    def writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[WriteRow]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT * FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+                " ORDER BY task_id, idx", (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._db.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def compact(self, keep_last: int, older_than: float) -> Dict[str, int]:
+        with self._lock, self._db:
+            threads = self._db.execute(
+                "DELETE FROM checkpoints WHERE thread_id IN (SELECT thread_id FROM checkpoints"
+                " GROUP BY thread_id HAVING MAX(updated_at) < ?)", (older_than,)).rowcount
+            superseded = 0
+            if keep_last > 0:
+                superseded = self._db.execute(
+                    "DELETE FROM checkpoints WHERE rowid IN (SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER"
+                    " (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rank"
+                    " FROM checkpoints) WHERE rank > ?)", (keep_last,)).rowcount
+            writes = self._db.execute(
+                "DELETE FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints c WHERE"
+                " c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns"
+                " AND c.checkpoint_id = writes.checkpoint_id)").rowcount
+        return {"expired_checkpoints": threads, "superseded_checkpoints": superseded, "orphaned_writes": writes}
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+        return pages * page_size
+
+
+class DurableCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer that persists to a CheckpointStore in batches.
+
+    put/put_writes only buffer encoded records; they are written in one
+    transaction when the buffer reaches flush_records, every flush_interval
+    seconds, and whenever flush() is called (PetStoreAgent flushes at the end
+    of each stateful invocation, so the next turn can be served by any
+    replica). Reads see this process's unflushed records. Every
+    compact_interval seconds, checkpoints beyond the newest keep_last per
+    thread, and threads idle for longer than retention seconds, are deleted.
+    """
+
+    def __init__(self, store: CheckpointStore, flush_interval: float = CHECKPOINT_FLUSH_INTERVAL,
+                 flush_records: int = CHECKPOINT_FLUSH_RECORDS, keep_last: int = CHECKPOINT_KEEP_LAST,
+                 compact_interval: float = CHECKPOINT_COMPACT_INTERVAL, retention: float = CHECKPOINT_RETENTION,
+                 *, serde: Any = None):
+        super().__init__(serde=serde)
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_records = max(1, flush_records)
+        self.keep_last = keep_last
+        self.compact_interval = compact_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: "OrderedDict[Tuple[str, str, str], CheckpointRow]" = OrderedDict()
+        self._pending_writes: "OrderedDict[Tuple[str, str, str, str, int], WriteRow]" = OrderedDict()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._last_compact = time.monotonic()
+        self.flushes = 0
+        self.checkpoints_written = 0
+        self.writes_written = 0
+        self.bytes_written = 0
+        self.flush_errors = 0
+        self.compactions: Dict[str, int] = {"runs": 0, "expired_checkpoints": 0, "superseded_checkpoints": 0,
+                                            "orphaned_writes": 0}
+        atexit.register(self.close)
+
+    # Background flushing and compaction
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None and self.flush_interval > 0:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="checkpoint-flush", daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self.compact_interval > 0 and time.monotonic() - self._last_compact >= self.compact_interval:
+                    self.compact()
+            except Exception as e:
+                logger.warning(f"Checkpoint flush failed: {e}")
+
+    def flush(self) -> int:
+        """Write every buffered record in one batch; returns the number of records written"""
+        with self._flush_lock:
+            with self._lock:
+                checkpoints = list(self._pending.values())
+                writes = list(self._pending_writes.values())
+                self._pending.clear()
+                self._pending_writes.clear()
+            if not checkpoints and not writes:
+                return 0
+            try:
+                self.store.write_batch(checkpoints, writes)
+            except Exception:
+                # Put the batch back (newer buffered records win) so the next flush retries it
+                with self._lock:
+                    for row in checkpoints:
+                        self._pending.setdefault(row[:3], row)
+                    for row in writes:
+                        self._pending_writes.setdefault(row[:5], row)
+                    self.flush_errors += 1
+                raise
+            with self._lock:
+                self.flushes += 1
+                self.checkpoints_written += len(checkpoints)
+                self.writes_written += len(writes)
+                self.bytes_written += sum(len(r[4]) + len(r[5]) for r in checkpoints) + \
+                    sum(len(r[6]) for r in writes)
+        return len(checkpoints) + len(writes)
+
+    def compact(self) -> Dict[str, int]:
+        self.flush()
+        removed = self.store.compact(self.keep_last, time.time() - self.retention)
+        self._last_compact = time.monotonic()
+        with self._lock:
+            self.compactions["runs"] += 1
+            for key, count in removed.items():
+                self.compactions[key] = self.compactions.get(key, 0) + count
+        if any(removed.values()):
+            logger.info(f"Compacted checkpoints: {removed}")
+        return removed
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final checkpoint flush failed: {e}")
+
+    def _buffered(self) -> None:
+        self._ensure_worker()
+        if len(self._pending) + len(self._pending_writes) >= self.flush_records:
+            self._wake.set()
+
+    # BaseCheckpointSaver
+
+    def _tuple(self, row: CheckpointRow) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint, metadata, _ = row
+        with self._lock:
+            pending = [w for key, w in self._pending_writes.items() if key[:3] == (thread_id, checkpoint_ns, checkpoint_id)]
+        writes = {w[3:5]: w for w in self.store.writes(thread_id, checkpoint_ns, checkpoint_id)}
+        for w in pending:
+            if w[4] < 0 or w[3:5] not in writes:
+                writes[w[3:5]] = w
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=decode(self.serde, checkpoint),
+            metadata=decode(self.serde, metadata),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                  "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(w[3], w[5], decode(self.serde, w[6])) for _, w in sorted(writes.items())],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self._pending.get((thread_id, checkpoint_ns, checkpoint_id))
+            else:
+                rows = [r for key, r in self._pending.items() if key[:2] == (thread_id, checkpoint_ns)]
+                row = max(rows, key=lambda r: r[2]) if rows else None
+        stored = self.store.checkpoint(thread_id, checkpoint_ns, checkpoint_id) if row is None or not checkpoint_id else None
+        if stored is not None and (row is None or stored[2] > row[2]):
+            row = stored
+        return self._tuple(row) if row is not None else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        self.flush()
+        thread_id = config["configurable"]["thread_id"] if config else None
+        checkpoint_ns = config["configurable"].get("checkpoint_ns") if config else None
+        checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+        for row in self.store.checkpoints(thread_id, checkpoint_ns, before_id):
+            if checkpoint_id and row[2] != checkpoint_id:
+                continue
+            if filter:
+                metadata = decode(self.serde, row[5])
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._tuple(row)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        row = (
+            thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+            encode(self.serde, checkpoint), encode(self.serde, get_checkpoint_metadata(config, metadata)),
+            time.time(),
+        )
+        with self._lock:
+            self._pending[row[:3]] = row
+        self._buffered()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path: str = ""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for position, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, position)
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                if idx >= 0 and key in self._pending_writes:
+                    continue
+                self._pending_writes[key] = key + (channel, encode(self.serde, value), task_path)
+        self._buffered()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for buffer in (self._pending, self._pending_writes):
+                for key in [key for key in buffer if key[0] == thread_id]:
+                    del buffer[key]
+        self.store.delete_thread(thread_id)
+
+    # Async API: store I/O (SQLite reads, flushes, the lock held around them) runs in a worker
+    # thread so it never blocks the event loop serving other conversations
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = ""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending_checkpoints": len(self._pending),
+                "pending_writes": len(self._pending_writes),
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+                "checkpoints_written": self.checkpoints_written,
+                "writes_written": self.writes_written,
+                "bytes_written": self.bytes_written,
+                "compactions": dict(self.compactions),
+                "store_bytes": self.store.size_bytes(),
+            }
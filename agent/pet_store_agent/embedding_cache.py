@@ -0,0 +1,225 @@
+"""
+Embedding Cache for Pet Store Agent
+Two-tier (in-memory LRU + optional SQLite) cache of query embeddings in front of BedrockEmbedding
+"""
+
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment (the cache is process-wide, not per LaunchDarkly variation)
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "")
+EMBEDDING_CACHE_DISK_MAX = int(os.environ.get("EMBEDDING_CACHE_DISK_MAX", "100000"))
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query used for cache keys"""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model_id: str, text: str) -> str:
+    return hashlib.sha256(f"{model_id}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU of embeddings with an optional SQLite tier that survives restarts"""
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, disk_path: Optional[str] = None,
+                 max_disk_entries: int = EMBEDDING_CACHE_DISK_MAX):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._disk_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            try:
+                Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, model TEXT, vector BLOB, created_at REAL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening embedding cache at {disk_path}: {e}")
+                self._db = None
+
+    def get(self, model_id: str, text: str) -> Optional[List[float]]:
+        key = cache_key(model_id, text)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+
+        embedding = self._disk_get(key)
+        if embedding is not None:
+            self._memory_put(key, embedding)
+            with self._lock:
+                self.disk_hits += 1
+            return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model_id: str, text: str, embedding: List[float]) -> None:
+        key = cache_key(model_id, text)
+        self._memory_put(key, embedding)
+        self._disk_put(key, model_id, embedding)
+
+    def _memory_put(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading embedding cache: {e}")
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist() if row else None
+
+    def _disk_put(self, key: str, model_id: str, embedding: List[float]) -> None:
+        if self._db is None:
+            return
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                    (key, model_id, blob, time.time())
+                )
+                self._disk_writes += 1
+                # Trim the oldest rows now and then rather than on every write
+                if self._disk_writes % 100 == 0:
+                    self._db.execute(
+                        "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings "
+                        "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,)
+                    )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing embedding cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.max_entries,
+                "disk_enabled": self._db is not None,
+            }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """BaseEmbedding wrapper that serves repeated query embeddings from an EmbeddingCache.
+
+    Only query embeddings are cached; document embeddings (index building)
+    go straight to the wrapped model.
+    """
+
+    _inner: Any = PrivateAttr()
+    _cache: Any = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, **kwargs: Any) -> None:
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs
+        )
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        embedding = self._cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = self._inner.get_query_embedding(query)
+            self._cache.put(self.model_name, query, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        embedding = self._cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = await self._inner.aget_query_embedding(query)
+            self._cache.put(self.model_name, query, embedding)
+        return embedding
+
+    def get_query_embeddings(self, queries: List[str], max_workers: int = 8) -> List[List[float]]:
+        """Embed several queries at once: cache hits are free, misses go out concurrently.
+
+        Titan embeddings take one text per request, so misses are fanned out
+        over a small thread pool instead of being sent one after another.
+        """
+        embeddings: List[Optional[List[float]]] = [self._cache.get(self.model_name, q) for q in queries]
+        missing = sorted({q for q, e in zip(queries, embeddings) if e is None})
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+                fetched = dict(zip(missing, pool.map(self._inner.get_query_embedding, missing)))
+            for query, embedding in fetched.items():
+                self._cache.put(self.model_name, query, embedding)
+            embeddings = [e if e is not None else fetched[q] for q, e in zip(queries, embeddings)]
+        return embeddings
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._inner.get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._inner.aget_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._inner.get_text_embedding_batch(texts)
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache configured from the environment"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(disk_path=EMBEDDING_CACHE_PATH or None)
+    return _cache
@@ -0,0 +1,121 @@
+"""
+Compiled Graph Cache for Pet Store Agent
+LRU of compiled LangGraph agents keyed by LaunchDarkly variation, model, tools and a hash of the config
+"""
+
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment
+AGENT_GRAPH_CACHE_SIZE = int(os.environ.get("AGENT_GRAPH_CACHE_SIZE", "32"))
+
+
+def graph_key(variation_key: str, model_name: str, provider_name: str, tool_names: Iterable[str],
+              parameters: Dict[str, Any], custom: Dict[str, Any]) -> Tuple:
+    """Everything a compiled graph depends on; tools and the LLM are built from parameters + custom.
+
+    Instructions are left out: they are interpolated per user and passed to
+    the graph with each call, so one graph serves every user of a variation.
+    """
+    config = json.dumps([parameters, custom], sort_keys=True, default=str)
+    return (variation_key, model_name, provider_name, tuple(sorted(tool_names)),
+            hashlib.sha256(config.encode("utf-8")).hexdigest())
+
+
+class GraphCache:
+    """Thread-safe LRU of compiled graphs.
+
+    A compiled graph holds no per-request state (conversation state lives in
+    the checkpointer), so one instance serves every request of its variation.
+    """
+
+    def __init__(self, max_entries: int = AGENT_GRAPH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Tuple, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_build(self, key: Tuple, build: Callable[[], Any]) -> Any:
+        if self.max_entries <= 0:
+            return build()
+
+        with self._lock:
+            graph = self._entries.get(key)
+            if graph is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return graph
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # One build per key; concurrent first requests for a variation wait for it
+        with build_lock:
+            with self._lock:
+                graph = self._entries.get(key)
+                if graph is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if graph is None:
+                graph = build()
+                with self._lock:
+                    self._entries[key] = graph
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                    self._build_locks.pop(key, None)
+                logger.info(f"Compiled agent graph for variation '{key[0]}' ({key[1]})")
+        return graph
+
+    def invalidate(self) -> int:
+        """Drop every compiled graph (e.g. after the agent's LaunchDarkly config changed)"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self.invalidations += 1
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "variations": sorted({key[0] for key in self._entries}),
+            }
+
+
+class WarmContexts:
+    """The most recent user context seen per variation, used to pre-build graphs after a config change"""
+
+    def __init__(self, max_entries: int = AGENT_GRAPH_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._contexts: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, variation_key: str, user_ctx: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._contexts[variation_key] = dict(user_ctx) if user_ctx else None
+            self._contexts.move_to_end(variation_key)
+            while len(self._contexts) > self.max_entries:
+                self._contexts.popitem(last=False)
+
+    def contexts(self) -> list:
+        with self._lock:
+            return list(self._contexts.values())
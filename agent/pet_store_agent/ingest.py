@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Index Ingestion for Pet Store Agent
+Builds the product and pet-care storage directories from data/*.txt and the knowledge-base PDFs
+
+Chunks are content-hashed and their node ids derive from the hash, so a rebuild only
+embeds chunks that are new or changed; everything else reuses the vectors already in
+the target storage directory. Embedding runs on a bounded, rate-limited thread pool.
+
+Usage:
+    python ingest.py                          # Rebuild both indexes with Bedrock embeddings
+    python ingest.py --only products          # Just ./storage
+    python ingest.py --embedder stub          # Deterministic local embeddings (no AWS), for tests
+    python ingest.py --workers 4 --rps 8      # Embedding concurrency and requests/second
+    python ingest.py --generic-chunks         # Sentence-split the .txt sources instead of per product/topic
+"""
+
+from typing import Dict, Any, Callable, List
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from chunking import ATTRIBUTE_KEYS, chunk_attributes, section_at, section_headings, structured_chunks
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = Path(__file__).parent
+MANIFEST_FNAME = "ingest_manifest.json"
+
+# Which sources feed which storage directory (paths relative to this package),
+# each tagged with the `source` attribute its chunks get
+INDEXES: Dict[str, Dict[str, Any]] = {
+    "products": {
+        "storage_dir": "storage",
+        "sources": {"data/products.txt": "catalog", "../knowledge_bases/*.pdf": "catalog"},
+    },
+    "petcare": {
+        "storage_dir": "storage_petcare",
+        "sources": {"data/pet_care.txt": "care_guide"},
+    },
+}
+
+
+class RateLimiter:
+    """Spaces request starts at most `rate` per second across all worker threads"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class StubEmbedder:
+    """Deterministic pseudo-random unit vectors seeded by the text hash (no network)"""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.model_name = f"stub-{dim}"
+        self.calls = 0
+
+    def __call__(self, text: str) -> List[float]:
+        self.calls += 1
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+
+class BedrockEmbedder:
+    """Document embeddings from the shared Titan model"""
+
+    def __init__(self, aws_region: str):
+        from retrieval_engine import EMBED_MODEL_NAME, get_embed_model
+
+        self.model_name = EMBED_MODEL_NAME
+        self._model = get_embed_model(aws_region)
+        self.calls = 0
+
+    def __call__(self, text: str) -> List[float]:
+        self.calls += 1
+        return self._model.get_text_embedding(text)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def resolve_sources(patterns: Dict[str, str]) -> Dict[Path, str]:
+    """Source files -> source attribute"""
+    files: Dict[Path, str] = {}
+    for pattern, source in patterns.items():
+        for path in sorted(p.resolve() for p in PACKAGE_DIR.glob(pattern) if p.is_file()):
+            files[path] = source
+    return files
+
+
+def load_documents(files: Dict[Path, str]) -> List[Any]:
+    """Read text files and PDFs (one document per page) with stable document ids"""
+    from llama_index.core import SimpleDirectoryReader
+
+    sources = {path.name: source for path, source in files.items()}
+    documents = SimpleDirectoryReader(input_files=[str(f) for f in files]).load_data()
+    for document in documents:
+        page = document.metadata.get("page_label")
+        name = document.metadata.get("file_name", "document")
+        document.id_ = f"{name}#page{page}" if page else name
+        document.metadata["source"] = sources.get(name, "catalog")
+    return documents
+
+
+def _structured_nodes(document: Any, chunks: List[Any]) -> List[Any]:
+    from llama_index.core.schema import NodeRelationship, TextNode
+
+    nodes = []
+    for text, fields in chunks:
+        node = TextNode(
+            text=text,
+            metadata={**document.metadata, **fields},
+            # Parsed fields already appear in the chunk text; don't repeat them in embeddings or prompts
+            excluded_embed_metadata_keys=list(document.excluded_embed_metadata_keys) + list(fields),
+            excluded_llm_metadata_keys=list(document.excluded_llm_metadata_keys) + list(fields),
+        )
+        node.relationships[NodeRelationship.SOURCE] = document.as_related_node_info()
+        nodes.append(node)
+    return nodes
+
+
+def chunk_documents(documents: List[Any], chunk_size: int, chunk_overlap: int,
+                    structured: bool = True) -> List[Any]:
+    """Chunk documents into nodes whose ids are derived from the text they embed.
+
+    products.txt and pet_care.txt get one chunk per product block / care-guide
+    sub-heading (see chunking.py); other documents use the sentence splitter.
+    """
+    from llama_index.core.node_parser import SentenceSplitter
+    from llama_index.core.schema import MetadataMode
+
+    nodes: List[Any] = []
+    generic: List[Any] = []
+    for document in documents:
+        # The absolute path differs between machines; keep it out of the hashed text
+        document.excluded_embed_metadata_keys = list(set(document.excluded_embed_metadata_keys) | {"file_path"})
+        document.excluded_llm_metadata_keys = list(set(document.excluded_llm_metadata_keys) | {"file_path"})
+        chunks = structured_chunks(document.metadata.get("file_name", ""), document.text) if structured else None
+        if chunks:
+            nodes.extend(_structured_nodes(document, chunks))
+        else:
+            generic.append(document)
+
+    if generic:
+        splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        headings = {document.id_: section_headings(document.text) for document in generic}
+        for node in splitter.get_nodes_from_documents(generic):
+            section = section_at(headings.get(node.ref_doc_id, []), node.start_char_idx or 0)
+            node.metadata.update(chunk_attributes(node.get_content(), node.metadata.get("source", "catalog"), section))
+            nodes.append(node)
+
+    seen: Dict[str, int] = {}
+    for node in nodes:
+        # Filter attributes are kept out of the embedded text so they never change a chunk's hash
+        node.excluded_embed_metadata_keys = list(set(node.excluded_embed_metadata_keys) | set(ATTRIBUTE_KEYS))
+        node.excluded_llm_metadata_keys = list(set(node.excluded_llm_metadata_keys) | set(ATTRIBUTE_KEYS))
+
+        digest = chunk_hash(f"{node.ref_doc_id}\x00{node.get_content(metadata_mode=MetadataMode.EMBED)}")
+        # Identical chunks within one document get an ordinal so ids stay unique
+        ordinal = seen.get(digest, 0)
+        seen[digest] = ordinal + 1
+        node.id_ = f"{digest[:32]}-{ordinal}" if ordinal else digest[:32]
+        node.metadata["chunk_hash"] = digest
+        node.excluded_embed_metadata_keys = list(set(node.excluded_embed_metadata_keys) | {"chunk_hash"})
+        node.excluded_llm_metadata_keys = list(set(node.excluded_llm_metadata_keys) | {"chunk_hash"})
+    return nodes
+
+
+def previous_embeddings(storage_dir: Path, embed_model_name: str) -> Dict[str, np.ndarray]:
+    """Vectors from the last build of this storage directory, keyed by node id"""
+    manifest_path = storage_dir / MANIFEST_FNAME
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("embed_model") != embed_model_name:
+        logger.info(f"Embedding model changed ({manifest.get('embed_model')} -> {embed_model_name}); "
+                    f"re-embedding everything")
+        return {}
+
+    from binary_index import load_vector_store
+
+    state = load_vector_store(storage_dir).state
+    return {node_id: state.matrix[row] for row, node_id in enumerate(state.ids)}
+
+
+def embed_texts(texts: List[str], embedder: Callable[[str], List[float]], workers: int,
+                rps: float, retries: int = 3) -> List[List[float]]:
+    """Embed on a bounded pool; each request waits for the shared rate limiter"""
+    limiter = RateLimiter(rps)
+
+    def embed_one(text: str) -> List[float]:
+        for attempt in range(retries):
+            limiter.acquire()
+            try:
+                return embedder(text)
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise
+                backoff = 2 ** attempt
+                logger.warning(f"Embedding failed ({e}); retrying in {backoff}s")
+                time.sleep(backoff)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(embed_one, texts))
+
+
+def _swap_into_place(new_dir: Path, storage_dir: Path) -> None:
+    """Replace storage_dir with new_dir; the retrieval engine keeps its old snapshot meanwhile"""
+    backup = storage_dir.with_name(f"{storage_dir.name}.old")
+    if backup.exists():
+        shutil.rmtree(backup)
+    if storage_dir.exists():
+        os.replace(storage_dir, backup)
+    os.replace(new_dir, storage_dir)
+    shutil.rmtree(backup, ignore_errors=True)
+
+
+def build_index(name: str, embedder: Any, workers: int = 4, rps: float = 10.0,
+                chunk_size: int = 512, chunk_overlap: int = 50, structured: bool = True) -> Dict[str, Any]:
+    """Rebuild one storage directory, embedding only new or changed chunks"""
+    from llama_index.core import StorageContext, VectorStoreIndex
+    from llama_index.core.embeddings import MockEmbedding
+    from llama_index.core.schema import MetadataMode
+    from ann_index import IVFFlatIndex, ivf_path
+    from binary_index import write_binary_index
+    from shared_docstore import write_shared_docstore
+    from vector_store import NumpyVectorStore
+
+    started = time.perf_counter()
+    config = INDEXES[name]
+    storage_dir = PACKAGE_DIR / config["storage_dir"]
+    files = resolve_sources(config["sources"])
+    if not files:
+        raise FileNotFoundError(f"No source files found for index '{name}': {config['sources']}")
+
+    nodes = chunk_documents(load_documents(files), chunk_size, chunk_overlap, structured)
+    known = previous_embeddings(storage_dir, embedder.model_name)
+
+    to_embed = [node for node in nodes if node.node_id not in known]
+    for node in nodes:
+        if node.node_id in known:
+            node.embedding = np.asarray(known[node.node_id], dtype=np.float32).tolist()
+
+    if to_embed:
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in to_embed]
+        for node, embedding in zip(to_embed, embed_texts(texts, embedder, workers, rps)):
+            node.embedding = embedding
+
+    # Every node already carries its embedding, so the index never calls a real model
+    dim = len(nodes[0].embedding) if nodes else 0
+    vector_store = NumpyVectorStore()
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    VectorStoreIndex(nodes, storage_context=storage_context, embed_model=MockEmbedding(embed_dim=dim))
+
+    new_dir = storage_dir.with_name(f"{storage_dir.name}.new")
+    if new_dir.exists():
+        shutil.rmtree(new_dir)
+    storage_context.persist(persist_dir=str(new_dir))
+    state = vector_store.state
+    write_binary_index(new_dir, list(state.ids), list(state.ref_doc_ids), list(state.metadata), state.matrix)
+    if len(state.ids):
+        # Written after the vectors so the loader sees it as current
+        IVFFlatIndex.build(state.matrix).save(ivf_path(new_dir), len(state.ids))
+    write_shared_docstore(new_dir)
+    with open(new_dir / MANIFEST_FNAME, "w") as f:
+        json.dump({
+            "version": 1,
+            "embed_model": embedder.model_name,
+            "sources": {str(p.relative_to(PACKAGE_DIR.parent.resolve())): source for p, source in files.items()},
+            "chunks": {node.node_id: node.metadata["chunk_hash"] for node in nodes},
+        }, f, indent=2)
+    _swap_into_place(new_dir, storage_dir)
+
+    return {
+        "index": name,
+        "storage_dir": str(storage_dir),
+        "chunks": len(nodes),
+        "embedded": len(to_embed),
+        "reused": len(nodes) - len(to_embed),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the RAG storage directories incrementally")
+    parser.add_argument("--only", choices=sorted(INDEXES), help="Build a single index")
+    parser.add_argument("--embedder", choices=["bedrock", "stub"], default="bedrock")
+    parser.add_argument("--region", default=os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument("--rps", type=float, default=10.0, help="Max embedding requests per second (0 = unlimited)")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--generic-chunks", action="store_true",
+                        help="Sentence-split products.txt/pet_care.txt too instead of one chunk per product/topic")
+    args = parser.parse_args()
+
+    embedder = StubEmbedder() if args.embedder == "stub" else BedrockEmbedder(args.region)
+    names = [args.only] if args.only else list(INDEXES)
+    for name in names:
+        try:
+            summary = build_index(name, embedder, args.workers, args.rps, args.chunk_size, args.chunk_overlap,
+                                  structured=not args.generic_chunks)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            sys.exit(1)
+        print(f"✅ {summary['index']}: {summary['chunks']} chunks "
+              f"({summary['embedded']} embedded, {summary['reused']} reused) "
+              f"-> {summary['storage_dir']} in {summary['seconds']}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
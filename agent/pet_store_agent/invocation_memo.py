@@ -0,0 +1,111 @@
+"""
+Invocation Memo for Pet Store Agent
+Request-scoped memo of tool results so repeated calls within one agent run skip the Lambda/Bedrock hop
+"""
+
+from typing import Dict, Any, Iterator, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import logging
+import threading
+
+from embedding_cache import normalize_query
+from single_flight import call_key
+
+logger = logging.getLogger(__name__)
+
+# Free-text arguments where case, spacing and trailing punctuation do not change the answer
+QUERY_ARGUMENTS = ("query", "queries")
+QUERY_PUNCTUATION = " ?!.,;:"
+
+
+def _canonical(name: str, value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        if name in QUERY_ARGUMENTS:
+            value = normalize_query(value).strip(QUERY_PUNCTUATION)
+        return value
+    if isinstance(value, (list, tuple)) and name in QUERY_ARGUMENTS:
+        return [_canonical(name, item) for item in value]
+    return value
+
+
+def canonical_arguments(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool arguments with query text normalized and None values dropped (same as omitted)"""
+    return {name: _canonical(name, value) for name, value in kwargs.items() if value is not None}
+
+
+class InvocationMemo:
+    """Tool results of one agent invocation, keyed by tool name + canonical arguments"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[str, Any] = {}
+        self.calls = 0
+        self.deduplicated = 0
+        self.by_tool: Dict[str, int] = {}
+
+    def lookup(self, key: str, tool_name: str) -> Any:
+        with self._lock:
+            self.calls += 1
+            if key in self._results:
+                self.deduplicated += 1
+                self.by_tool[tool_name] = self.by_tool.get(tool_name, 0) + 1
+                return self._results[key]
+        return None
+
+    def store(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._results[key] = result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tool_calls": self.calls,
+                "deduplicated": self.deduplicated,
+                "deduplicated_by_tool": dict(self.by_tool),
+            }
+
+
+# Set for the duration of PetStoreAgent.invoke; LangChain copies the context into tool threads
+_current: ContextVar[Optional[InvocationMemo]] = ContextVar("pet_store_invocation_memo", default=None)
+
+
+@contextmanager
+def invocation_scope() -> Iterator[InvocationMemo]:
+    """Give every tool call inside the block one shared memo, discarded on exit"""
+    memo = InvocationMemo()
+    token = _current.set(memo)
+    try:
+        yield memo
+    finally:
+        _current.reset(token)
+
+
+def current_memo() -> Optional[InvocationMemo]:
+    return _current.get()
+
+
+def memoize_tool(tool_obj: Any) -> Any:
+    """Return the memoized result when the same tool call already ran in this invocation"""
+    func = getattr(tool_obj, "func", None)
+    if func is None:
+        return tool_obj
+
+    @functools.wraps(func)
+    def memoized(*args, **kwargs):
+        memo = _current.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        key = call_key(tool_obj.name, args, canonical_arguments(kwargs))
+        result = memo.lookup(key, tool_obj.name)
+        if result is not None:
+            logger.debug(f"Reused {tool_obj.name} result from earlier in this invocation")
+            return result
+        result = func(*args, **kwargs)
+        memo.store(key, result)
+        return result
+
+    tool_obj.func = memoized
+    return tool_obj
@@ -0,0 +1,282 @@
+"""
+Lambda Result Cache for Pet Store Agent
+TTL + stale-while-revalidate cache in front of the inventory and user Lambda tools
+"""
+
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment (the cache is process-wide; TTLs come from LaunchDarkly per tool)
+LAMBDA_CACHE_SIZE = int(os.environ.get("LAMBDA_CACHE_SIZE", "4096"))
+LAMBDA_CACHE_REFRESH_WORKERS = int(os.environ.get("LAMBDA_CACHE_REFRESH_WORKERS", "4"))
+
+# Stands in for the looked-up email address inside cached user records
+EMAIL_PLACEHOLDER = "<redacted-email>"
+
+
+def hash_key(value: str) -> str:
+    """Stable, non-reversible key for PII such as email addresses (case and whitespace folded)"""
+    return hashlib.sha256(value.strip().lower().encode("utf-8")).hexdigest()
+
+
+def redact(result: Any, secret: str, placeholder: str = EMAIL_PLACEHOLDER) -> Any:
+    """Copy of a JSON-shaped result with every occurrence of secret (any case) replaced by placeholder.
+
+    Also reaches into the JSON-encoded body of action-group replies.
+    """
+    text = json.dumps(result)
+    return json.loads(re.sub(re.escape(json.dumps(secret)[1:-1]), placeholder, text, flags=re.IGNORECASE))
+
+
+def unredact(result: Any, secret: str, placeholder: str = EMAIL_PLACEHOLDER) -> Any:
+    """Inverse of redact for the caller that supplied secret"""
+    text = json.dumps(result)
+    if placeholder not in text:
+        return result
+    return json.loads(text.replace(placeholder, json.dumps(secret)[1:-1]))
+
+
+class LambdaErrorResponse(RuntimeError):
+    """A Lambda replied with statusCode >= 400; raised so the response is never cached"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        super().__init__(f"Lambda returned status {payload.get('statusCode')}")
+        self.payload = payload
+
+
+def is_error_response(result: Any) -> bool:
+    """True for the {"statusCode": 4xx/5xx, "body": ...} replies the Lambdas use for failures"""
+    if not isinstance(result, dict):
+        return False
+    try:
+        return int(result.get("statusCode") or 0) >= 400
+    except (TypeError, ValueError):
+        return False
+
+
+def response_body(result: Any) -> Any:
+    """Decoded response.functionResponse.responseBody.TEXT.body of an action-group style reply.
+
+    Anything not in that shape is returned unchanged; a body that is not JSON
+    is returned as the raw string.
+    """
+    if not isinstance(result, dict) or "response" not in result:
+        return result
+    try:
+        body = result["response"]["functionResponse"]["responseBody"]["TEXT"]["body"]
+    except (KeyError, TypeError):
+        return result
+    if isinstance(body, str):
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body
+    return body
+
+
+def wrap_body(body: Any) -> Dict[str, Any]:
+    """The action-group reply a Lambda would send for body (inverse of response_body)"""
+    return {"response": {"functionResponse": {"responseBody": {"TEXT": {"body": json.dumps(body)}}}}}
+
+
+def _is_missing(result: Any) -> bool:
+    """True for Lambda responses that mean "no such user/product" rather than a value"""
+    body = response_body(result)
+    if not body:
+        return True
+    if isinstance(body, dict):
+        return bool(body.get("error")) or body.get("status") == "not_found" or body.get("statusCode") == 404
+    return False
+
+
+class LambdaCache:
+    """Thread-safe LRU of Lambda results with fresh, stale and negative lifetimes.
+
+    A fresh entry is returned as-is. Within ``stale_ttl`` seconds after it
+    expires, it is still returned while a background refresh replaces it, so
+    callers never wait on a Lambda round-trip for data that only changes
+    slowly. Not-found results (an "error" or ``"status": "not_found"`` in
+    the decoded body) are cached for ``negative_ttl`` seconds; error
+    responses (statusCode >= 400) are never cached.
+    Values are stored as-is and shared between callers, so they must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = LAMBDA_CACHE_SIZE, refresh_workers: int = LAMBDA_CACHE_REFRESH_WORKERS):
+        self.max_entries = max_entries
+        self.refresh_workers = refresh_workers
+        # key -> (stored at, fresh for, stale for, value)
+        self._entries: "OrderedDict[Tuple, Tuple[float, float, float, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._warmed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.warmed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _store(self, key: Tuple, value: Any, ttl: float, stale_ttl: float, negative_ttl: float) -> None:
+        if is_error_response(value):
+            return
+        missing = _is_missing(value)
+        lifetime = negative_ttl if missing else ttl
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), lifetime, 0.0 if missing else stale_ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float,
+                 negative_ttl: float) -> None:
+        try:
+            self._store(key, loader(), ttl, stale_ttl, negative_ttl)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            # Keep serving the stale value until it runs out
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning(f"Background refresh of {key[0]} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _submit(self, fn: Callable, *args) -> None:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, self.refresh_workers),
+                                                        thread_name_prefix="lambda-cache")
+        self._executor.submit(fn, *args)
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], Any], ttl: float, stale_ttl: float = 0.0,
+                    negative_ttl: float = 0.0) -> Any:
+        """Cached value for key, calling loader on a miss (or in the background when stale).
+
+        Exceptions from a synchronous load propagate to the caller and
+        nothing is cached; a failed background refresh keeps the stale value.
+        """
+        if not self.enabled or ttl <= 0:
+            return loader()
+
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored, lifetime, stale_for, value = entry
+                age = time.monotonic() - stored
+                if age < lifetime:
+                    self._entries.move_to_end(key)
+                    if _is_missing(value):
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    return value
+                if age < lifetime + stale_for:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        refresh = True
+                else:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+
+        if entry is not None:
+            if refresh:
+                self._submit(self._refresh, key, loader, ttl, stale_ttl, negative_ttl)
+            return entry[3]
+
+        value = loader()
+        self._store(key, value, ttl, stale_ttl, negative_ttl)
+        return value
+
+    def put_many(self, items: Iterable[Tuple[Tuple, Any]], ttl: float, stale_ttl: float = 0.0) -> int:
+        """Store pre-fetched values (e.g. every product from a full inventory listing)"""
+        count = 0
+        for key, value in items:
+            self._store(key, value, ttl, stale_ttl, 0.0)
+            count += 1
+        with self._lock:
+            self.warmed += count
+        return count
+
+    def warm(self, name: str, loader: Callable[[], Iterable[Tuple[Tuple, Any]]], ttl: float,
+             stale_ttl: float = 0.0) -> bool:
+        """Run a bulk loader in the background and store everything it yields.
+
+        Skipped when the same warm-up (by name) already ran within ttl seconds,
+        so calling it from every tool build is cheap.
+        """
+        if not self.enabled or ttl <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._warmed_at.get(name)
+            if last is not None and now - last < ttl:
+                return False
+            self._warmed_at[name] = now
+
+        def run():
+            try:
+                count = self.put_many(loader(), ttl, stale_ttl)
+                logger.info(f"Warmed Lambda cache with {count} entries from {name}")
+            except Exception as e:
+                with self._lock:
+                    self._warmed_at.pop(name, None)
+                logger.warning(f"Lambda cache warm-up from {name} failed: {e}")
+
+        self._submit(run)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "warmed": self.warmed,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_cache: Optional[LambdaCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_lambda_cache() -> LambdaCache:
+    """Return the process-wide Lambda result cache configured from the environment"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LambdaCache()
+    return _cache
@@ -0,0 +1,127 @@
+"""
+Lexical Index for Pet Store Agent
+BM25 inverted index over the indexed chunks, plus reciprocal rank fusion for hybrid retrieval
+"""
+
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+import math
+import re
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our "
+    "should that the this to what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens (keeps SKUs like dd006 intact) with naive plural folding"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank)"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, node_id in enumerate(ranking, start=1):
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents.
+
+    Each posting list holds ascending document numbers and the precomputed
+    length-normalized term weight, so scoring a query is a few vectorized
+    scatter-adds, one per distinct query term.
+    """
+
+    def __init__(self, doc_ids: Sequence[str], texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = list(doc_ids)
+        self._positions = {doc_id: doc for doc, doc_id in enumerate(self.doc_ids)}
+        doc_tokens = [tokenize(text) for text in texts]
+        lengths = np.asarray([len(tokens) for tokens in doc_tokens], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        term_docs: Dict[str, List[int]] = {}
+        term_freqs: Dict[str, List[int]] = {}
+        for doc, tokens in enumerate(doc_tokens):
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_docs.setdefault(token, []).append(doc)
+                term_freqs.setdefault(token, []).append(count)
+
+        count = len(self.doc_ids)
+        self.idf: Dict[str, float] = {}
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, docs in term_docs.items():
+            docs_array = np.asarray(docs, dtype=np.int64)
+            tf = np.asarray(term_freqs[term], dtype=np.float32)
+            norm = k1 * (1.0 - b + b * lengths[docs_array] / avg_length)
+            self.postings[term] = (docs_array, tf * (k1 + 1.0) / (tf + norm))
+            self.idf[term] = math.log(1.0 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+        # Terms missing from the corpus weigh as much as the rarest possible term
+        self.unseen_idf = math.log(1.0 + (count + 0.5) / 0.5)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                docs, weights = posting
+                scores[docs] += self.idf[term] * weights
+        return scores
+
+    def search(self, query: str, top_k: int,
+               allowed_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Best documents as (doc_id, bm25 score), skipping documents that match no term.
+
+        ``allowed_ids`` restricts the search to a subset (e.g. a metadata filter).
+        """
+        scores = self.scores(query)
+        if allowed_ids is not None:
+            allowed = np.zeros(len(self.doc_ids), dtype=bool)
+            allowed[[self._positions[i] for i in allowed_ids if i in self._positions]] = True
+            scores[~allowed] = 0.0
+        if not scores.size:
+            return []
+        k = min(top_k, scores.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.doc_ids[doc], float(scores[doc])) for doc in best if scores[doc] > 0]
+
+    def coverage(self, query: str, doc_id: str) -> float:
+        """IDF-weighted share of the query's terms that occur in a document (0..1).
+
+        Used as lexical confidence: an exact SKU or product-name query fully
+        covered by one chunk does not need a semantic search.
+        """
+        terms = set(tokenize(query))
+        total = sum(self.idf.get(term, self.unseen_idf) for term in terms)
+        doc = self._positions.get(doc_id)
+        if total <= 0 or doc is None:
+            return 0.0
+        matched = 0.0
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs = posting[0]
+            pos = np.searchsorted(docs, doc)
+            if pos < len(docs) and docs[pos] == doc:
+                matched += self.idf[term]
+        return matched / total
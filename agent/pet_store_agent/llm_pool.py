@@ -0,0 +1,123 @@
+"""
+Chat Model Pool for Pet Store Agent
+Reusable chat-model clients keyed by (provider, model id, region, temperature, max_tokens) with utilization stats
+"""
+
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import logging
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from aws_clients import client_stats
+
+logger = logging.getLogger(__name__)
+
+
+def model_key(provider: str, model_id: str, region: str, temperature: Any, max_tokens: Any) -> Tuple:
+    """Pool key; model_id is the resolved id, including any us./eu. inference-profile prefix"""
+    return (provider.lower(), model_id, region, float(temperature), int(max_tokens))
+
+
+class ModelUsage(BaseCallbackHandler):
+    """Counts calls in flight on one pooled model (LangChain invokes callbacks from any thread)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running: set = set()
+        self.calls = 0
+        self.errors = 0
+        self.peak_in_flight = 0
+
+    def _start(self, run_id) -> None:
+        with self._lock:
+            self._running.add(run_id)
+            self.peak_in_flight = max(self.peak_in_flight, len(self._running))
+
+    def _end(self, run_id, error: bool = False) -> None:
+        with self._lock:
+            if run_id in self._running:
+                self._running.discard(run_id)
+                self.calls += 1
+                self.errors += int(error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._running),
+                "peak_in_flight": self.peak_in_flight,
+                "calls": self.calls,
+                "errors": self.errors,
+            }
+
+
+class ModelPool:
+    """One chat-model instance per key, shared by every graph and request that uses it.
+
+    LangChain chat models are safe for concurrent calls; the Bedrock ones share
+    the pooled bedrock-runtime client from aws_clients, so warm connections
+    are reused across models and requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple, Tuple[Any, ModelUsage]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, factory: Callable[[List[BaseCallbackHandler]], Any]) -> Any:
+        """Pooled model for key; factory receives the callbacks to pass to the model constructor"""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            usage = ModelUsage()
+            model = factory([usage])
+            self._models[key] = (model, usage)
+        logger.info(f"Created pooled chat model {key[1]} ({key[0]}, {key[2]})")
+        return model
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = list(self._models.items())
+            hits, misses = self.hits, self.misses
+        return {
+            "models": len(models),
+            "hits": hits,
+            "misses": misses,
+            "in_flight": sum(usage.stats()["in_flight"] for _, (_, usage) in models),
+            # Compare peak_in_flight of Bedrock models with the connections each client may open
+            "max_pool_connections": client_stats()["max_pool_connections"],
+            "by_model": {
+                f"{provider}:{model_id}@{region} t={temperature} max={max_tokens}": usage.stats()
+                for (provider, model_id, region, temperature, max_tokens), (_, usage) in models
+            },
+        }
+
+
+_pool: Optional[ModelPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """Return the process-wide chat-model pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ModelPool()
+    return _pool
@@ -1,11 +1,13 @@
 import os
 import json
+import time
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, List, Set
-from uuid import uuid4
 
-import boto3
 import ldclient
 from ldclient import Context
 from ldclient.config import Config as LDConfig
@@ -14,13 +16,18 @@ from ldai.client import LDAIClient, AIAgentConfigRequest, AIAgentConfigDefault
 from ldai.tracker import TokenUsage
 
 from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
 
 # Tools are defined elsewhere; these should return LangChain/LangGraph-compatible tools
 # Example: TOOL_BUILDERS["get_inventory"](custom, aws_region) -> BaseTool
 from tool_registry import TOOL_BUILDERS
+from aws_clients import get_client
+from checkpointing import build_checkpointer
+from graph_cache import GraphCache, WarmContexts, graph_key
+from invocation_memo import invocation_scope
+from llm_pool import get_model_pool, model_key
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -30,6 +37,9 @@ logging.basicConfig(
 
 AGENT_KEY = os.getenv("LAUNCHDARKLY_AGENT_KEY", "pet-store-agent")
 
+# LaunchDarkly metric that receives the number of tool calls answered from the invocation memo
+TOOL_DEDUP_METRIC = os.getenv("LAUNCHDARKLY_TOOL_DEDUP_METRIC", "pet-store-tool-calls-deduplicated")
+
 DEFAULT_AGENT = AIAgentConfigDefault(enabled=False)
 
 @dataclass(frozen=True)
@@ -66,6 +76,14 @@ def _enabled_tool_names(rc: RuntimeConfig) -> Set[str]:
     names.discard(None)
     return names
 
+def _system_prompt(state: Dict[str, Any], config: Dict[str, Any]) -> List[Any]:
+    # Instructions arrive per call: LaunchDarkly interpolates user variables into them,
+    # so compiling them into the graph would mean one cached graph per user. They are passed
+    # as a message object because checkpoints copy plain-string configurable values into metadata.
+    system_message = (config.get("configurable") or {}).get("system_message")
+    messages = state["messages"]
+    return [system_message] + messages if system_message else messages
+
 def _collect_token_usage(messages: List[Any]) -> Optional[TokenUsage]:
     inp = out = total = 0
     for m in messages:
@@ -89,7 +107,13 @@ class PetStoreAgent:
             raise RuntimeError("LaunchDarkly SDK failed to initialize.")
 
         self.ai = LDAIClient(self.ld)
-        self.checkpointer = MemorySaver()
+        # Only conversations with a caller-supplied thread_id are checkpointed; bounded and evicting
+        self.checkpointer = build_checkpointer()
+
+        # Compiled graphs per variation; rebuilt only when the agent's LaunchDarkly config changes
+        self.graphs = GraphCache()
+        self.warm_contexts = WarmContexts()
+        self.ld.flag_tracker.add_listener(self._on_flag_change)
 
     def resolve(self, user_ctx: Optional[Dict[str, Any]] = None) -> RuntimeConfig:
         ctx = _build_ld_context(user_ctx)
@@ -166,77 +190,159 @@ class PetStoreAgent:
                 elif aws_region.startswith("eu-"):
                     model_id = f"eu.{model_id}"
 
-            # Create boto3 session with explicit profile if set
-            if os.environ.get('AWS_PROFILE'):
-                boto_session = boto3.Session(
-                    profile_name=os.environ.get('AWS_PROFILE'),
-                    region_name=aws_region
-                )
-                bedrock_client = boto_session.client(
-                    service_name='bedrock-runtime',
-                    region_name=aws_region
-                )
-            else:
-                # Use default credential chain
-                bedrock_client = boto3.client(
-                    service_name='bedrock-runtime',
-                    region_name=aws_region
-                )
-
-            # Use ChatBedrockConverse directly with the configured client
-            return ChatBedrockConverse(
+            # One pooled model per key, on the shared bedrock-runtime client (AWS_PROFILE is honoured there)
+            key = model_key(rc.provider_name, model_id, aws_region, temperature, max_tokens)
+            return get_model_pool().get(key, lambda callbacks: ChatBedrockConverse(
                 model=model_id,
-                client=bedrock_client,
+                client=get_client('bedrock-runtime', aws_region),
                 temperature=temperature,
-                max_tokens=max_tokens
-            )
+                max_tokens=max_tokens,
+                callbacks=callbacks
+            ))
         else:
             # Use init_chat_model for other providers
-            return init_chat_model(
+            key = model_key(rc.provider_name, rc.model_name, aws_region, temperature, max_tokens)
+            return get_model_pool().get(key, lambda callbacks: init_chat_model(
                 rc.model_name,
                 model_provider=rc.provider_name,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 region_name=aws_region,
-            )
-
-    def invoke(self, prompt: str, user_ctx: Optional[Dict[str, Any]] = None) -> str:
-        rc = self.resolve(user_ctx)
-        if not rc.enabled:
-            return json.dumps({"status": "Error", "message": "Service temporarily unavailable."})
+                callbacks=callbacks,
+            ))
 
+    def build_graph(self, rc: RuntimeConfig, stateful: bool = True):
         tools = self.build_tools(rc)
         llm = self.build_llm(rc)
 
-        graph = create_react_agent(
+        return create_react_agent(
             llm,
             tools,
-            prompt=rc.instructions,
-            checkpointer=self.checkpointer,  # enables thread_id persistence :contentReference[oaicite:6]{index=6}
+            prompt=RunnableLambda(_system_prompt),
+            # enables thread_id persistence :contentReference[oaicite:6]{index=6}; stateless graphs keep nothing
+            checkpointer=self.checkpointer if stateful else None,
         )
 
-        thread_id = (user_ctx or {}).get("thread_id") or f"thread-{uuid4().hex}"
-        input_ = {"messages": [HumanMessage(content=prompt)]}
-        config = {"configurable": {"thread_id": thread_id}}
+    def graph_for(self, rc: RuntimeConfig, stateful: bool = True):
+        """Compiled graph for a resolved config, built once per variation/model/tools/config hash"""
+        key = graph_key(rc.variation_key, rc.model_name, rc.provider_name, _enabled_tool_names(rc),
+                        rc.parameters, rc.custom) + (stateful,)
+        return self.graphs.get_or_build(key, lambda: self.build_graph(rc, stateful))
+
+    def prewarm(self, contexts: Optional[List[Optional[Dict[str, Any]]]] = None) -> int:
+        """Resolve each context and compile its variation's graph ahead of the first request"""
+        built = 0
+        for user_ctx in contexts if contexts is not None else (self.warm_contexts.contexts() or [None]):
+            try:
+                rc = self.resolve(user_ctx)
+                if rc.enabled:
+                    self.graph_for(rc, stateful=bool((user_ctx or {}).get("thread_id")))
+                    built += 1
+            except Exception as e:
+                logger.warning(f"Pre-warming agent graph failed: {e}")
+        return built
+
+    def stats(self) -> Dict[str, Any]:
+        """Process-level counters: compiled graphs, pooled models and checkpoint memory"""
+        return {
+            "graphs": self.graphs.stats(),
+            "models": get_model_pool().stats(),
+            "checkpointer": self.checkpointer.stats(),
+        }
 
-        tracker = rc.tracker
+    def _on_flag_change(self, change) -> None:
+        if change.key != AGENT_KEY:
+            return
+        dropped = self.graphs.invalidate()
+        logger.info(f"AI Config '{AGENT_KEY}' changed; dropped {dropped} compiled graphs, pre-warming")
+        # Listeners run on the SDK's notification thread, so compile elsewhere
+        threading.Thread(target=self.prewarm, name="graph-prewarm", daemon=True).start()
+
+    def _prepare(self, prompt: str, user_ctx: Optional[Dict[str, Any]]):
+        rc = self.resolve(user_ctx)
+        if not rc.enabled:
+            return rc, None, None, None
+
+        # Without a caller-supplied thread_id nobody can resume the conversation, so skip checkpointing
+        thread_id = (user_ctx or {}).get("thread_id")
+        graph = self.graph_for(rc, stateful=bool(thread_id))
+        self.warm_contexts.remember(rc.variation_key, user_ctx)
+
+        input_ = {"messages": [HumanMessage(content=prompt)]}
+        configurable: Dict[str, Any] = {"system_message": SystemMessage(content=rc.instructions)} \
+            if rc.instructions else {}
+        if thread_id:
+            configurable["thread_id"] = thread_id
+        return rc, graph, input_, {"configurable": configurable}
+
+    def _report_tool_calls(self, stats: Dict[str, Any], user_ctx: Optional[Dict[str, Any]]) -> None:
+        logger.info(f"Tool calls: {stats['tool_calls']}, deduplicated: {stats['deduplicated']} "
+                    f"{stats['deduplicated_by_tool'] or ''}")
+        if stats["deduplicated"]:
+            self.ld.track(TOOL_DEDUP_METRIC, _build_ld_context(user_ctx), metric_value=stats["deduplicated"])
+
+    def _flush_checkpoints(self) -> None:
+        """Persist this turn before answering, so the next one can be served by any replica"""
+        flush = getattr(self.checkpointer, "flush", None)
+        if flush is None:
+            return
         try:
-            result = tracker.track_duration_of(lambda: graph.invoke(input_, config))
-            tracker.track_success()
+            flush()
+        except Exception as e:
+            # Records stay buffered and are retried by the background flusher
+            logger.warning(f"Checkpoint flush failed: {e}")
 
-            usage = _collect_token_usage(result.get("messages", []))
-            if usage:
-                tracker.track_tokens(usage)
+    def _finish(self, rc: RuntimeConfig, result: Dict[str, Any]) -> str:
+        tracker = rc.tracker
+        tracker.track_success()
+
+        usage = _collect_token_usage(result.get("messages", []))
+        if usage:
+            tracker.track_tokens(usage)
+
+        # Return last AI message as JSON
+        msgs = result.get("messages", [])
+        last_ai = next((m for m in reversed(msgs) if isinstance(m, AIMessage)), None)
+        return last_ai.content if last_ai else json.dumps({"status": "Error", "message": "No response from agent."})
+
+    async def ainvoke(self, prompt: str, user_ctx: Optional[Dict[str, Any]] = None) -> str:
+        """Run the agent on the event loop; tool calls from one AI message run concurrently"""
+        # A cache miss evaluates the AI Config and compiles the graph; keep that off the event loop
+        rc, graph, input_, config = await asyncio.to_thread(self._prepare, prompt, user_ctx)
+        if graph is None:
+            return json.dumps({"status": "Error", "message": "Service temporarily unavailable."})
 
-            # Return last AI message as JSON
-            msgs = result.get("messages", [])
-            last_ai = next((m for m in reversed(msgs) if isinstance(m, AIMessage)), None)
-            return last_ai.content if last_ai else json.dumps({"status": "Error", "message": "No response from agent."})
+        tracker = rc.tracker
+        try:
+            # Repeated tool calls within this run are answered from a memo that ends with it
+            with invocation_scope() as memo:
+                started = time.perf_counter()
+                try:
+                    result = await graph.ainvoke(input_, config)
+                finally:
+                    # Failed runs are timed too, as track_duration_of did
+                    tracker.track_duration(int((time.perf_counter() - started) * 1000))
+            if "thread_id" in config["configurable"]:
+                await asyncio.to_thread(self._flush_checkpoints)
+            response = self._finish(rc, result)
+            self._report_tool_calls(memo.stats(), user_ctx)
+            return response
         except Exception as e:
             logger.error(f"Error during agent invocation: {str(e)}", exc_info=True)
             tracker.track_error()
             return json.dumps({"status": "Error", "message": "Temporary technical difficulties."})
 
+    def invoke(self, prompt: str, user_ctx: Optional[Dict[str, Any]] = None) -> str:
+        """Blocking entry point for sync callers; drives ainvoke on its own event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.ainvoke(prompt, user_ctx))
+
+        # Called from code already running an event loop: use a helper thread's loop instead
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.ainvoke(prompt, user_ctx)).result()
+
 # Alias for compatibility with query_agent.py
 PetStoreAgentFullLD = PetStoreAgent
 
@@ -0,0 +1,266 @@
+"""
+Product Catalog Index for Pet Store Agent
+Structured records parsed from data/products.txt with SKU lookup and a name/alias trie
+"""
+
+from typing import Dict, Any, List, Optional, Set, Tuple
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+SKU_PATTERN = re.compile(r"\b([A-Za-z]{2}\d{3})\b")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+SECTION_UNDERLINE = re.compile(r"^=+$")
+
+# Shortest query fragment (in characters) allowed to prefix-match a product name
+MIN_PREFIX_CHARS = 4
+
+# Words a product question uses around the product names themselves ("what is the price of ...")
+QUERY_WORDS = frozenset("""
+    a about and any are availability available both buy can cost costs details do does for get have
+    how i in info information is it its me much my need of on or please price prices product products
+    s sell sku stock tell the these this those to want what whats with you your
+""".split())
+
+
+def normalize_name(text: str) -> str:
+    return " ".join(WORD_PATTERN.findall(text.lower()))
+
+
+@dataclass
+class ProductRecord:
+    """One `Product:` block from the catalog"""
+    name: str
+    sku: str
+    price: Optional[float] = None
+    price_text: str = ""
+    category: str = ""
+    section: str = ""
+    description: str = ""
+    stock_status: str = ""
+    reorder_level: str = ""
+    fields: Dict[str, str] = field(default_factory=dict)
+    details: List[str] = field(default_factory=list)
+    text: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = asdict(self)
+        record.pop("text")
+        return record
+
+
+def parse_products(text: str) -> List[ProductRecord]:
+    """Parse `Key: value` product blocks; bullet lines are kept as details"""
+    records: List[ProductRecord] = []
+    section = ""
+    current: Optional[ProductRecord] = None
+    lines: List[str] = []
+    previous = ""
+
+    def finish():
+        if current is not None and current.sku:
+            current.text = "\n".join(lines).strip()
+            records.append(current)
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if SECTION_UNDERLINE.match(line) and previous:
+            # The line above the ==== underline is a section heading (e.g. DOG PRODUCTS),
+            # already appended to the product before it
+            if lines and lines[-1] == previous:
+                lines.pop()
+            finish()
+            current, lines = None, []
+            section = previous.title()
+        elif line.startswith("Product:"):
+            finish()
+            current = ProductRecord(name=line.split(":", 1)[1].strip(), sku="", section=section)
+            lines = [line]
+        elif current is not None and line:
+            lines.append(line)
+            if line.startswith("- ") or line.startswith("* "):
+                current.details.append(line[2:].strip())
+            elif ":" in line:
+                key, value = (part.strip() for part in line.split(":", 1))
+                if key == "SKU":
+                    current.sku = value.upper()
+                elif key == "Price":
+                    current.price_text = value
+                    match = re.search(r"\d+(?:\.\d+)?", value.replace(",", ""))
+                    current.price = float(match.group()) if match else None
+                elif key == "Category":
+                    current.category = value
+                elif key == "Description":
+                    current.description = value
+                elif key == "Stock Status":
+                    current.stock_status = value
+                elif key == "Reorder Level":
+                    current.reorder_level = value
+                elif value:
+                    # Anything else, e.g. "Special Offer"
+                    current.fields[key] = value
+        previous = line
+    finish()
+    return records
+
+
+class _TrieNode:
+    __slots__ = ("children", "skus")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.skus: Set[str] = set()
+
+
+class ProductCatalog:
+    """SKU -> record map plus a character trie over normalized names and aliases"""
+
+    def __init__(self, records: List[ProductRecord]):
+        from chunking import SPECIES_TERMS
+
+        self.records = records
+        self.by_sku: Dict[str, ProductRecord] = {r.sku: r for r in records}
+        # Words that only say which animal or what kind of product ("small pet", "cat toys")
+        self.generic_words: Set[str] = {word for terms in SPECIES_TERMS.values()
+                                        for term in terms for word in term.split()}
+        for record in records:
+            self.generic_words.update(normalize_name(f"{record.category} {record.section}").split())
+
+        owners: Dict[str, Set[str]] = {}
+        for record in records:
+            for alias in self.aliases(record):
+                owners.setdefault(alias, set()).add(record.sku)
+        self._root = _TrieNode()
+        for record in records:
+            full_name = normalize_name(record.name)
+            for alias in self.aliases(record):
+                # Partial names must point at one product and say more than a species/category
+                if alias == full_name or (len(owners[alias]) == 1 and not self.is_generic(alias)):
+                    self._insert(alias, record.sku)
+
+    @staticmethod
+    def aliases(record: ProductRecord) -> Set[str]:
+        """Full normalized name plus every leading run of two or more words.
+
+        "Bark Park Buddy Water Bottles" is also reachable as "bark park" and
+        "bark park buddy"; single words are too ambiguous to alias.
+        """
+        words = normalize_name(record.name).split()
+        aliases = {" ".join(words[:n]) for n in range(2, len(words) + 1)}
+        aliases.add(" ".join(words))
+        return aliases
+
+    def is_generic(self, phrase: str) -> bool:
+        """True when every word is a species or category word ("small pet", "cat toys")"""
+        words = phrase.split()
+        return bool(words) and all(word in self.generic_words for word in words)
+
+    def _insert(self, alias: str, sku: str) -> None:
+        node = self._root
+        for char in alias:
+            node = node.children.setdefault(char, _TrieNode())
+        node.skus.add(sku)
+
+    @staticmethod
+    def _subtree_skus(node: _TrieNode) -> Set[str]:
+        skus: Set[str] = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            skus.update(current.skus)
+            stack.extend(current.children.values())
+        return skus
+
+    def _match_at(self, text: str, start: int) -> Tuple[Set[str], int]:
+        """Longest alias starting at a word boundary; a query ending mid-name prefix-matches"""
+        node = self._root
+        best: Set[str] = set()
+        best_end = start
+        pos = start
+        while pos < len(text):
+            node = node.children.get(text[pos])
+            if node is None:
+                return best, best_end
+            pos += 1
+            if node.skus and (pos == len(text) or text[pos] == " "):
+                best, best_end = node.skus, pos
+        # Ran out of query inside the trie: fuzzy prefix match on whatever completes it,
+        # as long as more than one word was typed ("doggy del", not just "whiskers") and
+        # they name more than an animal ("small pet" alone is not "Small Pet Starter Kit")
+        typed = text[start:pos]
+        if pos - start >= MIN_PREFIX_CHARS and " " in typed and not self.is_generic(typed):
+            completions = self._subtree_skus(node)
+            if len(completions) == 1:
+                return completions, pos
+        return best, best_end
+
+    def lookup(self, query: str) -> List[ProductRecord]:
+        """Products named in the query, by SKU or by unambiguous name/alias"""
+        return self.resolve(query)[0]
+
+    def resolve(self, query: str) -> Tuple[List[ProductRecord], List[str]]:
+        """Products named in the query plus the words none of them account for.
+
+        A leftover word that is not question phrasing, a species/category word
+        or part of a matched product's name may be another product the catalog
+        does not know ("Meow Munchies and Doggy Delights" leaves "meow munchies"),
+        so callers only skip RAG when the second list is empty.
+        """
+        found: Dict[str, ProductRecord] = {}
+        for sku in SKU_PATTERN.findall(query):
+            record = self.by_sku.get(sku.upper())
+            if record:
+                found[record.sku] = record
+
+        text = normalize_name(query)
+        leftover: List[str] = []
+        pos = 0
+        while pos < len(text):
+            skus, end = self._match_at(text, pos)
+            if len(skus) == 1:
+                sku = next(iter(skus))
+                found.setdefault(sku, self.by_sku[sku])
+                pos = end
+            else:
+                next_space = text.find(" ", pos)
+                leftover.append(text[pos:next_space if next_space >= 0 else len(text)])
+                if next_space < 0:
+                    break
+                pos = next_space
+            pos += 1
+
+        known = set(QUERY_WORDS) | self.generic_words
+        for record in found.values():
+            known.update(normalize_name(f"{record.name} {record.sku}").split())
+        return list(found.values()), [word for word in leftover if word not in known]
+
+
+_catalogs: Dict[str, Tuple[int, ProductCatalog]] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_product_catalog(path: Path) -> Optional[ProductCatalog]:
+    """Parse the catalog file once per process, re-parsing only when it changes"""
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    key = str(path.resolve())
+    cached = _catalogs.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _catalogs_lock:
+        cached = _catalogs.get(key)
+        if cached is None or cached[0] != mtime:
+            catalog = ProductCatalog(parse_products(path.read_text()))
+            logger.info(f"Parsed {len(catalog.records)} products from {path}")
+            cached = (mtime, catalog)
+            _catalogs[key] = cached
+    return cached[1]
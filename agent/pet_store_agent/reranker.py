@@ -0,0 +1,120 @@
+"""
+Local Re-ranking for Pet Store Agent
+Re-scores over-fetched candidates (dense score, BM25 term coverage, product fields) and cuts at a score gap
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Weights of the three signals in the combined score (each signal is in 0..1)
+DENSE_WEIGHT = 0.5
+LEXICAL_WEIGHT = 0.3
+PRODUCT_WEIGHT = 0.2
+
+# Query words that ask for a specific catalog field, and the field label in the chunk text
+FIELD_WORDS = {
+    "price": "price:", "cost": "price:", "costs": "price:", "much": "price:",
+    "stock": "stock status:", "available": "stock status:", "availability": "stock status:",
+    "category": "category:", "reorder": "reorder level:", "sku": "sku:", "offer": "special offer:",
+}
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def _product_match(text: str, products: List[Any], fields: List[str]) -> float:
+    """1.0 if the chunk names a product the query names, 0.5 if it carries a field the query asks about"""
+    lowered = text.lower()
+    for product in products:
+        if product.sku.lower() in lowered or product.name.lower() in lowered:
+            return 1.0
+    if any(label in lowered for label in fields):
+        return 0.5
+    return 0.0
+
+
+def rerank(query: str, nodes: List[Any], lexical: Any = None, catalog: Any = None) -> List[Any]:
+    """Return the candidates re-scored and sorted by the combined local score.
+
+    The retriever's score is scaled by the best candidate's score so cosine,
+    BM25 and fused scores all land in 0..1. Scores are written to copies, so
+    cached results are left untouched.
+    """
+    if not nodes:
+        return []
+    from llama_index.core.schema import NodeWithScore
+
+    best = max((n.score or 0.0) for n in nodes)
+    products = catalog.lookup(query) if catalog is not None else []
+    fields = sorted({FIELD_WORDS[w] for w in WORD_PATTERN.findall(query.lower()) if w in FIELD_WORDS})
+
+    rescored = []
+    for node_with_score in nodes:
+        dense = max(node_with_score.score or 0.0, 0.0) / best if best > 0 else 0.0
+        coverage = lexical.coverage(query, node_with_score.node.node_id) if lexical is not None else 0.0
+        product = _product_match(node_with_score.node.get_content(), products, fields)
+        score = DENSE_WEIGHT * dense + LEXICAL_WEIGHT * coverage + PRODUCT_WEIGHT * product
+        rescored.append(NodeWithScore(node=node_with_score.node, score=score))
+    rescored.sort(key=lambda n: n.score, reverse=True)
+    return rescored
+
+
+def adaptive_cut(nodes: List[Any], max_k: int, max_gap: float = 0.15, min_relevance: float = 0.25,
+                 min_k: int = 1) -> List[Any]:
+    """Keep ranked nodes until the score drops by more than max_gap or below min_relevance.
+
+    A precise query whose best chunk stands out keeps one or two results;
+    a broad query with evenly scored chunks keeps up to max_k.
+    """
+    selected: List[Any] = []
+    for node in nodes[:max_k]:
+        if len(selected) >= min_k:
+            if node.score < min_relevance or selected[-1].score - node.score > max_gap:
+                break
+        selected.append(node)
+    return selected
+
+
+class RerankStats:
+    """Process-wide counts of candidates considered and results kept"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.candidates = 0
+        self.selected = 0
+
+    def record(self, candidates: int, selected: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.candidates += candidates
+            self.selected += selected
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "candidates": self.candidates,
+                "selected": self.selected,
+                "avg_selected": self.selected / self.calls if self.calls else 0.0,
+            }
+
+
+_stats = RerankStats()
+
+
+def get_rerank_stats() -> RerankStats:
+    return _stats
+
+
+def select_adaptive(query: str, nodes: List[Any], similarity_top_k: int, options: Dict[str, Any],
+                    lexical: Any = None, catalog: Optional[Any] = None) -> List[Any]:
+    """Re-rank over-fetched candidates and keep an adaptive number of them (at most similarity_top_k)"""
+    ranked = rerank(query, nodes, lexical=lexical, catalog=catalog)
+    selected = adaptive_cut(ranked, similarity_top_k, max_gap=options["max_gap"],
+                            min_relevance=options["min_relevance"])
+    _stats.record(len(nodes), len(selected))
+    logger.debug(f"Adaptive top-k kept {len(selected)}/{len(nodes)} candidates for '{query}'")
+    return selected
@@ -0,0 +1,111 @@
+"""
+Retrieval Result Cache for Pet Store Agent
+TTL + LRU cache of final retrieval results keyed by storage dir, index version, normalized query and options
+"""
+
+from typing import Dict, Any, Hashable, Optional, Tuple
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+from embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment (the cache is process-wide, not per LaunchDarkly variation)
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.environ.get("RETRIEVAL_CACHE_TTL", "300"))
+
+
+def result_key(storage_dir: str, version: Hashable, query: str, similarity_top_k: int,
+               options: Dict[str, Any]) -> Tuple:
+    """Cache key: the index version makes entries from a previous build unreachable"""
+    return (storage_dir, hash(version), normalize_query(query), similarity_top_k,
+            tuple(sorted(options.items())))
+
+
+class ResultCache:
+    """Thread-safe LRU of retrieval results whose entries expire after ttl seconds.
+
+    Values are stored as-is and shared between callers, so they must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, storage_dir: str) -> int:
+        """Drop every entry for a storage directory (called when its index is reloaded)"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == storage_dir]
+            for key in stale:
+                del self._entries[key]
+            self.invalidated += len(stale)
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached retrieval results for {storage_dir}")
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide retrieval result cache configured from the environment"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,366 @@
+"""
+Retrieval Engine for Pet Store Agent
+Process-wide cache of LlamaIndex storage directories shared by the RAG tools
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
+from pathlib import Path
+import logging
+import os
+import threading
+import time
+
+from aws_clients import get_client
+from result_cache import get_result_cache, result_key
+
+logger = logging.getLogger(__name__)
+
+# Same model used to create storage
+EMBED_MODEL_NAME = "amazon.titan-embed-text-v2:0"
+
+# How often (seconds) a query may re-stat the storage files to detect a rebuild
+RELOAD_CHECK_INTERVAL = float(os.environ.get("RETRIEVAL_RELOAD_CHECK_INTERVAL", "5"))
+
+
+def resolve_storage_dir(storage_dir_name: str) -> Path:
+    """Resolve a LaunchDarkly storage dir setting relative to this package"""
+    return Path(__file__).parent / storage_dir_name.lstrip("./")
+
+
+def storage_fingerprint(storage_dir: Path) -> Tuple:
+    """Cheap change detector for a storage directory: (name, mtime, size) of every file"""
+    entries = []
+    if storage_dir.is_dir():
+        for path in sorted(storage_dir.iterdir()):
+            if path.is_file():
+                stat = path.stat()
+                entries.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+_embed_models: Dict[str, Any] = {}
+_embed_models_lock = threading.Lock()
+
+
+def get_embed_model(aws_region: str):
+    """Return the shared (query-cached) BedrockEmbedding for a region, creating it on first use"""
+    embed_model = _embed_models.get(aws_region)
+    if embed_model is not None:
+        return embed_model
+
+    with _embed_models_lock:
+        embed_model = _embed_models.get(aws_region)
+        if embed_model is None:
+            from llama_index.embeddings.bedrock import BedrockEmbedding
+
+            # Shared pooled client per (region, profile); AWS_PROFILE is honoured by the factory
+            bedrock_client = get_client('bedrock-runtime', aws_region)
+
+            from embedding_cache import CachedEmbedding, get_embedding_cache
+
+            embed_model = CachedEmbedding(
+                BedrockEmbedding(
+                    model_name=EMBED_MODEL_NAME,
+                    client=bedrock_client
+                ),
+                get_embedding_cache()
+            )
+            _embed_models[aws_region] = embed_model
+    return embed_model
+
+
+@dataclass
+class IndexSnapshot:
+    """An immutable view of one loaded storage directory.
+
+    Queries hold a reference to the snapshot they started with, so a reload
+    swapping in a new snapshot never affects an in-flight retrieval.
+    """
+    index: Any
+    vector_store: Any
+    fingerprint: Tuple
+    loaded_at: float
+    retrievers: Dict[Tuple, Any] = field(default_factory=dict)
+    derived: Dict[str, Any] = field(default_factory=dict)
+    derived_lock: Any = field(default_factory=threading.Lock)
+
+    def retriever(self, similarity_top_k: int, filters: Optional[Dict[str, Any]] = None,
+                  **search_options: Any):
+        key = (similarity_top_k, tuple(sorted((filters or {}).items())), tuple(sorted(search_options.items())))
+        retriever = self.retrievers.get(key)
+        if retriever is None:
+            from llama_index.core.vector_stores.types import MetadataFilter, MetadataFilters
+
+            # Use retriever directly to avoid LLM requirement
+            retriever = self.index.as_retriever(
+                similarity_top_k=similarity_top_k,
+                filters=MetadataFilters(
+                    filters=[MetadataFilter(key=k, value=v) for k, v in filters.items()]
+                ) if filters else None,
+                vector_store_kwargs=search_options
+            )
+            self.retrievers[key] = retriever
+        return retriever
+
+    def allowed_ids(self, filters: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """Node ids matching equality filters, from the vector store's posting lists"""
+        rows = self.vector_store.rows_matching(filters) if filters else None
+        if rows is None:
+            return None
+        ids = self.vector_store.state.ids
+        return [ids[row] for row in rows]
+
+    def nodes(self) -> List[Any]:
+        """Docstore nodes behind the vector store entries"""
+        docstore = self.index.docstore
+        return [docstore.get_node(node_id) for node_id in self.index.index_struct.nodes_dict.values()]
+
+    def lexical_index(self):
+        """BM25 index over this snapshot's chunks, built on first use"""
+        lexical = self.derived.get("bm25")
+        if lexical is None:
+            with self.derived_lock:
+                lexical = self.derived.get("bm25")
+                if lexical is None:
+                    from lexical_index import BM25Index
+
+                    nodes = self.nodes()
+                    lexical = BM25Index([n.node_id for n in nodes], [n.get_content() for n in nodes])
+                    self.derived["bm25"] = lexical
+        return lexical
+
+    def nodes_with_scores(self, scored_ids: List[Tuple[str, float]]) -> List[Any]:
+        from llama_index.core.schema import NodeWithScore
+
+        docstore = self.index.docstore
+        return [NodeWithScore(node=docstore.get_node(node_id), score=score) for node_id, score in scored_ids]
+
+
+class RetrievalEngine:
+    """Loads a storage directory once and serves retrievals from memory.
+
+    The embedding model is passed to the index explicitly, so the global
+    LlamaIndex ``Settings`` are never touched and engines for different
+    regions can coexist in one process.
+    """
+
+    def __init__(self, storage_dir: Path, aws_region: str):
+        self.storage_dir = Path(storage_dir)
+        self.aws_region = aws_region
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._last_check = 0.0
+        # Fingerprint of a rebuild that failed to load; retried only once the files change again
+        self._failed_fingerprint: Optional[Tuple] = None
+        self.loads = 0
+        self.lexical_only = 0
+
+    def _load(self, fingerprint: Tuple) -> IndexSnapshot:
+        from llama_index.core import StorageContext, load_index_from_storage
+        from binary_index import load_vector_store
+        from shared_docstore import load_shared_docstore
+
+        started = time.perf_counter()
+        # Memory-maps the binary vector block and node texts when present, else parses the JSON files;
+        # mapped files are shared through the page cache by every worker process on the host
+        vector_store = load_vector_store(self.storage_dir)
+        if len(vector_store) and vector_store.state.ivf_index() is None:
+            # No persisted IVF index (storage built before ingest.py wrote one): cluster now, while
+            # loading, so queries with llamaindex_ann_index=ivf never wait for k-means
+            vector_store.state.build_ivf_index()
+        storage_context = StorageContext.from_defaults(
+            persist_dir=str(self.storage_dir),
+            vector_store=vector_store,
+            docstore=load_shared_docstore(self.storage_dir)
+        )
+        index = load_index_from_storage(
+            storage_context,
+            embed_model=get_embed_model(self.aws_region)
+        )
+        self.loads += 1
+        logger.info(
+            f"Loaded index from {self.storage_dir} in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms (load #{self.loads})"
+        )
+        return IndexSnapshot(
+            index=index,
+            vector_store=vector_store,
+            fingerprint=fingerprint,
+            loaded_at=time.time()
+        )
+
+    def snapshot(self) -> IndexSnapshot:
+        """Return the current snapshot, reloading first if the storage files changed"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._last_check < RELOAD_CHECK_INTERVAL:
+            return snapshot
+
+        with self._load_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._last_check < RELOAD_CHECK_INTERVAL:
+                return snapshot
+
+            fingerprint = storage_fingerprint(self.storage_dir)
+            if snapshot is None or fingerprint not in (snapshot.fingerprint, self._failed_fingerprint):
+                try:
+                    new_snapshot = self._load(fingerprint)
+                except Exception as e:
+                    if snapshot is None:
+                        raise
+                    # Keep serving the previous index if a rebuild is half-written
+                    logger.error(f"Error reloading index from {self.storage_dir}: {e}")
+                    self._failed_fingerprint = fingerprint
+                    new_snapshot = snapshot
+                if snapshot is not None:
+                    # The directory was rebuilt: drop its cached results even if the new build failed to load
+                    get_result_cache().invalidate(str(self.storage_dir))
+                # Atomic swap: readers see either the old or the new snapshot
+                self._snapshot = snapshot = new_snapshot
+            self._last_check = time.monotonic()
+        return snapshot
+
+    @staticmethod
+    def _cache_options(mode: str, lexical_confidence: float, filters: Optional[Dict[str, Any]],
+                       search_options: Dict[str, Any]) -> Dict[str, Any]:
+        options = dict(search_options, mode=mode)
+        if mode != "vector":
+            options["lexical_confidence"] = lexical_confidence
+        if filters:
+            options["filters"] = tuple(sorted(filters.items()))
+        return options
+
+    def retrieve(self, query: str, similarity_top_k: int, mode: str = "vector",
+                 lexical_confidence: float = 0.8, filters: Optional[Dict[str, Any]] = None,
+                 **search_options: Any) -> List[Any]:
+        """Retrieve the top nodes for a query from the current snapshot.
+
+        ``mode`` is ``vector`` (dense only), ``hybrid`` (BM25 and dense fused with
+        reciprocal rank fusion) or ``lexical`` (BM25 only, dense as a fallback
+        when nothing matches). In hybrid mode a BM25 hit covering at least
+        ``lexical_confidence`` of the query terms is returned without embedding
+        the query. ``filters`` (metadata key -> value, e.g. ``{"species": "dog"}``)
+        restrict both searches to one partition of the index. ``search_options``
+        are passed to NumpyVectorStore.query (e.g. precision, rescore_candidates).
+
+        Results are cached per snapshot, so a repeated question skips both the
+        embedding call and the search until the TTL expires or the index changes.
+        """
+        snapshot = self.snapshot()
+        cache = get_result_cache()
+        key = result_key(str(self.storage_dir), snapshot.fingerprint, query, similarity_top_k,
+                         self._cache_options(mode, lexical_confidence, filters, search_options))
+        nodes = cache.get(key)
+        if nodes is None:
+            nodes = self._retrieve(snapshot, query, similarity_top_k, mode, lexical_confidence,
+                                   filters, search_options)
+            cache.put(key, nodes)
+        return nodes
+
+    def _retrieve(self, snapshot: IndexSnapshot, query: str, similarity_top_k: int, mode: str,
+                  lexical_confidence: float, filters: Optional[Dict[str, Any]],
+                  search_options: Dict[str, Any]) -> List[Any]:
+        if mode == "vector":
+            return snapshot.retriever(similarity_top_k, filters, **search_options).retrieve(query)
+
+        from lexical_index import reciprocal_rank_fusion
+
+        lexical = snapshot.lexical_index()
+        lexical_hits = lexical.search(query, similarity_top_k, allowed_ids=snapshot.allowed_ids(filters))
+        if lexical_hits and (mode == "lexical" or
+                             lexical.coverage(query, lexical_hits[0][0]) >= lexical_confidence):
+            self.lexical_only += 1
+            return snapshot.nodes_with_scores(lexical_hits)
+
+        vector_nodes = snapshot.retriever(similarity_top_k, filters, **search_options).retrieve(query)
+        if not lexical_hits:
+            return vector_nodes
+
+        fused = reciprocal_rank_fusion([
+            [n.node.node_id for n in vector_nodes],
+            [node_id for node_id, _ in lexical_hits],
+        ])
+        return snapshot.nodes_with_scores(fused[:similarity_top_k])
+
+    def retrieve_batch(self, queries: List[str], similarity_top_k: int,
+                       filters: Optional[Dict[str, Any]] = None,
+                       **search_options: Any) -> List[List[Any]]:
+        """Dense retrieval for several queries: one embedding round and one matrix search.
+
+        Queries already in the result cache are answered from it; only the
+        rest are embedded and searched.
+        """
+        if not queries:
+            return []
+        snapshot = self.snapshot()
+        cache = get_result_cache()
+        options = self._cache_options("vector", 0.0, filters, search_options)
+        keys = [result_key(str(self.storage_dir), snapshot.fingerprint, q, similarity_top_k, options)
+                for q in queries]
+        results: List[Optional[List[Any]]] = [cache.get(key) for key in keys]
+        pending = [position for position, nodes in enumerate(results) if nodes is None]
+        if not pending:
+            return results
+
+        embed_model = get_embed_model(self.aws_region)
+        pending_queries = [queries[p] for p in pending]
+        if hasattr(embed_model, "get_query_embeddings"):
+            embeddings = embed_model.get_query_embeddings(pending_queries)
+        else:
+            embeddings = [embed_model.get_query_embedding(q) for q in pending_queries]
+
+        nodes_dict = snapshot.index.index_struct.nodes_dict
+        searches = snapshot.vector_store.search_batch(embeddings, similarity_top_k, filters=filters,
+                                                      **search_options)
+        for position, (ids, scores) in zip(pending, searches):
+            nodes = snapshot.nodes_with_scores(
+                [(nodes_dict.get(i, i), score) for i, score in zip(ids, scores)]
+            )
+            cache.put(keys[position], nodes)
+            results[position] = nodes
+        return results
+
+    def lexical_index(self):
+        """BM25 index of the current snapshot (used for local re-ranking)"""
+        return self.snapshot().lexical_index()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "storage_dir": str(self.storage_dir),
+            "loads": self.loads,
+            "lexical_only": self.lexical_only,
+            "nodes": len(snapshot.vector_store) if snapshot is not None else 0,
+        }
+
+
+_engines: Dict[Tuple[str, str], RetrievalEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_retrieval_engine(storage_dir: Path, aws_region: str) -> RetrievalEngine:
+    """Return the process-wide engine for a storage directory and region"""
+    key = (str(Path(storage_dir).resolve()), aws_region)
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = RetrievalEngine(storage_dir, aws_region)
+                _engines[key] = engine
+    return engine
+
+
+def retrieval_stats() -> Dict[str, Any]:
+    """Counters from every engine and the shared caches, for monitoring"""
+    from context_payload import get_payload_stats
+    from embedding_cache import get_embedding_cache
+    from reranker import get_rerank_stats
+
+    return {
+        "engines": [engine.stats() for engine in list(_engines.values())],
+        "result_cache": get_result_cache().stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "context_payload": get_payload_stats().stats(),
+        "rerank": get_rerank_stats().stats(),
+    }
@@ -0,0 +1,151 @@
+"""
+Shared Docstore for Pet Store Agent
+Read-only, memory-mapped node store so worker processes on one host share chunk text instead of copying it
+
+Layout inside a storage directory (written next to docstore.json):
+    docstore.kv.bin   every stored JSON value back to back (UTF-8)
+    docstore.kv.json  per collection: keys and byte offsets into docstore.kv.bin
+
+Each process maps docstore.kv.bin read-only, so its pages live once in the OS page
+cache however many workers attach; a node is decoded only when it is retrieved.
+Putting the storage directory on tmpfs (e.g. /dev/shm) keeps those pages in RAM,
+like a multiprocessing.shared_memory segment, without a process owning the segment.
+
+Only the bulk data is shared: this text blob and the embedding matrix
+(default__vector_store.npy, see binary_index.py). Each worker still builds its
+own copy of the small structures - the key/offset header from docstore.kv.json,
+the node id/metadata lists from default__vector_store.meta.json, the metadata
+PostingIndex (vector_store.py) and the BM25 index (lexical_index.py). These grow
+with the number of chunks, not with their size, so per-worker memory is flat in
+text and vectors but not zero.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import mmap
+import numpy as np
+
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+class ReadOnlyStoreError(PermissionError):
+    """A write was attempted on the memory-mapped docstore, which only ingest.py/binary_index.py produce"""
+
+
+def docstore_json_path(storage_dir: Path) -> Path:
+    return Path(storage_dir) / "docstore.json"
+
+
+def blob_path(storage_dir: Path) -> Path:
+    return Path(storage_dir) / "docstore.kv.bin"
+
+
+def index_path(storage_dir: Path) -> Path:
+    return Path(storage_dir) / "docstore.kv.json"
+
+
+def has_shared_docstore(storage_dir: Path) -> bool:
+    """True when the mapped layout exists and is at least as new as docstore.json"""
+    blob, index = blob_path(storage_dir), index_path(storage_dir)
+    if not (blob.exists() and index.exists()):
+        return False
+    source = docstore_json_path(storage_dir)
+    if source.exists() and source.stat().st_mtime_ns > min(blob.stat().st_mtime_ns, index.stat().st_mtime_ns):
+        logger.warning(f"Shared docstore in {storage_dir} is older than {source.name}; ignoring it")
+        return False
+    return True
+
+
+def write_shared_docstore(storage_dir: Path) -> int:
+    """Convert docstore.json into the mapped layout; returns the number of stored nodes"""
+    from binary_index import _atomic_write
+
+    with open(docstore_json_path(storage_dir), "r") as f:
+        collections: Dict[str, Dict[str, Any]] = json.load(f)
+
+    chunks: List[bytes] = []
+    header: Dict[str, Any] = {"version": FORMAT_VERSION, "collections": {}}
+    position = 0
+    for name, values in collections.items():
+        keys = list(values.keys())
+        offsets = [position]
+        for key in keys:
+            encoded = json.dumps(values[key], separators=(",", ":")).encode("utf-8")
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets.append(position)
+        header["collections"][name] = {"keys": keys, "offsets": offsets}
+
+    # Blob first: the index file is what marks the pair as complete
+    _atomic_write(blob_path(storage_dir), lambda f: f.writelines(chunks))
+    _atomic_write(index_path(storage_dir), lambda f: f.write(json.dumps(header, separators=(",", ":")).encode("utf-8")))
+    data = collections.get("docstore/data", {})
+    return len(data)
+
+
+class MmapKVStore(BaseKVStore):
+    """Read-only key-value store over a memory-mapped blob; values are decoded on every get"""
+
+    def __init__(self, blob: Path, index: Path):
+        with open(index, "r") as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported shared docstore version {header.get('version')} in {index}")
+
+        self._collections: Dict[str, Tuple[Dict[str, int], np.ndarray]] = {}
+        for name, entry in header["collections"].items():
+            positions = {key: i for i, key in enumerate(entry["keys"])}
+            self._collections[name] = (positions, np.asarray(entry["offsets"], dtype=np.int64))
+
+        with open(blob, "rb") as f:
+            size = f.seek(0, 2)
+            # mmap cannot map an empty file
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def _read(self, collection: str, position: int) -> dict:
+        offsets = self._collections[collection][1]
+        return json.loads(self._buffer[offsets[position]:offsets[position + 1]])
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        entry = self._collections.get(collection)
+        if entry is None or key not in entry[0]:
+            return None
+        return self._read(collection, entry[0][key])
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        return self.get(key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        entry = self._collections.get(collection)
+        if entry is None:
+            return {}
+        return {key: self._read(collection, position) for key, position in entry[0].items()}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        return self.get_all(collection)
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        raise ReadOnlyStoreError("The shared docstore is read-only; rebuild it with ingest.py or binary_index.py")
+
+    async def aput(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put(key, val, collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        raise ReadOnlyStoreError("The shared docstore is read-only; rebuild it with ingest.py or binary_index.py")
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection)
+
+
+def load_shared_docstore(storage_dir: Path) -> Optional[KVDocumentStore]:
+    """Docstore backed by the mapped layout, or None to fall back to parsing docstore.json"""
+    if not has_shared_docstore(storage_dir):
+        return None
+    return KVDocumentStore(MmapKVStore(blob_path(storage_dir), index_path(storage_dir)))
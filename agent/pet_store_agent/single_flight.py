@@ -0,0 +1,113 @@
+"""
+Single-Flight Tool Calls for Pet Store Agent
+Concurrent identical tool calls (same tool, config and arguments) share one execution and its result
+"""
+
+from typing import Callable, Dict, Any, Hashable, Optional
+from concurrent.futures import Future
+import functools
+import hashlib
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def call_key(*parts: Any) -> str:
+    """Canonical key for a call: argument order and dict ordering do not matter"""
+    encoded = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key onto one in-flight execution.
+
+    The first caller (the leader) runs the function; callers arriving while it
+    runs wait for its result, or re-raise its exception. Nothing is kept once
+    the call finishes, so this never serves stale data - see lambda_cache.py
+    and result_cache.py for caching across time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.by_tool: Dict[str, int] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], label: str = "") -> Any:
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                self.by_tool[label] = self.by_tool.get(label, 0) + 1
+
+        if not leader:
+            logger.debug(f"Coalesced {label or 'call'} onto an in-flight execution")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "coalesced_rate": self.coalesced / self.calls if self.calls else 0.0,
+                "coalesced_by_tool": dict(self.by_tool),
+                "in_flight": len(self._inflight),
+            }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group shared by all tools"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
+
+
+def coalesce_tool(tool_obj: Any, scope: str) -> Any:
+    """Route a LangChain tool's function through the single-flight group.
+
+    ``scope`` identifies the configuration the tool was built with (e.g. a hash
+    of the LaunchDarkly custom params and region), so identical arguments under
+    different configurations never share a result.
+    """
+    func = getattr(tool_obj, "func", None)
+    if func is None:
+        return tool_obj
+    group = get_single_flight()
+
+    @functools.wraps(func)
+    def coalesced(*args, **kwargs):
+        key = call_key(tool_obj.name, scope, args, kwargs)
+        return group.do(key, lambda: func(*args, **kwargs), label=tool_obj.name)
+
+    tool_obj.func = coalesced
+    return tool_obj
@@ -0,0 +1,74 @@
+"""
+Shared test setup for Pet Store Agent
+The agent modules import each other by bare name, so their directory goes on sys.path
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PACKAGE_DIR))
+
+# Vector size for stub-ingested storage; small keeps ingest and k-means fast
+STUB_DIM = 32
+STUB_REGION = "stub-region"
+
+
+@pytest.fixture
+def stub_package(tmp_path, monkeypatch) -> Path:
+    """A package directory holding a copy of data/products.txt, ingested into ./storage by `ingest_stub`"""
+    import ingest
+
+    (tmp_path / "data").mkdir()
+    shutil.copy(PACKAGE_DIR / "data" / "products.txt", tmp_path / "data" / "products.txt")
+    monkeypatch.setattr(ingest, "PACKAGE_DIR", tmp_path)
+    monkeypatch.setattr(ingest, "INDEXES", {
+        "products": {"storage_dir": "storage", "sources": {"data/products.txt": "catalog"}},
+    })
+    return tmp_path
+
+
+@pytest.fixture
+def ingest_stub(stub_package):
+    """Build (or rebuild) the stub package's storage with deterministic embeddings; returns the summary"""
+    import ingest
+
+    def build(embedder=None):
+        return ingest.build_index("products", embedder or ingest.StubEmbedder(STUB_DIM), workers=2, rps=0)
+
+    return build
+
+
+@pytest.fixture
+def stub_engine(stub_package, ingest_stub, monkeypatch):
+    """RetrievalEngine over the stub storage, with a fresh result cache and stub query embeddings"""
+    import result_cache
+    import retrieval_engine
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+    from llama_index.core.bridge.pydantic import PrivateAttr
+
+    from ingest import StubEmbedder
+
+    class StubQueryEmbedding(BaseEmbedding):
+        _embedder: StubEmbedder = PrivateAttr()
+
+        def __init__(self, **kwargs):
+            super().__init__(model_name=f"stub-{STUB_DIM}", **kwargs)
+            self._embedder = StubEmbedder(STUB_DIM)
+
+        def _get_query_embedding(self, query):
+            return self._embedder(query)
+
+        def _get_text_embedding(self, text):
+            return self._embedder(text)
+
+        async def _aget_query_embedding(self, query):
+            return self._embedder(query)
+
+    ingest_stub()
+    monkeypatch.setitem(retrieval_engine._embed_models, STUB_REGION, StubQueryEmbedding())
+    monkeypatch.setattr(result_cache, "_cache", result_cache.ResultCache(max_entries=64, ttl=60))
+    return retrieval_engine.RetrievalEngine(stub_package / "storage", STUB_REGION)
@@ -0,0 +1,118 @@
+"""
+Tests for the IVF-flat approximate nearest-neighbour index
+"""
+
+import numpy as np
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+
+from ann_index import IVFFlatIndex, ivf_path
+from vector_store import MatrixState, NumpyVectorStore, normalize_rows
+
+
+def clustered_matrix(count: int = 600, dim: int = 24, clusters: int = 12, seed: int = 0) -> np.ndarray:
+    """Points around a few centres, like embeddings of related products"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    return normalize_rows(centres[rng.integers(0, clusters, count)] + 0.3 * rng.normal(size=(count, dim)))
+
+
+def store_with_ivf(matrix: np.ndarray) -> NumpyVectorStore:
+    ids = tuple(f"n{i}" for i in range(matrix.shape[0]))
+    state = MatrixState(ids, tuple(f"doc{i % 5}" for i in range(len(ids))), ({},) * len(ids), matrix)
+    state.build_ivf_index()
+    return NumpyVectorStore(state=state)
+
+
+def assert_lists_cover_every_row_once(index: IVFFlatIndex, count: int):
+    rows = np.sort(np.concatenate(index.lists))
+    np.testing.assert_array_equal(rows, np.arange(count))
+
+
+def test_build_files_every_row_in_exactly_one_list():
+    matrix = clustered_matrix()
+    index = IVFFlatIndex.build(matrix)
+    assert index.nlist == int(np.sqrt(len(matrix)))
+    assert_lists_cover_every_row_once(index, len(matrix))
+
+
+def test_probe_recall_against_brute_force():
+    matrix = clustered_matrix()
+    store = store_with_ivf(matrix)
+    queries = normalize_rows(matrix[::20] + 0.05 * np.random.default_rng(1).normal(size=matrix[::20].shape))
+
+    def recall(nprobe: int) -> float:
+        hits = 0
+        for query in queries:
+            exact, _ = store.search(query, 10)
+            approx, _ = store.search(query, 10, index_type="ivf", nprobe=nprobe)
+            hits += len(set(exact) & set(approx))
+        return hits / (10 * len(queries))
+
+    assert recall(store.state.ivf_index().nlist) == 1.0
+    assert recall(8) >= 0.95
+    assert recall(1) <= recall(8)
+
+
+def test_probe_returns_sorted_candidates_from_the_nearest_lists():
+    matrix = clustered_matrix()
+    index = IVFFlatIndex.build(matrix)
+    candidates = index.probe(matrix[0], 2)
+    assert np.all(np.diff(candidates) > 0)
+    assert 0 in candidates
+    assert len(candidates) < len(matrix)
+
+
+def make_node(node_id: str, doc_id: str, embedding: np.ndarray) -> TextNode:
+    node = TextNode(id_=node_id, text=node_id, embedding=embedding.tolist())
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=doc_id)
+    return node
+
+
+def test_delete_and_add_remap_the_index_rows():
+    matrix = clustered_matrix(count=300)
+    store = store_with_ivf(matrix)
+    centroids = store.state.ivf_index().centroids
+
+    store.delete("doc2")
+    assert_lists_cover_every_row_once(store.state.ivf_index(), len(store))
+
+    extra = clustered_matrix(count=20, seed=5)
+    store.add([make_node(f"new{i}", "doc9", vector) for i, vector in enumerate(extra)])
+    index = store.state.ivf_index()
+    assert index.centroids is centroids
+    assert index.count == len(store) == 300 - 60 + 20
+    assert_lists_cover_every_row_once(index, len(store))
+
+    # Each remapped row still points at its own vector: probing with it finds it
+    nlist = index.nlist
+    for node_id in ("n0", "n299", "new0", "new19"):
+        row = store.state.ids.index(node_id)
+        ids, _ = store.search(store.state.matrix[row], 1, index_type="ivf", nprobe=nlist)
+        assert ids == [node_id]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    matrix = clustered_matrix(count=200)
+    index = IVFFlatIndex.build(matrix)
+    path = ivf_path(tmp_path)
+    index.save(path, len(matrix))
+
+    loaded = IVFFlatIndex.load(path, len(matrix))
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+    for expected, actual in zip(index.lists, loaded.lists):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_load_rejects_an_index_built_for_another_matrix(tmp_path):
+    matrix = clustered_matrix(count=200)
+    path = ivf_path(tmp_path)
+    IVFFlatIndex.build(matrix).save(path, len(matrix))
+    assert IVFFlatIndex.load(path, len(matrix) + 1) is None
+
+
+def test_search_without_an_index_falls_back_to_exact(caplog):
+    matrix = clustered_matrix(count=100)
+    ids = tuple(f"n{i}" for i in range(len(matrix)))
+    store = NumpyVectorStore(state=MatrixState(ids, (None,) * len(ids), ({},) * len(ids), matrix))
+    assert store.search(matrix[3], 5, index_type="ivf")[0] == store.search(matrix[3], 5)[0]
+    assert "No IVF index" in caplog.text
@@ -0,0 +1,111 @@
+"""
+Tests for the memory-mapped binary index format
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from binary_index import (convert, has_binary_index, json_path, load_vector_store, meta_path, quantized_path,
+                          read_binary_index, vectors_path, write_binary_index)
+from vector_store import NumpyVectorStore, normalize_rows
+
+
+def write_random_index(storage_dir, count: int = 50, dim: int = 16):
+    matrix = normalize_rows(np.random.default_rng(0).normal(size=(count, dim)))
+    ids = [f"n{i}" for i in range(count)]
+    write_binary_index(storage_dir, ids, [None] * count, [{}] * count, matrix)
+    return ids, matrix
+
+
+def test_quantized_copies_are_persisted_and_memory_mapped(tmp_path):
+    _, matrix = write_random_index(tmp_path)
+    state = load_vector_store(tmp_path).state
+
+    for precision in ("float16", "int8"):
+        assert quantized_path(tmp_path, precision).exists()
+        quantized = state.quantized_matrix(precision)
+        assert isinstance(quantized.data, np.memmap)
+        assert quantized.data.dtype == np.dtype(precision)
+    assert isinstance(state.quantized_matrix("int8").scales, np.memmap)
+
+    query = matrix[3]
+    assert state.quantized_matrix("int8").scores(query) == pytest.approx(matrix @ query, abs=2e-2)
+
+
+def test_missing_quantized_file_is_rebuilt_in_memory(tmp_path):
+    write_random_index(tmp_path)
+    quantized_path(tmp_path, "float16").unlink()
+    state = load_vector_store(tmp_path).state
+    assert "float16" not in state.quantized
+    assert not isinstance(state.quantized_matrix("float16").data, np.memmap)
+
+
+def write_json_store(storage_dir, count: int = 40, dim: int = 12):
+    vectors = np.random.default_rng(4).normal(size=(count, dim))
+    data = {
+        "embedding_dict": {f"n{i}": vectors[i].tolist() for i in range(count)},
+        "text_id_to_ref_doc_id": {f"n{i}": f"doc{i % 4}" for i in range(count)},
+        "metadata_dict": {f"n{i}": {"species": ["dog", "cat"][i % 2]} for i in range(count)},
+    }
+    json_path(storage_dir).write_text(json.dumps(data))
+    return vectors
+
+
+def test_convert_round_trip_gives_the_same_ids_and_scores(tmp_path):
+    vectors = write_json_store(tmp_path)
+    json_store = NumpyVectorStore.from_persist_dir(str(tmp_path))
+
+    assert convert(tmp_path) == len(vectors)
+    assert has_binary_index(tmp_path)
+    binary_store = load_vector_store(tmp_path)
+    assert isinstance(binary_store.state.matrix, np.memmap)
+    assert binary_store.state.ids == json_store.state.ids
+    assert binary_store.state.ref_doc_ids == json_store.state.ref_doc_ids
+    assert binary_store.state.metadata == json_store.state.metadata
+
+    for query in vectors[:10]:
+        expected_ids, expected_scores = json_store.search(query, 5)
+        ids, scores = binary_store.search(query, 5)
+        assert ids == expected_ids
+        assert scores == pytest.approx(expected_scores, abs=1e-6)
+
+
+def test_json_store_newer_than_the_binary_index_wins(tmp_path):
+    write_json_store(tmp_path)
+    convert(tmp_path)
+    newer = os.stat(meta_path(tmp_path)).st_mtime_ns + 1_000_000
+    os.utime(json_path(tmp_path), ns=(newer, newer))
+
+    assert not has_binary_index(tmp_path)
+    assert not isinstance(load_vector_store(tmp_path).state.matrix, np.memmap)
+
+
+def test_rewrite_replaces_files_atomically(tmp_path):
+    write_random_index(tmp_path, count=50)
+    ids, _, _, old_matrix = read_binary_index(tmp_path)
+    old_rows = np.array(old_matrix)
+    vectors_inode = os.stat(vectors_path(tmp_path)).st_ino
+
+    matrix = normalize_rows(np.random.default_rng(9).normal(size=(30, 16)))
+    write_binary_index(tmp_path, [f"m{i}" for i in range(30)], [None] * 30, [{}] * 30, matrix)
+
+    # New files were renamed over the old ones: no temp files left behind, and a reader
+    # that mapped the old block keeps seeing consistent old rows
+    assert not [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+    assert os.stat(vectors_path(tmp_path)).st_ino != vectors_inode
+    np.testing.assert_array_equal(np.asarray(old_matrix), old_rows)
+    assert len(ids) == 50
+
+    new_ids, _, _, new_matrix = read_binary_index(tmp_path)
+    assert new_ids == [f"m{i}" for i in range(30)]
+    np.testing.assert_allclose(new_matrix, matrix, atol=1e-6)
+
+
+def test_mismatched_vector_block_is_rejected(tmp_path):
+    write_random_index(tmp_path, count=10)
+    np.save(vectors_path(tmp_path), np.zeros((9, 16), dtype=np.float32))
+    with pytest.raises(ValueError, match="inconsistent"):
+        read_binary_index(tmp_path)
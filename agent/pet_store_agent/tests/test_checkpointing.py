@@ -0,0 +1,64 @@
+"""
+Tests for the bounded in-memory checkpointer
+"""
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+import checkpointing
+from checkpointing import BoundedMemorySaver
+
+
+def put(saver: BoundedMemorySaver, thread_id: str, text: str = "hello") -> None:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": [text]}
+    checkpoint["channel_versions"] = {"messages": 1}
+    saver.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}, checkpoint,
+              {"source": "loop", "step": 0}, {"messages": 1})
+
+
+def stored(saver: BoundedMemorySaver, thread_id: str) -> bool:
+    return saver.get_tuple({"configurable": {"thread_id": thread_id}}) is not None
+
+
+def test_least_recently_used_thread_is_evicted_past_max_threads():
+    saver = BoundedMemorySaver(max_threads=2, max_bytes=10**9, ttl=0)
+    put(saver, "a")
+    put(saver, "b")
+    assert stored(saver, "a")  # reading "a" makes "b" the least recently used
+    put(saver, "c")
+
+    assert stored(saver, "a") and stored(saver, "c")
+    assert not stored(saver, "b")
+    assert saver.stats()["evicted"] == 1
+
+
+def test_byte_budget_evicts_but_keeps_the_thread_being_written():
+    saver = BoundedMemorySaver(max_threads=100, max_bytes=1, ttl=0)
+    put(saver, "a", "x" * 1000)
+    put(saver, "b", "y" * 1000)
+
+    assert stored(saver, "b")
+    assert not stored(saver, "a")
+    assert saver.stats()["threads"] == 1
+
+
+def test_idle_threads_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(checkpointing.time, "monotonic", lambda: now[0])
+    saver = BoundedMemorySaver(max_threads=100, max_bytes=10**9, ttl=60)
+    put(saver, "idle")
+    now[0] += 120
+    put(saver, "active")
+
+    assert not stored(saver, "idle")
+    assert saver.stats()["expired"] == 1
+
+
+def test_delete_thread_releases_its_bytes():
+    saver = BoundedMemorySaver(max_threads=10, max_bytes=10**9, ttl=0)
+    put(saver, "a", "x" * 1000)
+    assert saver.stats()["bytes"] > 0
+    saver.delete_thread("a")
+    stats = saver.stats()
+    assert (stats["threads"], stats["bytes"]) == (0, 0)
+    assert not stored(saver, "a")
@@ -0,0 +1,101 @@
+"""
+Tests for chunk metadata and the structure-aware chunkers
+"""
+
+from pathlib import Path
+
+from chunking import (care_guide_chunks, chunk_attributes, mentioned_species, normalize_species, product_chunks,
+                      structured_chunks)
+from vector_store import PostingIndex
+
+CATALOG_FILE = Path(__file__).resolve().parent.parent / "data" / "products.txt"
+
+CATALOG = """DOG PRODUCTS
+============
+Product: Doggy Delights Premium Dog Food
+SKU: DD006
+Price: $54.99
+Category: Dog Food
+Description: Keeps dogs healthy; cats in the house will want some too.
+"""
+
+CARE_GUIDE = """PET CARE GUIDE
+
+DOG CARE
+========
+
+Chihuahua Care Guide
+-------------------
+Chihuahuas are small but spirited dogs.
+
+Bathing:
+- Every 3-4 weeks
+- Use lukewarm water
+
+Feeding:
+- Small, frequent meals
+"""
+
+
+def test_normalize_species():
+    assert normalize_species("Dogs") == "dog"
+    assert normalize_species("kitten") == "cat"
+    assert normalize_species("small_pet") == "small_pet"
+    assert normalize_species("fish") is None
+
+
+def test_mentioned_species_orders_by_frequency():
+    assert mentioned_species("Cats and kittens get along with a calm dog.") == ["cat", "dog"]
+    assert mentioned_species("Nothing about animals here.") == []
+
+
+def test_multi_species_chunk_lists_every_species():
+    attributes = chunk_attributes("Introduce a new kitten to your dog slowly. Dogs and cats both need space.",
+                                  "care_guide", "DOG CARE")
+    assert attributes["species"] == ["dog", "cat"]
+
+
+def test_product_block_keeps_one_species():
+    [(text, fields)] = product_chunks(CATALOG)
+    assert text.startswith("Product: Doggy Delights")
+    assert fields["species"] == "dog"
+    assert fields["category"] == "dog food"
+    assert fields["sku"] == "DD006"
+
+
+def test_species_list_matches_every_filter_value():
+    postings = PostingIndex(["a", "b", "c"], [None, None, None], [
+        {"species": ["dog", "cat"]},
+        {"species": "cat"},
+        {"species": ["bird"]},
+    ])
+    assert postings.rows("species", ["cat"]).tolist() == [0, 1]
+    assert postings.rows("species", ["dog"]).tolist() == [0]
+
+
+def test_care_guide_chunks_one_per_topic_with_guide_title():
+    chunks = care_guide_chunks(CARE_GUIDE)
+    assert [fields["topic"] for _, fields in chunks] == ["Overview", "Bathing", "Feeding"]
+    text, fields = chunks[1]
+    assert text.splitlines()[0] == "Chihuahua Care Guide - Bathing"
+    assert "lukewarm water" in text and "frequent meals" not in text
+    assert fields["guide"] == "Chihuahua Care Guide"
+    assert fields["section"] == "Dog Care"
+    assert fields["species"] == ["dog"]
+
+
+def test_structured_chunks_only_for_known_layouts():
+    assert structured_chunks("products.txt", CATALOG)[0][1]["sku"] == "DD006"
+    assert structured_chunks("Pet Store Product Catalog.pdf", CATALOG) is None
+    # A known file name whose text has no recognisable blocks falls back too
+    assert structured_chunks("products.txt", "free text without product blocks") is None
+
+
+def test_product_chunks_stop_before_the_next_section_heading():
+    with open(CATALOG_FILE, encoding="utf-8") as f:
+        text = f.read()
+    headings = {"DOG PRODUCTS", "CAT PRODUCTS", "SMALL PETS", "BIRD SUPPLIES"}
+    chunks = product_chunks(text)
+    assert len(chunks) > 4
+    for chunk_text, fields in chunks:
+        assert not headings.intersection(chunk_text.splitlines()), fields["sku"]
@@ -0,0 +1,60 @@
+"""
+Tests for token-budgeted retrieval payloads
+"""
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from context_payload import TRUNCATION_MARKER, build_payload
+
+
+def node(node_id: str, text: str, score: float) -> NodeWithScore:
+    return NodeWithScore(node=TextNode(id_=node_id, text=text), score=score)
+
+
+def sentences(count: int, word: str) -> str:
+    return " ".join(f"{word} sentence number {i} about pet food." for i in range(count))
+
+
+def test_min_score_drops_low_cosine_results_in_vector_mode():
+    nodes = [node("a", "Doggy Delights is a premium dog food.", 0.82),
+             node("b", "Bird cages come in three sizes.", 0.31)]
+    records, counts = build_payload(nodes, "PDFs", min_score=0.5)
+    assert [r["node_id"] for r in records] == ["a"]
+    assert counts["below_threshold"] == 1
+
+
+def test_min_score_is_ignored_for_fused_and_bm25_scores():
+    # Reciprocal rank fusion scores sit around 0.016-0.033; a cosine threshold would drop all of them
+    fused = [node("a", "Doggy Delights is a premium dog food.", 0.0328),
+             node("b", "Bird cages come in three sizes.", 0.0161)]
+    records, counts = build_payload(fused, "PDFs", min_score=0.5, mode="hybrid")
+    assert [r["node_id"] for r in records] == ["a", "b"]
+    assert counts["below_threshold"] == 0
+
+    bm25 = [node("c", "Whiskers Feast cat food.", 7.4)]
+    records, _ = build_payload(bm25, "PDFs", min_score=0.5, mode="lexical")
+    assert len(records) == 1
+
+
+def test_budget_truncates_then_drops():
+    first = sentences(20, "first")
+    second = sentences(20, "second")
+    budget = len(first) + 300
+    records, counts = build_payload([node("a", first, 0.9), node("b", second, 0.8)], "PDFs",
+                                    max_chars=budget)
+    assert records[0]["content"] == first
+    assert records[1]["content"].endswith(TRUNCATION_MARKER)
+    assert sum(len(r["content"]) for r in records) <= budget
+    assert counts["truncated"] == 1
+
+    records, counts = build_payload([node("a", first, 0.9), node("b", second, 0.8)], "PDFs",
+                                    max_chars=len(first) + 50)
+    assert [r["node_id"] for r in records] == ["a"]
+    assert counts["over_budget"] == 1
+
+
+def test_contained_chunks_are_deduplicated():
+    text = sentences(5, "shared")
+    records, counts = build_payload([node("a", text, 0.9), node("b", text[:120], 0.8)], "PDFs")
+    assert [r["node_id"] for r in records] == ["a"]
+    assert counts["deduplicated"] == 1
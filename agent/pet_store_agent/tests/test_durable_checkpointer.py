@@ -0,0 +1,67 @@
+"""
+Tests for the batched, durable checkpointer
+"""
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from durable_checkpointer import CheckpointStore, DurableCheckpointSaver, SQLiteCheckpointStore
+
+
+def saver(tmp_path, **options) -> DurableCheckpointSaver:
+    # flush_interval=0: no background thread, records are written by flush()/compact() only
+    options.setdefault("flush_interval", 0)
+    options.setdefault("compact_interval", 0)
+    return DurableCheckpointSaver(SQLiteCheckpointStore(str(tmp_path / "checkpoints.db")), **options)
+
+
+def put(checkpointer: DurableCheckpointSaver, thread_id: str, checkpoint_id: str, step: int):
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = checkpoint_id
+    checkpoint["channel_values"] = {"messages": [f"turn {step}"]}
+    return checkpointer.put({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}},
+                            checkpoint, {"source": "loop", "step": step}, {})
+
+
+def test_incomplete_store_fails_at_construction():
+    class WriteOnlyStore(CheckpointStore):
+        def write_batch(self, checkpoints, writes):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnlyStore()
+
+
+def test_buffered_checkpoint_is_readable_and_survives_a_new_process(tmp_path):
+    first = saver(tmp_path)
+    config = put(first, "t1", "0001", 1)
+    first.put_writes(config, [("messages", "pending")], task_id="task")
+
+    # Reads see this process's unflushed records
+    assert first.get_tuple({"configurable": {"thread_id": "t1"}}).checkpoint["id"] == "0001"
+    assert first.stats()["pending_checkpoints"] == 1
+
+    assert first.flush() == 2
+    second = saver(tmp_path)
+    restored = second.get_tuple({"configurable": {"thread_id": "t1"}})
+    assert restored.checkpoint["channel_values"] == {"messages": ["turn 1"]}
+    assert restored.pending_writes == [("task", "messages", "pending")]
+
+
+def test_compaction_keeps_newest_checkpoints_per_thread(tmp_path):
+    checkpointer = saver(tmp_path, keep_last=2)
+    for step, checkpoint_id in enumerate(["0001", "0002", "0003"], start=1):
+        put(checkpointer, "t1", checkpoint_id, step)
+
+    removed = checkpointer.compact()
+    assert removed["superseded_checkpoints"] == 1
+    kept = [c.checkpoint["id"] for c in checkpointer.list({"configurable": {"thread_id": "t1"}})]
+    assert kept == ["0003", "0002"]
+
+
+def test_compaction_drops_idle_threads(tmp_path):
+    # Negative retention: everything written so far already counts as idle
+    checkpointer = saver(tmp_path, retention=-1)
+    put(checkpointer, "old", "0001", 1)
+    assert checkpointer.compact()["expired_checkpoints"] == 1
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "old"}}) is None
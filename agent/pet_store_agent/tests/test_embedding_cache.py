@@ -0,0 +1,57 @@
+"""
+Tests for the query-embedding cache in front of the embedding model
+"""
+
+from typing import List
+
+from llama_index.core.embeddings import MockEmbedding
+
+from embedding_cache import CachedEmbedding, EmbeddingCache
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        self.calls += 1
+        return [float(len(query))] * self.embed_dim
+
+
+def test_repeated_query_is_embedded_once_ignoring_case_and_spacing():
+    inner = CountingEmbedding(embed_dim=4)
+    model = CachedEmbedding(inner, EmbeddingCache(max_entries=16))
+
+    first = model.get_query_embedding("Price of Doggy Delights")
+    assert model.get_query_embedding("  price of   doggy delights ") == first
+    assert inner.calls == 1
+    assert model.cache.stats()["memory_hits"] == 1
+
+
+def test_memory_tier_is_bounded():
+    inner = CountingEmbedding(embed_dim=2)
+    model = CachedEmbedding(inner, EmbeddingCache(max_entries=1))
+    model.get_query_embedding("cat food")
+    model.get_query_embedding("bird cage")
+    model.get_query_embedding("cat food")
+    assert inner.calls == 3
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    CachedEmbedding(CountingEmbedding(embed_dim=3), EmbeddingCache(disk_path=path)).get_query_embedding("dog toys")
+
+    inner = CountingEmbedding(embed_dim=3)
+    model = CachedEmbedding(inner, EmbeddingCache(disk_path=path))
+    assert model.get_query_embedding("dog toys") == [8.0, 8.0, 8.0]
+    assert inner.calls == 0
+    assert model.cache.stats()["disk_hits"] == 1
+
+
+def test_batch_embeds_only_distinct_misses():
+    inner = CountingEmbedding(embed_dim=2)
+    model = CachedEmbedding(inner, EmbeddingCache(max_entries=16))
+    model.get_query_embedding("cat food")
+
+    embeddings = model.get_query_embeddings(["cat food", "bird cage", "bird cage"])
+    assert embeddings == [[8.0, 8.0], [9.0, 9.0], [9.0, 9.0]]
+    assert inner.calls == 2
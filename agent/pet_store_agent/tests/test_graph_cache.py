@@ -0,0 +1,111 @@
+"""
+Tests for the compiled graph cache and its key
+"""
+
+import dataclasses
+import threading
+import time
+
+from graph_cache import GraphCache, graph_key
+from pet_store_agent_full_ld import PetStoreAgent, RuntimeConfig
+
+TOOLS = {"tools": [{"name": "retrieve_product_info"}, {"name": "get_inventory"}]}
+
+
+def key(variation: str):
+    return graph_key(variation, "claude-sonnet", "bedrock", ["retrieve_product_info"], {}, {})
+
+
+def test_least_recently_used_graph_is_evicted():
+    cache = GraphCache(max_entries=2)
+    cache.get_or_build(key("a"), lambda: "graph a")
+    cache.get_or_build(key("b"), lambda: "graph b")
+    cache.get_or_build(key("a"), lambda: "rebuilt a")
+    cache.get_or_build(key("c"), lambda: "graph c")
+
+    assert cache.get_or_build(key("a"), lambda: "rebuilt a") == "graph a"
+    assert cache.get_or_build(key("b"), lambda: "rebuilt b") == "rebuilt b"
+    stats = cache.stats()
+    assert stats["evictions"] == 2 and stats["entries"] == 2
+
+
+def test_concurrent_first_requests_build_once():
+    cache = GraphCache()
+    builds = []
+
+    def build():
+        builds.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build(key("v1"), build)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len(results) == 8 and all(graph is results[0] for graph in results)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 7
+
+
+def test_invalidate_drops_every_graph():
+    cache = GraphCache()
+    cache.get_or_build(key("a"), lambda: "graph a")
+    cache.get_or_build(key("b"), lambda: "graph b")
+    assert cache.invalidate() == 2
+    assert cache.get_or_build(key("a"), lambda: "new a") == "new a"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_disabled_cache_builds_every_time():
+    cache = GraphCache(max_entries=0)
+    assert cache.get_or_build(key("a"), lambda: 1) == 1
+    assert cache.get_or_build(key("a"), lambda: 2) == 2
+
+
+def runtime_config(**changes) -> RuntimeConfig:
+    rc = RuntimeConfig(enabled=True, instructions="You help {{customerType}} customers. User: alice",
+                       model_name="claude-sonnet", provider_name="bedrock", parameters=dict(TOOLS),
+                       custom={"llamaindex_similarity_top_k": 5}, variation_key="v1", tracker=None)
+    return dataclasses.replace(rc, **changes)
+
+
+def agent_with_counting_builds():
+    agent = PetStoreAgent.__new__(PetStoreAgent)
+    agent.graphs = GraphCache()
+    agent.builds = []
+    agent.build_graph = lambda rc, stateful=True: agent.builds.append(rc) or object()
+    return agent
+
+
+def test_per_user_instructions_share_one_graph():
+    agent = agent_with_counting_builds()
+    alice = agent.graph_for(runtime_config())
+    bob = agent.graph_for(runtime_config(instructions="You help Subscribed customers. User: bob"))
+    assert alice is bob
+    assert len(agent.builds) == 1
+
+
+def test_model_tools_and_config_changes_get_their_own_graph():
+    agent = agent_with_counting_builds()
+    base = agent.graph_for(runtime_config())
+    changed = [
+        runtime_config(model_name="claude-haiku"),
+        runtime_config(provider_name="openai"),
+        runtime_config(parameters={"tools": [{"name": "retrieve_product_info"}]}),
+        runtime_config(custom={"llamaindex_similarity_top_k": 3}),
+        runtime_config(variation_key="v2"),
+    ]
+    graphs = [agent.graph_for(rc) for rc in changed]
+    assert len({id(graph) for graph in graphs + [base]}) == len(changed) + 1
+    # Stateless and checkpointed graphs for one config are separate too
+    assert agent.graph_for(runtime_config(), stateful=False) is not base
+
+
+def test_graph_key_ignores_tool_order():
+    key = graph_key("v1", "m", "p", ["b", "a"], {"temperature": 0.2}, {})
+    assert key == graph_key("v1", "m", "p", ["a", "b"], {"temperature": 0.2}, {})
+    assert key != graph_key("v1", "m", "p", ["a", "b"], {"temperature": 0.7}, {})
@@ -0,0 +1,75 @@
+"""
+Tests for incremental index ingestion
+"""
+
+import json
+
+import numpy as np
+
+from binary_index import load_vector_store
+from conftest import STUB_DIM
+from ingest import MANIFEST_FNAME, StubEmbedder, _swap_into_place
+
+
+def manifest(storage_dir):
+    with open(storage_dir / MANIFEST_FNAME) as f:
+        return json.load(f)
+
+
+def test_rebuild_only_embeds_the_edited_chunk(stub_package, ingest_stub):
+    storage_dir = stub_package / "storage"
+    first_embedder = StubEmbedder(STUB_DIM)
+    first = ingest_stub(first_embedder)
+    assert first["embedded"] == first["chunks"] == first_embedder.calls
+    before = manifest(storage_dir)["chunks"]
+    state = load_vector_store(storage_dir).state
+    vectors_before = {node_id: np.array(state.matrix[row]) for row, node_id in enumerate(state.ids)}
+
+    catalog = stub_package / "data" / "products.txt"
+    catalog.write_text(catalog.read_text().replace("Price: $54.99", "Price: $49.99", 1))
+    second_embedder = StubEmbedder(STUB_DIM)
+    second = ingest_stub(second_embedder)
+
+    assert second["chunks"] == first["chunks"]
+    assert second["embedded"] == second_embedder.calls == 1
+    assert second["reused"] == first["chunks"] - 1
+
+    after = manifest(storage_dir)["chunks"]
+    changed = set(after) - set(before)
+    assert len(changed) == 1 and len(set(before) - set(after)) == 1
+    # Unchanged chunks keep their content-hash ids and their stored vectors
+    state = load_vector_store(storage_dir).state
+    for row, node_id in enumerate(state.ids):
+        if node_id not in changed:
+            assert after[node_id] == before[node_id]
+            np.testing.assert_array_equal(state.matrix[row], vectors_before[node_id])
+    edited = state.metadata[state.ids.index(changed.pop())]
+    assert edited["sku"] == "DD006" and edited["price"] == 49.99
+
+
+def test_new_embedding_model_re_embeds_everything(stub_package, ingest_stub):
+    ingest_stub(StubEmbedder(STUB_DIM))
+    embedder = StubEmbedder(STUB_DIM)
+    embedder.model_name = "another-model"
+    summary = ingest_stub(embedder)
+    assert summary["reused"] == 0
+    assert embedder.calls == summary["chunks"]
+
+
+def test_swap_into_place_replaces_the_directory_and_cleans_up(tmp_path):
+    storage_dir = tmp_path / "storage"
+    storage_dir.mkdir()
+    (storage_dir / "docstore.json").write_text("old")
+    new_dir = tmp_path / "storage.new"
+    new_dir.mkdir()
+    (new_dir / "docstore.json").write_text("new")
+
+    _swap_into_place(new_dir, storage_dir)
+    assert (storage_dir / "docstore.json").read_text() == "new"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["storage"]
+
+    # First build: nothing to replace
+    fresh = tmp_path / "fresh.new"
+    fresh.mkdir()
+    _swap_into_place(fresh, tmp_path / "fresh")
+    assert (tmp_path / "fresh").is_dir() and not fresh.exists()
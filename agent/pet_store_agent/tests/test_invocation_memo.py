@@ -0,0 +1,68 @@
+"""
+Tests for the per-invocation tool result memo
+"""
+
+from typing import Optional
+
+from langchain_core.tools import tool
+
+from invocation_memo import current_memo, invocation_scope, memoize_tool
+
+
+def counting_tool():
+    calls = []
+
+    @tool
+    def lookup_product(query: str, species: Optional[str] = None) -> str:
+        """Look up a product."""
+        calls.append((query, species))
+        return f"result {len(calls)}"
+
+    return memoize_tool(lookup_product), calls
+
+
+def test_repeated_call_in_one_scope_hits_the_memo():
+    lookup, calls = counting_tool()
+    with invocation_scope() as memo:
+        first = lookup.invoke({"query": "Price of Doggy Delights?"})
+        assert lookup.invoke({"query": "  price of doggy   delights"}) == first
+        assert lookup.invoke({"query": "price of doggy delights", "species": None}) == first
+    assert len(calls) == 1
+    assert memo.stats() == {"tool_calls": 3, "deduplicated": 2, "deduplicated_by_tool": {"lookup_product": 2}}
+
+
+def test_different_arguments_are_separate_entries():
+    lookup, calls = counting_tool()
+    with invocation_scope():
+        lookup.invoke({"query": "dog food"})
+        lookup.invoke({"query": "dog food", "species": "dog"})
+        lookup.invoke({"query": "cat food"})
+    assert len(calls) == 3
+
+
+def test_separate_invocations_do_not_share_entries():
+    lookup, calls = counting_tool()
+    with invocation_scope():
+        first = lookup.invoke({"query": "dog food"})
+    with invocation_scope():
+        second = lookup.invoke({"query": "dog food"})
+    assert (first, second) == ("result 1", "result 2")
+    assert current_memo() is None
+
+
+def test_calls_outside_a_scope_are_not_memoized():
+    lookup, calls = counting_tool()
+    lookup.invoke({"query": "dog food"})
+    lookup.invoke({"query": "dog food"})
+    assert len(calls) == 2
+
+
+def test_nested_scope_is_discarded_on_exit():
+    lookup, calls = counting_tool()
+    with invocation_scope() as outer:
+        lookup.invoke({"query": "dog food"})
+        with invocation_scope():
+            lookup.invoke({"query": "dog food"})
+        assert current_memo() is outer
+        lookup.invoke({"query": "dog food"})
+    assert len(calls) == 2
@@ -0,0 +1,96 @@
+"""
+Tests for the TTL + stale-while-revalidate Lambda result cache
+"""
+
+import threading
+
+import pytest
+
+import lambda_cache
+from lambda_cache import LambdaCache, LambdaErrorResponse, redact, response_body, unredact, wrap_body
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(lambda_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_fresh_entry_skips_the_loader(clock):
+    cache = LambdaCache()
+    calls = []
+    load = lambda: calls.append(1) or {"quantity": len(calls)}
+
+    assert cache.get_or_load(("inventory", "DD006"), load, ttl=60) == {"quantity": 1}
+    clock.now += 30
+    assert cache.get_or_load(("inventory", "DD006"), load, ttl=60) == {"quantity": 1}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_is_served_while_a_refresh_runs(clock):
+    cache = LambdaCache()
+    key = ("inventory", "DD006")
+    cache.get_or_load(key, lambda: {"quantity": 1}, ttl=60, stale_ttl=120)
+
+    release = threading.Event()
+
+    def slow_refresh():
+        release.wait(5)
+        return {"quantity": 2}
+
+    clock.now += 90  # past ttl, inside the stale window
+    assert cache.get_or_load(key, slow_refresh, ttl=60, stale_ttl=120) == {"quantity": 1}
+    assert cache.stats()["stale_hits"] == 1
+
+    release.set()
+    cache._executor.shutdown(wait=True)
+    assert cache.stats()["refreshes"] == 1
+    assert cache.get_or_load(key, lambda: {"quantity": 3}, ttl=60, stale_ttl=120) == {"quantity": 2}
+
+
+def test_entry_past_the_stale_window_is_reloaded(clock):
+    cache = LambdaCache()
+    key = ("inventory", "DD006")
+    cache.get_or_load(key, lambda: {"quantity": 1}, ttl=60, stale_ttl=120)
+    clock.now += 200
+    assert cache.get_or_load(key, lambda: {"quantity": 2}, ttl=60, stale_ttl=120) == {"quantity": 2}
+    assert cache.stats()["misses"] == 2
+
+
+def test_error_responses_are_never_cached(clock):
+    cache = LambdaCache()
+    key = ("user", "usr_404")
+
+    def failing():
+        raise LambdaErrorResponse({"statusCode": 500, "body": "boom"})
+
+    with pytest.raises(LambdaErrorResponse):
+        cache.get_or_load(key, failing, ttl=60)
+    assert cache.get_or_load(key, lambda: {"statusCode": 503}, ttl=60) == {"statusCode": 503}
+    assert cache.stats()["entries"] == 0
+
+
+def test_not_found_uses_the_negative_ttl(clock):
+    cache = LambdaCache()
+    key = ("user", "usr_999")
+    cache.get_or_load(key, lambda: {"error": "not found"}, ttl=300, negative_ttl=30)
+    clock.now += 31
+    assert cache.get_or_load(key, lambda: {"id": "usr_999"}, ttl=300, negative_ttl=30) == {"id": "usr_999"}
+
+
+def test_email_is_redacted_in_cached_records():
+    email = "jane1988@someemaildomain.com"
+    reply = wrap_body({"id": "usr_002", "email": "Jane1988@SomeEmailDomain.com"})
+    stored = redact(reply, email)
+    assert "someemaildomain" not in str(stored).lower()
+    assert response_body(unredact(stored, email)) == {"id": "usr_002", "email": email}
@@ -0,0 +1,49 @@
+"""
+Tests for the BM25 index and reciprocal rank fusion
+"""
+
+import pytest
+
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    "dd006": "Product: Doggy Delights Premium Dog Food. SKU: DD006. Grain-free dry food for dogs.",
+    "wf008": "Product: Whiskers Feast Premium Cat Food. SKU: WF008. Salmon recipe for cats.",
+    "tp018": "Product: Tweet Paradise Bird Cage. SKU: TP018. Spacious cage for birds.",
+}
+
+
+@pytest.fixture(scope="module")
+def index() -> BM25Index:
+    return BM25Index(list(DOCS), list(DOCS.values()))
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("What is the price of the DD006 for dogs?") == ["price", "dd006", "dog"]
+
+
+def test_sku_query_ranks_its_product_first(index):
+    hits = index.search("DD006", 3)
+    assert [doc_id for doc_id, _ in hits] == ["dd006"]
+
+
+def test_documents_without_matching_terms_are_skipped(index):
+    assert index.search("aquarium filter", 3) == []
+
+
+def test_allowed_ids_restrict_the_search(index):
+    hits = index.search("premium food", 3, allowed_ids=["wf008"])
+    assert [doc_id for doc_id, _ in hits] == ["wf008"]
+
+
+def test_coverage_is_full_only_when_every_term_matches(index):
+    assert index.coverage("doggy delights", "dd006") == pytest.approx(1.0)
+    assert index.coverage("doggy delights", "wf008") == 0.0
+    assert 0.0 < index.coverage("premium aquarium", "dd006") < 1.0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    scores = dict(reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"]]))
+    assert scores["a"] == pytest.approx(1 / 61 + 1 / 62)
+    # Found by both rankings beats found by one, whatever the single-list rank
+    assert min(scores["a"], scores["b"]) > max(scores["c"], scores["d"])
@@ -0,0 +1,96 @@
+"""
+Tests for the pooled chat-model clients
+"""
+
+import dataclasses
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import llm_pool
+from llm_pool import ModelPool, model_key
+from pet_store_agent_full_ld import PetStoreAgent, RuntimeConfig
+
+
+def test_model_key_normalizes_equal_configs():
+    assert model_key("Bedrock", "us.claude", "us-east-1", "0.7", "4096") == \
+        model_key("bedrock", "us.claude", "us-east-1", 0.7, 4096)
+    base = model_key("bedrock", "us.claude", "us-east-1", 0.7, 4096)
+    assert base != model_key("bedrock", "us.claude", "us-east-1", 0.2, 4096)
+    assert base != model_key("bedrock", "us.claude", "us-east-1", 0.7, 1024)
+    assert base != model_key("bedrock", "us.claude", "us-west-2", 0.7, 4096)
+    assert base != model_key("bedrock", "eu.claude", "us-east-1", 0.7, 4096)
+
+
+def test_equal_keys_share_one_client_and_different_params_do_not():
+    pool = ModelPool()
+    created = []
+
+    def factory(callbacks):
+        created.append(callbacks)
+        return FakeListChatModel(responses=["hi"], callbacks=callbacks)
+
+    first = pool.get(model_key("bedrock", "claude", "us-east-1", 0.7, 4096), factory)
+    assert pool.get(model_key("bedrock", "claude", "us-east-1", 0.7, 4096), factory) is first
+    other = pool.get(model_key("bedrock", "claude", "us-east-1", 0.2, 4096), factory)
+    assert other is not first
+    assert len(created) == 2
+    stats = pool.stats()
+    assert (stats["models"], stats["hits"], stats["misses"]) == (2, 1, 2)
+
+
+def test_factory_runs_once_under_concurrent_get():
+    pool = ModelPool()
+    created = []
+
+    def factory(callbacks):
+        created.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return object()
+
+    results = []
+    key = model_key("bedrock", "claude", "us-east-1", 0.7, 4096)
+    threads = [threading.Thread(target=lambda: results.append(pool.get(key, factory))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert len(results) == 8 and all(model is results[0] for model in results)
+
+
+def test_usage_callbacks_count_calls_per_model():
+    pool = ModelPool()
+    key = model_key("bedrock", "claude", "us-east-1", 0.7, 4096)
+    model = pool.get(key, lambda callbacks: FakeListChatModel(responses=["a", "b"], callbacks=callbacks))
+    model.invoke("hello")
+    model.invoke("again")
+
+    usage = pool.stats()["by_model"]["bedrock:claude@us-east-1 t=0.7 max=4096"]
+    assert usage["calls"] == 2 and usage["in_flight"] == 0 and usage["peak_in_flight"] == 1
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    pool = ModelPool()
+    monkeypatch.setattr(llm_pool, "_pool", pool)
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    return pool
+
+
+def test_agent_configs_resolving_to_one_model_reuse_its_client(fresh_pool):
+    agent = PetStoreAgent.__new__(PetStoreAgent)
+    rc = RuntimeConfig(enabled=True, instructions="", model_name="anthropic.claude-3-haiku-20240307-v1:0",
+                       provider_name="Bedrock", parameters={"temperature": 0.5, "max_tokens": 1000},
+                       custom={}, variation_key="v1", tracker=None)
+
+    model = agent.build_llm(rc)
+    # Same parameters from another variation, with the inference-profile prefix spelled out
+    same = dataclasses.replace(rc, variation_key="v2", model_name=f"us.{rc.model_name}",
+                               custom={"temperature": "0.5"})
+    assert agent.build_llm(same) is model
+    assert agent.build_llm(dataclasses.replace(rc, parameters={"temperature": 0.9, "max_tokens": 1000})) is not model
+    assert fresh_pool.stats()["models"] == 2
@@ -0,0 +1,79 @@
+"""
+Tests for the structured product catalog fast path
+"""
+
+from pathlib import Path
+
+import pytest
+
+from context_payload import build_payload
+from product_catalog import ProductCatalog, get_product_catalog, parse_products
+
+CATALOG_FILE = Path(__file__).resolve().parent.parent / "data" / "products.txt"
+
+
+@pytest.fixture(scope="module")
+def catalog() -> ProductCatalog:
+    return get_product_catalog(CATALOG_FILE)
+
+
+def skus(records):
+    return [record.sku for record in records]
+
+
+def test_parse_products_reads_fields_and_sections():
+    records = parse_products("""DOG PRODUCTS
+============
+Product: Doggy Delights Premium Dog Food
+SKU: dd006
+Price: $54.99
+Category: Dog Food
+- Grain free
+Special Offer: 10% off
+""")
+    assert len(records) == 1
+    record = records[0]
+    assert record.sku == "DD006"
+    assert record.price == 54.99
+    assert record.section == "Dog Products"
+    assert record.details == ["Grain free"]
+    assert record.fields == {"Special Offer": "10% off"}
+
+
+def test_lookup_by_sku_and_alias(catalog):
+    assert skus(catalog.lookup("How much is DD006?")) == ["DD006"]
+    assert skus(catalog.lookup("bark park buddy")) == ["BP010"]
+
+
+def test_generic_phrase_does_not_match(catalog):
+    assert catalog.lookup("small pet bedding") == []
+
+
+def test_resolve_fully_named_query(catalog):
+    products, unresolved = catalog.resolve("What is the price of Doggy Delights?")
+    assert skus(products) == ["DD006"]
+    assert unresolved == []
+
+
+def test_resolve_reports_products_the_catalog_does_not_know(catalog):
+    products, unresolved = catalog.resolve("Meow Munchies and Doggy Delights")
+    assert skus(products) == ["DD006"]
+    assert unresolved == ["meow", "munchies"]
+
+
+def test_resolve_reports_unknown_sku(catalog):
+    products, unresolved = catalog.resolve("price of DD006 and XX999")
+    assert skus(products) == ["DD006"]
+    assert unresolved == ["xx999"]
+
+
+def test_structured_records_count_against_payload_budget(catalog):
+    record = {"content": catalog.by_sku["DD006"].to_dict(), "relevance_score": 1.0, "source": "catalog"}
+    records, counts = build_payload([], "PDFs", structured=[record])
+    assert records == [record]
+    assert counts["structured_in"] == 1
+    assert counts["tokens"] > 0
+
+    records, counts = build_payload([], "PDFs", max_chars=10, structured=[record])
+    assert records == []
+    assert counts["over_budget"] == 1
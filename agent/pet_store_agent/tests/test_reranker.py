@@ -0,0 +1,72 @@
+"""
+Tests for local re-ranking and the adaptive score-gap cutoff
+"""
+
+from pathlib import Path
+
+import pytest
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from lexical_index import BM25Index
+from product_catalog import get_product_catalog
+from reranker import adaptive_cut, rerank, select_adaptive
+
+CATALOG_FILE = Path(__file__).resolve().parent.parent / "data" / "products.txt"
+
+OPTIONS = {"max_gap": 0.15, "min_relevance": 0.25}
+
+
+def scored(*scores):
+    return [NodeWithScore(node=TextNode(id_=f"n{i}", text=f"chunk {i}"), score=s) for i, s in enumerate(scores)]
+
+
+def ids(nodes):
+    return [n.node.node_id for n in nodes]
+
+
+def test_cut_at_the_first_large_score_gap():
+    assert ids(adaptive_cut(scored(0.9, 0.85, 0.5, 0.45), max_k=4)) == ["n0", "n1"]
+
+
+def test_evenly_scored_results_are_kept_up_to_max_k():
+    nodes = scored(0.8, 0.75, 0.7, 0.65, 0.6)
+    assert ids(adaptive_cut(nodes, max_k=3)) == ["n0", "n1", "n2"]
+
+
+def test_results_below_min_relevance_are_dropped_but_min_k_is_kept():
+    assert ids(adaptive_cut(scored(0.3, 0.2, 0.19), max_k=3)) == ["n0"]
+    assert ids(adaptive_cut(scored(0.1, 0.05), max_k=3)) == ["n0"]
+    assert ids(adaptive_cut(scored(0.1, 0.05, 0.04), max_k=3, min_k=2)) == ["n0", "n1"]
+    assert adaptive_cut([], max_k=3) == []
+
+
+def test_rerank_promotes_the_chunk_naming_the_product_and_leaves_inputs_untouched():
+    nodes = [
+        NodeWithScore(node=TextNode(id_="generic", text="Premium food for every dog, great price"), score=0.62),
+        NodeWithScore(node=TextNode(id_="named", text="Product: Doggy Delights Premium Dog Food\nPrice: $54.99"),
+                      score=0.6),
+    ]
+    lexical = BM25Index([n.node.node_id for n in nodes], [n.node.get_content() for n in nodes])
+    catalog = get_product_catalog(CATALOG_FILE)
+
+    ranked = rerank("price of Doggy Delights", nodes, lexical=lexical, catalog=catalog)
+    assert ids(ranked) == ["named", "generic"]
+    assert ranked[0].score > ranked[1].score
+    assert all(0.0 <= n.score <= 1.0 for n in ranked)
+    # The caller's (possibly cached) NodeWithScore objects keep their order and retriever scores
+    assert ids(nodes) == ["generic", "named"]
+    assert [n.score for n in nodes] == [0.62, 0.6]
+    assert all(r is not n for r in ranked for n in nodes)
+    assert ranked[0].node is nodes[1].node
+
+
+def test_rerank_without_signals_normalizes_the_retriever_score():
+    ranked = rerank("anything", scored(0.4, 0.8))
+    assert ids(ranked) == ["n1", "n0"]
+    assert [n.score for n in ranked] == pytest.approx([0.5, 0.25])
+
+
+def test_select_adaptive_never_exceeds_similarity_top_k():
+    nodes = scored(*[0.8 - 0.01 * i for i in range(12)])
+    assert len(select_adaptive("dog toys", nodes, 4, OPTIONS)) == 4
+    assert len(select_adaptive("dog toys", scored(0.9, 0.2), 4, OPTIONS)) == 1
@@ -0,0 +1,59 @@
+"""
+Tests for the retrieval result cache
+"""
+
+import time
+
+from result_cache import ResultCache, result_key
+
+
+def key(query: str, version=("v1",), storage_dir: str = "/storage", top_k: int = 5, **options):
+    return result_key(storage_dir, version, query, top_k, options)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResultCache(max_entries=8, ttl=0.05)
+    cache.put(key("dog food"), ["node"])
+    assert cache.get(key("dog food")) == ["node"]
+
+    time.sleep(0.1)
+    assert cache.get(key("dog food")) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.put(key("a"), 1)
+    cache.put(key("b"), 2)
+    cache.get(key("a"))
+    cache.put(key("c"), 3)
+
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == 1
+    assert cache.get(key("c")) == 3
+
+
+def test_key_normalizes_the_query_but_not_the_index_version():
+    assert key("Dog  Food") == key("dog food ")
+    assert key("dog food", version=(("docstore.json", 1, 10),)) != key("dog food", version=(("docstore.json", 2, 10),))
+    assert key("dog food", top_k=5) != key("dog food", top_k=3)
+    assert key("dog food", mode="vector") != key("dog food", mode="hybrid")
+
+
+def test_new_fingerprint_misses_and_invalidate_drops_only_that_directory():
+    cache = ResultCache(max_entries=8, ttl=60)
+    cache.put(key("dog food"), "old build")
+    cache.put(key("cat toys", storage_dir="/storage_petcare"), "other index")
+
+    assert cache.get(key("dog food", version=("v2",))) is None
+    assert cache.invalidate("/storage") == 1
+    assert cache.get(key("dog food")) is None
+    assert cache.get(key("cat toys", storage_dir="/storage_petcare")) == "other index"
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=0, ttl=60)
+    cache.put(key("dog food"), "nodes")
+    assert cache.get(key("dog food")) is None
+    assert cache.stats()["entries"] == 0
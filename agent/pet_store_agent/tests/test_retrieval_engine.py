@@ -0,0 +1,124 @@
+"""
+Tests for sharing one retrieval engine per storage directory and region
+"""
+
+import os
+
+import pytest
+
+import result_cache
+import retrieval_engine
+from result_cache import ResultCache, get_result_cache
+from retrieval_engine import get_retrieval_engine, resolve_storage_dir, storage_fingerprint
+
+
+@pytest.fixture
+def always_check(monkeypatch):
+    """Re-stat the storage directory on every query instead of every few seconds"""
+    monkeypatch.setattr(retrieval_engine, "RELOAD_CHECK_INTERVAL", 0)
+
+
+def node_ids(nodes):
+    return [n.node.node_id for n in nodes]
+
+
+def test_engine_is_shared_per_directory_and_region(tmp_path):
+    engine = get_retrieval_engine(tmp_path, "us-east-1")
+    assert get_retrieval_engine(tmp_path / ".", "us-east-1") is engine
+    assert get_retrieval_engine(tmp_path, "us-west-2") is not engine
+
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    assert get_retrieval_engine(other_dir, "us-east-1") is not engine
+
+
+def test_fingerprint_changes_when_a_file_is_rebuilt(tmp_path):
+    store = tmp_path / "docstore.json"
+    store.write_text("{}")
+    before = storage_fingerprint(tmp_path)
+    assert storage_fingerprint(tmp_path) == before
+
+    stat = store.stat()
+    os.utime(store, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert storage_fingerprint(tmp_path) != before
+
+    after_touch = storage_fingerprint(tmp_path)
+    (tmp_path / "vector_store.json").write_text("{}")
+    assert storage_fingerprint(tmp_path) != after_touch
+
+
+def test_fingerprint_of_missing_directory_is_empty(tmp_path):
+    assert storage_fingerprint(tmp_path / "missing") == ()
+
+
+def test_storage_dir_setting_resolves_inside_the_package():
+    assert resolve_storage_dir("./storage").name == "storage"
+    assert resolve_storage_dir("./storage").parent == resolve_storage_dir("storage").parent
+
+
+def test_index_is_loaded_once_across_retrievals(stub_engine, always_check):
+    first = stub_engine.retrieve("Doggy Delights dog food", 3)
+    snapshot = stub_engine.snapshot()
+    for query in ("cat toys", "bird seed", "Doggy Delights dog food"):
+        stub_engine.retrieve(query, 3)
+    assert stub_engine.loads == 1
+    assert stub_engine.snapshot() is snapshot
+    assert len(first) == 3
+    assert get_result_cache().stats()["hits"] == 1
+
+
+def test_rebuilt_storage_is_reloaded(stub_engine, stub_package, ingest_stub, always_check):
+    query = "Doggy Delights premium dog food"
+    old_snapshot = stub_engine.snapshot()
+    stub_engine.retrieve(query, 3)
+
+    catalog = stub_package / "data" / "products.txt"
+    catalog.write_text(catalog.read_text().replace("Doggy Delights", "Canine Cuisine"))
+    ingest_stub()
+
+    nodes = stub_engine.retrieve(query, 3, mode="lexical")
+    assert stub_engine.loads == 2
+    assert stub_engine.snapshot() is not old_snapshot
+    assert "Canine Cuisine" in nodes[0].node.get_content()
+    # A query still holding the old snapshot keeps reading the old build
+    old_hits = old_snapshot.nodes_with_scores(old_snapshot.lexical_index().search(query, 1))
+    assert "Doggy Delights" in old_hits[0].node.get_content()
+    assert get_result_cache().stats()["invalidated"] == 1
+
+
+def test_failed_reload_keeps_the_old_snapshot_and_drops_cached_results(stub_engine, stub_package, always_check):
+    before = node_ids(stub_engine.retrieve("cat toys", 3))
+    snapshot = stub_engine.snapshot()
+
+    # A half-written rebuild: the metadata file no longer parses
+    meta = stub_package / "storage" / "default__vector_store.meta.json"
+    complete = meta.read_text()
+    meta.write_text("{")
+
+    assert node_ids(stub_engine.retrieve("cat toys", 3)) == before
+    assert stub_engine.snapshot() is snapshot
+    assert stub_engine.loads == 1
+    stats = get_result_cache().stats()
+    assert stats["invalidated"] == 1
+    assert stats["hits"] == 0
+
+    # The broken build is not retried on every query, only once the files change again
+    stub_engine.retrieve("bird seed", 3)
+    assert stub_engine.loads == 1
+    meta.write_text(complete)
+    stub_engine.retrieve("bird seed", 3)
+    assert stub_engine.loads == 2
+
+
+@pytest.mark.parametrize("filters", [None, {"species": "dog"}])
+def test_batch_matches_per_query_retrieval(stub_engine, monkeypatch, filters):
+    # Uncached, so the per-query results come from the retriever rather than the batch's cache entries
+    monkeypatch.setattr(result_cache, "_cache", ResultCache(max_entries=0))
+    queries = ["Doggy Delights dog food", "cat scratching post", "bird seed", "Doggy Delights dog food"]
+
+    batch = stub_engine.retrieve_batch(queries, 3, filters=filters)
+    for query, nodes in zip(queries, batch):
+        expected = stub_engine.retrieve(query, 3, filters=filters)
+        assert node_ids(nodes) == node_ids(expected)
+        assert [n.score for n in nodes] == pytest.approx([n.score for n in expected], abs=1e-6)
+        assert nodes[0].node.get_content() == expected[0].node.get_content()
@@ -0,0 +1,66 @@
+"""
+Tests for the read-only, memory-mapped docstore
+"""
+
+import os
+
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.storage.docstore import SimpleDocumentStore
+
+from shared_docstore import (ReadOnlyStoreError, blob_path, docstore_json_path, index_path, load_shared_docstore,
+                             write_shared_docstore)
+
+
+def nodes():
+    return [
+        TextNode(id_="n1", text="Doggy Delights Premium Dog Food", metadata={"sku": "DD006", "species": ["dog"]}),
+        TextNode(id_="n2", text="Purrfect Paws cat toys – \U0001f408", metadata={"sku": "PP020"}),
+        TextNode(id_="n3", text="", metadata={}),
+    ]
+
+
+@pytest.fixture
+def storage_dir(tmp_path):
+    docstore = SimpleDocumentStore()
+    docstore.add_documents(nodes())
+    docstore.persist(str(docstore_json_path(tmp_path)))
+    assert write_shared_docstore(tmp_path) == 3
+    return tmp_path
+
+
+def test_nodes_read_back_through_kv_document_store(storage_dir):
+    docstore = load_shared_docstore(storage_dir)
+    assert docstore is not None
+    for expected in nodes():
+        node = docstore.get_node(expected.node_id)
+        assert node.get_content() == expected.get_content()
+        assert node.metadata == expected.metadata
+    assert set(docstore.docs) == {"n1", "n2", "n3"}
+    assert docstore.document_exists("n2")
+    assert docstore.get_node("missing", raise_error=False) is None
+
+
+def test_writes_raise_read_only_store_error(storage_dir):
+    docstore = load_shared_docstore(storage_dir)
+    with pytest.raises(ReadOnlyStoreError):
+        docstore.add_documents([TextNode(id_="n4", text="new")])
+    with pytest.raises(ReadOnlyStoreError):
+        docstore.delete_document("n1")
+    # Callers catching the builtin permission error still see it
+    with pytest.raises(PermissionError):
+        docstore._kvstore.put("n5", {}, collection="docstore/data")
+    assert docstore.get_node("n1").get_content() == "Doggy Delights Premium Dog Food"
+
+
+def test_older_mapped_files_fall_back_to_docstore_json(storage_dir):
+    newer = os.stat(index_path(storage_dir)).st_mtime_ns + 1_000_000
+    os.utime(docstore_json_path(storage_dir), ns=(newer, newer))
+    assert load_shared_docstore(storage_dir) is None
+
+
+def test_empty_docstore_maps_without_error(tmp_path):
+    SimpleDocumentStore().persist(str(docstore_json_path(tmp_path)))
+    assert write_shared_docstore(tmp_path) == 0
+    assert blob_path(tmp_path).stat().st_size == 0
+    assert load_shared_docstore(tmp_path).docs == {}
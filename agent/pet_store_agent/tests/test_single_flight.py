@@ -0,0 +1,68 @@
+"""
+Tests for single-flight coalescing of identical tool calls
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight, call_key
+
+
+def test_call_key_ignores_dict_ordering():
+    assert call_key("tool", {"a": 1, "b": 2}) == call_key("tool", {"b": 2, "a": 1})
+    assert call_key("tool", {"a": 1}) != call_key("other", {"a": 1})
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    executions = []
+
+    def slow():
+        executions.append(1)
+        started.set()
+        release.wait(5)
+        return {"quantity": 150}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(group.do, "key", slow, "get_inventory")
+        assert started.wait(5)
+        followers = [pool.submit(group.do, "key", slow, "get_inventory") for _ in range(3)]
+        # Followers register as coalesced before the leader finishes
+        while group.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result(5)] + [f.result(5) for f in followers]
+
+    assert results == [{"quantity": 150}] * 4
+    assert len(executions) == 1
+    stats = group.stats()
+    assert stats["coalesced_by_tool"] == {"get_inventory": 3}
+    assert stats["in_flight"] == 0
+
+
+def test_leader_exception_reaches_followers_and_is_not_kept():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("lambda down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(group.do, "key", failing)
+        assert started.wait(5)
+        follower = pool.submit(group.do, "key", failing)
+        while group.stats()["coalesced"] < 1:
+            time.sleep(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result(5)
+
+    # Nothing is cached after the call: the next one executes again
+    assert group.do("key", lambda: "ok") == "ok"
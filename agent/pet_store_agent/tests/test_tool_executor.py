@@ -0,0 +1,146 @@
+"""
+Tests for awaitable tools on the shared executor and the agent's async entry points
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+from langgraph.prebuilt import create_react_agent
+
+from invocation_memo import current_memo, invocation_scope, memoize_tool
+from pet_store_agent_full_ld import PetStoreAgent, RuntimeConfig, _system_prompt
+from tool_executor import add_async
+
+TOOL_SECONDS = 0.3
+
+
+def slow_tool(calls: List[Dict[str, Any]]):
+    """Registry-style tool (memo + async wrapper) that records where and when it ran"""
+
+    @tool
+    def slow_lookup(query: str) -> str:
+        """Look something up slowly."""
+        started = time.perf_counter()
+        time.sleep(TOOL_SECONDS)
+        calls.append({"query": query, "thread": threading.current_thread().name, "memo": current_memo(),
+                      "started": started, "ended": time.perf_counter()})
+        return f"answer for {query}"
+
+    return add_async(memoize_tool(slow_lookup))
+
+
+def overlapped(calls: List[Dict[str, Any]]) -> bool:
+    first, second = sorted(calls, key=lambda c: c["started"])[:2]
+    return second["started"] < first["ended"]
+
+
+def test_async_tool_calls_overlap_on_the_executor():
+    calls: List[Dict[str, Any]] = []
+    lookup = slow_tool(calls)
+
+    async def run():
+        return await asyncio.gather(lookup.ainvoke({"query": "a"}), lookup.ainvoke({"query": "b"}))
+
+    assert asyncio.run(run()) == ["answer for a", "answer for b"]
+    assert overlapped(calls)
+    assert all(call["thread"].startswith("tool") for call in calls)
+
+
+def test_invocation_memo_reaches_the_worker_thread():
+    calls: List[Dict[str, Any]] = []
+    lookup = slow_tool(calls)
+
+    async def run():
+        with invocation_scope() as memo:
+            await lookup.ainvoke({"query": "dog food"})
+            await lookup.ainvoke({"query": "Dog food?"})
+        return memo
+
+    memo = asyncio.run(run())
+    assert len(calls) == 1
+    assert calls[0]["memo"] is memo
+    assert memo.stats()["deduplicated"] == 1
+
+
+class ToolCallingFakeModel(FakeMessagesListChatModel):
+    """Replays canned AI messages (including tool calls) from a create_react_agent graph"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class Recorder:
+    """Stands in for the LaunchDarkly tracker and client"""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.events.append((name, args, kwargs))
+
+
+@pytest.fixture
+def agent():
+    """PetStoreAgent without a LaunchDarkly connection: _prepare returns a graph over a fake model"""
+    calls: List[Dict[str, Any]] = []
+    model = ToolCallingFakeModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "slow_lookup", "args": {"query": "a"}, "id": "1"},
+                                          {"name": "slow_lookup", "args": {"query": "b"}, "id": "2"}]),
+        AIMessage(content="", tool_calls=[{"name": "slow_lookup", "args": {"query": "A"}, "id": "3"}]),
+        AIMessage(content="done"),
+    ])
+    graph = create_react_agent(model, [slow_tool(calls)], prompt=RunnableLambda(_system_prompt))
+    tracker = Recorder()
+    rc = RuntimeConfig(enabled=True, instructions="Be helpful", model_name="fake", provider_name="fake",
+                       parameters={}, custom={}, variation_key="v1", tracker=tracker)
+
+    pet_agent = PetStoreAgent.__new__(PetStoreAgent)
+    pet_agent.ld = Recorder()
+    pet_agent.prepared_on = []
+
+    def prepare(prompt, user_ctx):
+        pet_agent.prepared_on.append(threading.current_thread())
+        return rc, graph, {"messages": [("user", prompt)]}, {"configurable": {}}
+
+    pet_agent._prepare = prepare
+    pet_agent.calls, pet_agent.tracker, pet_agent.model = calls, tracker, model
+    return pet_agent
+
+
+def test_ainvoke_runs_tool_calls_concurrently_with_the_memo_in_scope(agent):
+    assert asyncio.run(agent.ainvoke("hello")) == "done"
+
+    # "a" and "b" from the first AI message overlapped; the repeated "A" came from the memo
+    assert sorted(call["query"] for call in agent.calls) == ["a", "b"]
+    assert overlapped(agent.calls)
+    assert agent.calls[0]["memo"] is not None and agent.calls[0]["memo"] is agent.calls[1]["memo"]
+    assert agent.prepared_on[0] is not threading.main_thread()
+    assert [name for name, _, _ in agent.ld.events] == ["track"]
+    assert agent.ld.events[0][2]["metric_value"] == 1
+    assert {name for name, _, _ in agent.tracker.events} >= {"track_duration", "track_success"}
+
+
+def test_invoke_works_inside_a_running_event_loop(agent):
+    async def called_from_async_code():
+        return agent.invoke("hello")
+
+    assert asyncio.run(called_from_async_code()) == "done"
+
+
+def test_failed_run_is_timed_and_reported(agent):
+    # With no canned responses left the model call raises inside the graph run
+    agent.model.responses = []
+
+    response = json.loads(asyncio.run(agent.ainvoke("hello")))
+    assert response["status"] == "Error"
+    names = [name for name, _, _ in agent.tracker.events]
+    assert "track_duration" in names and "track_error" in names
+    assert "track_success" not in names
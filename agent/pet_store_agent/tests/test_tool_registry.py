@@ -0,0 +1,66 @@
+"""
+Tests for the RAG tools built from LaunchDarkly custom config
+"""
+
+import json
+
+import pytest
+
+import tool_registry
+from tool_registry import build_retrieve_product_info_batch_tool, build_retrieve_product_info_tool
+
+
+@pytest.fixture
+def tools(stub_engine, monkeypatch):
+    """Build (single, batch) product tools for a custom config, both searching the stub engine"""
+    monkeypatch.setattr(tool_registry, "get_retrieval_engine", lambda storage_dir, aws_region: stub_engine)
+
+    def build(**custom):
+        return (build_retrieve_product_info_tool(custom, "stub-region"),
+                build_retrieve_product_info_batch_tool(custom, "stub-region"))
+
+    return build
+
+
+@pytest.mark.parametrize("mode", ["vector", "hybrid", "lexical"])
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_batch_tool_matches_single_tool_in_each_mode(tools, mode, fast_path):
+    single, batch = tools(llamaindex_retrieval_mode=mode, llamaindex_similarity_top_k=3,
+                          product_fast_path=fast_path)
+    queries = ["Doggy Delights", "toys for a playful kitten", "seed mix for parrots"]
+
+    answers = json.loads(batch.invoke({"queries": queries}))["results"]
+    assert [answer["query"] for answer in answers] == queries
+    for query, answer in zip(queries, answers):
+        assert answer["results"] == json.loads(single.invoke({"query": query}))["results"]
+
+
+def test_batch_tool_retries_a_filtered_query_that_matches_nothing(tools, stub_package, ingest_stub):
+    # Rebuild the stub index without the small-pet products, so that filter empties the search
+    catalog = stub_package / "data" / "products.txt"
+    text = catalog.read_text()
+    catalog.write_text(text[:text.index("SMALL PETS")] + text[text.index("BIRD SUPPLIES"):])
+    ingest_stub()
+
+    single, batch = tools(llamaindex_similarity_top_k=3, product_fast_path=False)
+    answers = json.loads(batch.invoke({"queries": ["cozy bedding", "chew toy"], "species": "small_pet"}))["results"]
+    for answer in answers:
+        assert answer["results"]
+        assert answer["results"] == json.loads(
+            single.invoke({"query": answer["query"], "species": "small_pet"}))["results"]
+
+
+def product_skus(stub_engine, answer: str):
+    docstore = stub_engine.snapshot().index.docstore
+    return {docstore.get_node(record["node_id"]).metadata["sku"] for record in json.loads(answer)["results"]}
+
+
+def test_species_and_category_arguments_filter_the_search(tools, stub_engine):
+    single, _ = tools(llamaindex_similarity_top_k=10, product_fast_path=False)
+    assert product_skus(stub_engine, single.invoke({"query": "toys", "species": "kittens"})) == \
+        {"KC015", "PP020", "WF008"}
+    assert product_skus(stub_engine, single.invoke({"query": "toys", "species": "cat", "category": "Cat Toys"})) == \
+        {"PP020"}
+    # Unknown species add no filter; a category nothing has falls back to the unfiltered search
+    assert len(product_skus(stub_engine, single.invoke({"query": "toys", "species": "fish"}))) == 10
+    assert len(product_skus(stub_engine, single.invoke({"query": "toys", "category": "aquariums"}))) == 10
@@ -0,0 +1,182 @@
+"""
+Tests for the NumPy vector store that replaces SimpleVectorStore
+"""
+
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import (FilterCondition, FilterOperator, MetadataFilter, MetadataFilters,
+                                                  VectorStoreQuery)
+
+from vector_store import MatrixState, NumpyVectorStore, normalize_rows
+
+
+def random_state(count: int = 200, dim: int = 32, seed: int = 0) -> MatrixState:
+    matrix = normalize_rows(np.random.default_rng(seed).normal(size=(count, dim)))
+    ids = tuple(f"n{i}" for i in range(count))
+    return MatrixState(ids, (None,) * count, ({},) * count, matrix)
+
+
+def make_node(node_id: str, doc_id: str, embedding, **metadata) -> TextNode:
+    node = TextNode(id_=node_id, text=f"text of {node_id}", embedding=list(map(float, embedding)),
+                    metadata=metadata)
+    node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=doc_id)
+    return node
+
+
+def random_nodes(count: int, dim: int = 8, seed: int = 0, docs: int = 3):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim))
+    return [make_node(f"n{i}", f"doc{i % docs}", vectors[i], species="dog" if i % 2 else "cat")
+            for i in range(count)]
+
+
+def row_of(store: NumpyVectorStore, node_id: str) -> int:
+    return store.state.ids.index(node_id)
+
+
+def test_persisted_json_round_trips_and_loads_in_stock_llamaindex(tmp_path):
+    nodes = random_nodes(12)
+    store = NumpyVectorStore()
+    store.add(nodes)
+    path = tmp_path / "default__vector_store.json"
+    store.persist(str(path))
+
+    reloaded = NumpyVectorStore.from_persist_path(str(path))
+    assert reloaded.state.ids == store.state.ids
+    assert reloaded.state.ref_doc_ids == store.state.ref_doc_ids
+    assert reloaded.state.metadata == store.state.metadata
+    np.testing.assert_allclose(reloaded.state.matrix, store.state.matrix, atol=1e-6)
+
+    stock = SimpleVectorStore.from_persist_path(str(path))
+    query = VectorStoreQuery(query_embedding=list(map(float, nodes[4].embedding)), similarity_top_k=5)
+    expected = stock.query(query)
+    actual = store.query(query)
+    assert actual.ids == expected.ids
+    assert actual.similarities == pytest.approx(expected.similarities, abs=1e-5)
+
+
+def test_search_matches_brute_force_order():
+    state = random_state()
+    store = NumpyVectorStore(state=state)
+    for query in np.random.default_rng(3).normal(size=(10, 32)):
+        scores = state.matrix @ normalize_rows(query)
+        expected = np.argsort(-scores, kind="stable")[:7]
+        ids, found = store.search(query, 7)
+        assert ids == [state.ids[row] for row in expected]
+        assert found == pytest.approx(scores[expected].tolist(), abs=1e-6)
+        assert found == sorted(found, reverse=True)
+
+
+def test_search_within_rows_and_top_k_larger_than_store():
+    state = random_state(count=20)
+    store = NumpyVectorStore(state=state)
+    rows = np.asarray([2, 5, 11])
+    ids, _ = store.search(state.matrix[5], 10, rows=rows)
+    assert ids[0] == "n5"
+    assert sorted(ids) == ["n11", "n2", "n5"]
+    assert len(store.search(state.matrix[0], 50)[0]) == 20
+
+
+def test_delete_then_add_keeps_ids_rows_and_metadata_aligned():
+    nodes = random_nodes(9, docs=3)
+    store = NumpyVectorStore()
+    store.add(nodes)
+    store.delete("doc1")
+    assert list(store.state.ids) == [n.node_id for n in nodes if n.ref_doc_id != "doc1"]
+
+    replacement = make_node("n0", "doc0", np.ones(8), species="bird")
+    added = random_nodes(3, seed=7, docs=1)
+    for node in added:
+        node.id_ = f"new-{node.node_id}"
+    store.add([replacement] + added)
+
+    state = store.state
+    assert len(state.ids) == len(set(state.ids)) == state.matrix.shape[0] == len(state.metadata)
+    assert set(state.ids) == {"n2", "n3", "n5", "n6", "n8", "n0", "new-n0", "new-n1", "new-n2"}
+    expected = {n.node_id: n for n in nodes + [replacement] + added}
+    for row, node_id in enumerate(state.ids):
+        node = expected[node_id]
+        np.testing.assert_allclose(state.matrix[row], normalize_rows(np.asarray(node.embedding)), atol=1e-6)
+        assert state.ref_doc_ids[row] == node.ref_doc_id
+        assert state.metadata[row]["species"] == node.metadata["species"]
+        assert store.search(node.embedding, 1)[0] == [node_id]
+    # Replaced in place, not duplicated, and the posting lists follow the new rows
+    assert state.metadata[row_of(store, "n0")]["species"] == "bird"
+    assert [state.ids[r] for r in store.rows_matching({"species": "bird"})] == ["n0"]
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_quantized_search_with_rescore_matches_exact_search(precision):
+    store = NumpyVectorStore(state=random_state())
+    queries = np.random.default_rng(1).normal(size=(20, 32))
+    for query in queries:
+        exact_ids, exact_scores = store.search(query, 5)
+        ids, scores = store.search(query, 5, precision=precision, rescore_candidates=20)
+        assert ids == exact_ids
+        assert scores == pytest.approx(exact_scores, abs=1e-6)
+
+
+def test_quantized_scores_approximate_cosine():
+    state = random_state()
+    query = normalize_rows(np.random.default_rng(2).normal(size=32))
+    exact = state.matrix @ query
+    assert state.quantized_matrix("float16").scores(query) == pytest.approx(exact, abs=1e-3)
+    assert state.quantized_matrix("int8").scores(query) == pytest.approx(exact, abs=2e-2)
+
+
+@pytest.fixture(scope="module")
+def species_store() -> NumpyVectorStore:
+    """One row per kind of species metadata: scalar, list, mixed case, missing"""
+    metadata = {
+        "dog": {"species": "dog", "category": "dog food"},
+        "dog_cat": {"species": ["dog", "cat"], "category": "grooming"},
+        "cat": {"species": ["cat"], "category": "cat toys"},
+        "Cat": {"species": "Cat", "category": "cat food"},
+        "bird": {"species": "bird", "category": "bird food"},
+        "dup": {"species": ["bird", "Bird"], "category": "bird housing"},
+        "none": {"category": "gift cards"},
+    }
+    ids = tuple(metadata)
+    matrix = normalize_rows(np.random.default_rng(5).normal(size=(len(ids), 8)))
+    return NumpyVectorStore(state=MatrixState(ids, (None,) * len(ids), tuple(metadata.values()), matrix))
+
+
+def filtered_ids(store: NumpyVectorStore, *filters, condition=FilterCondition.AND):
+    query = VectorStoreQuery(query_embedding=[1.0] * 8, similarity_top_k=20,
+                             filters=MetadataFilters(filters=list(filters), condition=condition))
+    return set(store.query(query).ids)
+
+
+@pytest.mark.parametrize("operator, value, expected", [
+    (FilterOperator.EQ, "dog", {"dog", "dog_cat"}),
+    (FilterOperator.EQ, "cat", {"dog_cat", "cat", "Cat"}),
+    (FilterOperator.EQ, "BIRD", {"bird", "dup"}),
+    (FilterOperator.IN, ["dog", "bird"], {"dog", "dog_cat", "bird", "dup"}),
+    (FilterOperator.IN, "dog", {"dog", "dog_cat"}),
+    (FilterOperator.NE, "dog", {"cat", "Cat", "bird", "dup", "none"}),
+    (FilterOperator.NIN, ["dog", "cat"], {"bird", "dup", "none"}),
+    (FilterOperator.NIN, "bird", {"dog", "dog_cat", "cat", "Cat", "none"}),
+])
+def test_filter_operators_on_scalar_and_list_metadata(species_store, operator, value, expected):
+    assert filtered_ids(species_store, MetadataFilter(key="species", value=value, operator=operator)) == expected
+
+
+def test_filter_that_matches_nothing_returns_no_results(species_store):
+    assert filtered_ids(species_store, MetadataFilter(key="species", value="fish")) == set()
+    assert filtered_ids(species_store, MetadataFilter(key="colour", value="red")) == set()
+    assert filtered_ids(species_store, MetadataFilter(key="species", value=[], operator=FilterOperator.IN)) == set()
+
+
+def test_filters_combine_with_and_or_and_nesting(species_store):
+    cat = MetadataFilter(key="species", value="cat")
+    toys = MetadataFilter(key="category", value="Cat Toys")
+    birds = MetadataFilters(filters=[MetadataFilter(key="species", value="bird"),
+                                     MetadataFilter(key="category", value="bird food")])
+    assert filtered_ids(species_store, cat, toys) == {"cat"}
+    assert filtered_ids(species_store, toys, birds, condition=FilterCondition.OR) == {"cat", "bird"}
+
+
+def test_unsupported_filter_operator_is_rejected(species_store):
+    with pytest.raises(ValueError, match="does not support"):
+        filtered_ids(species_store, MetadataFilter(key="price", value=10, operator=FilterOperator.GT))
@@ -0,0 +1,71 @@
+"""
+Tool Executor for Pet Store Agent
+Bounded thread pool that gives every blocking tool an awaitable version, so tool calls from one AI message overlap
+"""
+
+from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configuration from environment (shared by every tool in the process)
+TOOL_EXECUTOR_WORKERS = int(os.environ.get("TOOL_EXECUTOR_WORKERS", "16"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_active = 0
+_peak = 0
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool that runs blocking tool bodies (boto3 calls, retrieval)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, TOOL_EXECUTOR_WORKERS),
+                                               thread_name_prefix="tool")
+    return _executor
+
+
+def _run_tracked(func, *args, **kwargs) -> Any:
+    global _active, _peak
+    with _executor_lock:
+        _active += 1
+        _peak = max(_peak, _active)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        with _executor_lock:
+            _active -= 1
+
+
+def add_async(tool_obj: Any) -> Any:
+    """Give a sync LangChain tool a coroutine that runs its function on the tool executor.
+
+    The function is looked up at call time, so wrappers applied to ``func``
+    (memo, single-flight) apply to both paths. Context variables such as the
+    invocation memo are copied into the worker thread.
+    """
+    if getattr(tool_obj, "func", None) is None:
+        return tool_obj
+
+    async def run_async(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, _run_tracked, tool_obj.func, *args, **kwargs)
+        return await loop.run_in_executor(get_tool_executor(), call)
+
+    tool_obj.coroutine = run_async
+    return tool_obj
+
+
+def executor_stats() -> Dict[str, Any]:
+    with _executor_lock:
+        return {"max_workers": TOOL_EXECUTOR_WORKERS, "active": _active, "peak_active": _peak}
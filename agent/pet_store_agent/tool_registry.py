@@ -3,88 +3,265 @@ Tool Registry for Pet Store Agent
 Maps tool names to builder functions that create LangChain/LangGraph-compatible tools
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.tools import tool
 import logging
 import os
 import json
-import boto3
-from pathlib import Path
+import functools
+from aws_clients import get_client
+from chunking import normalize_species
+from context_payload import build_payload
+from invocation_memo import memoize_tool
+from lambda_cache import (get_lambda_cache, hash_key, is_error_response, redact, response_body, unredact,
+                          wrap_body, LambdaErrorResponse)
+from product_catalog import get_product_catalog
+from reranker import select_adaptive
+from retrieval_engine import get_retrieval_engine, resolve_storage_dir
+from single_flight import call_key, coalesce_tool
+from tool_executor import add_async
 
 logger = logging.getLogger(__name__)
 
 
+def _vector_search_options(custom: Dict[str, Any]) -> Dict[str, Any]:
+    """Vector search trade-offs (precision, ANN index) from LaunchDarkly custom config"""
+    return {
+        "precision": custom.get("llamaindex_vector_precision", "float32"),
+        "rescore_candidates": int(custom.get("llamaindex_rescore_candidates", 0)),
+        "index_type": custom.get("llamaindex_ann_index", "flat"),
+        "nprobe": int(custom.get("llamaindex_ann_nprobe", 8)),
+    }
+
+
+def _context_options(custom: Dict[str, Any], mode: str = "vector") -> Dict[str, Any]:
+    """How much retrieved text may reach the model, from LaunchDarkly custom config.
+
+    ``mode`` is the retrieval mode the scores come from; the score threshold
+    only applies to ``vector`` (cosine) results.
+    """
+    min_score = custom.get("llamaindex_min_score")
+    return {
+        "max_tokens": int(custom.get("llamaindex_context_max_tokens", 0)),
+        "max_chars": int(custom.get("llamaindex_context_max_chars", 0)),
+        "min_score": float(min_score) if min_score not in (None, "") else None,
+        "mode": mode,
+    }
+
+
+def _adaptive_options(custom: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Over-fetch + local re-rank + score-gap cutoff settings, or None when disabled"""
+    adaptive = custom.get("llamaindex_adaptive_top_k", False)
+    if isinstance(adaptive, str):
+        adaptive = adaptive.lower() == "true"
+    if not adaptive:
+        return None
+    return {
+        "overfetch": max(1, int(custom.get("llamaindex_overfetch_factor", 3))),
+        "max_gap": float(custom.get("llamaindex_score_gap", 0.15)),
+        "min_relevance": float(custom.get("llamaindex_min_relevance", 0.25)),
+    }
+
+
+def _fetch_k(similarity_top_k: int, adaptive: Optional[Dict[str, Any]]) -> int:
+    return similarity_top_k * adaptive["overfetch"] if adaptive else similarity_top_k
+
+
+def _adaptive_select(engine, query: str, nodes: List[Any], similarity_top_k: int,
+                     adaptive: Optional[Dict[str, Any]], catalog_file=None) -> List[Any]:
+    """Re-rank over-fetched candidates locally and keep as many as the scores justify"""
+    if not adaptive:
+        return nodes
+    catalog = get_product_catalog(catalog_file) if catalog_file else None
+    return select_adaptive(query, nodes, similarity_top_k, adaptive,
+                           lexical=engine.lexical_index(), catalog=catalog)
+
+
+def _metadata_filters(species: Optional[str] = None, category: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """Tool filter arguments as metadata equality filters (None when nothing is set)"""
+    filters: Dict[str, str] = {}
+    if species and normalize_species(species):
+        filters["species"] = normalize_species(species)
+    if category:
+        filters["category"] = category.strip().lower()
+    return filters or None
+
+
+def _structured_product_results(product_catalog_file, query: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """Structured catalog records for the products a query names, and whether they answer all of it.
+
+    The second value is False when part of the query may name a product the
+    catalog does not know, so the caller still has to run RAG.
+    """
+    catalog = get_product_catalog(product_catalog_file)
+    if catalog is None:
+        return [], False
+    products, unresolved = catalog.resolve(query)
+    records = [
+        {
+            "content": product.to_dict(),
+            "relevance_score": 1.0,
+            "source": "Pet Store Product Catalog (structured index)"
+        }
+        for product in products
+    ]
+    return records, bool(products) and not unresolved
+
+
 def build_retrieve_product_info_tool(custom: Dict[str, Any], aws_region: str):
     """Build retrieve_product_info tool using LlamaIndex - ALWAYS uses real RAG"""
 
     # Get configuration from LaunchDarkly custom config
     storage_dir_name = custom.get("llamaindex_storage_dir", "./storage")
     similarity_top_k = int(custom.get("llamaindex_similarity_top_k", 5))
+    search_options = _vector_search_options(custom)
+    retrieval_mode = custom.get("llamaindex_retrieval_mode", "vector")
+    lexical_confidence = float(custom.get("llamaindex_lexical_confidence", 0.8))
+    context_options = _context_options(custom, retrieval_mode)
+    adaptive = _adaptive_options(custom)
+
+    # Structured SKU/name lookup that skips RAG when the catalog resolves every product the query names
+    product_fast_path = custom.get("product_fast_path", True)
+    if isinstance(product_fast_path, str):
+        product_fast_path = product_fast_path.lower() == "true"
+    product_catalog_file = resolve_storage_dir(custom.get("product_catalog_file", "./data/products.txt"))
+
+    # Get the correct path to storage directory from config
+    storage_dir = resolve_storage_dir(storage_dir_name)
 
     @tool
-    def retrieve_product_info(query: str) -> str:
+    def retrieve_product_info(query: str, species: Optional[str] = None, category: Optional[str] = None) -> str:
         """Retrieve product information from the pet store catalog using LlamaIndex RAG.
 
         Args:
             query: Search query for product information
+            species: Optional animal the products are for: dog, cat, small_pet or bird
+            category: Optional exact product category, e.g. "dog food" or "cat toys"
 
         Returns:
             JSON string with product information from indexed PDFs
         """
-        from llama_index.core import StorageContext, load_index_from_storage, Settings
-        from llama_index.embeddings.bedrock import BedrockEmbedding
-
-        # Get the correct path to storage directory from config
-        current_dir = Path(__file__).parent
-        storage_dir = current_dir / storage_dir_name.lstrip("./")
-
-        # Set up Bedrock embeddings with AWS session
-        if os.environ.get('AWS_PROFILE'):
-            boto_session = boto3.Session(
-                profile_name=os.environ.get('AWS_PROFILE'),
-                region_name=aws_region
-            )
-            bedrock_client = boto_session.client('bedrock-runtime')
-        else:
-            bedrock_client = boto3.client(
-                'bedrock-runtime',
-                region_name=aws_region
+        structured: List[Dict[str, Any]] = []
+        if product_fast_path:
+            structured, complete = _structured_product_results(product_catalog_file, query)
+            if complete:
+                records, _ = build_payload([], "Pet Store Product Catalog (PDFs)", structured=structured,
+                                           **context_options)
+                return json.dumps({"results": records})
+
+        engine = get_retrieval_engine(storage_dir, aws_region)
+        filters = _metadata_filters(species, category)
+        nodes = engine.retrieve(
+            query,
+            _fetch_k(similarity_top_k, adaptive),
+            mode=retrieval_mode,
+            lexical_confidence=lexical_confidence,
+            filters=filters,
+            **search_options
+        )
+        if not nodes and filters:
+            # Index built without attributes, or a filter that matches nothing: search everything
+            nodes = engine.retrieve(
+                query,
+                _fetch_k(similarity_top_k, adaptive),
+                mode=retrieval_mode,
+                lexical_confidence=lexical_confidence,
+                **search_options
             )
+        nodes = _adaptive_select(engine, query, nodes, similarity_top_k, adaptive, product_catalog_file)
 
-        embed_model = BedrockEmbedding(
-            model_name="amazon.titan-embed-text-v2:0",  # Same model used to create storage
-            client=bedrock_client
-        )
-        Settings.embed_model = embed_model
+        # Catalog matches first, then one record per retrieved chunk, deduplicated and cut to the context budget
+        records, _ = build_payload(nodes, "Pet Store Product Catalog (PDFs)", structured=structured,
+                                   **context_options)
+        result: Dict[str, Any] = {"results": records}
+        if not records:
+            result["message"] = "No relevant information found"
 
-        # Load pre-built index from storage
-        storage_context = StorageContext.from_defaults(persist_dir=str(storage_dir))
-        index = load_index_from_storage(storage_context)
+        return json.dumps(result)
 
-        # Use retriever directly to avoid LLM requirement
-        retriever = index.as_retriever(similarity_top_k=similarity_top_k)
-        nodes = retriever.retrieve(query)
+    return retrieve_product_info
 
-        # Combine the text from retrieved nodes
-        if nodes:
-            content = "\n".join([node.text for node in nodes])
-        else:
-            content = "No relevant information found"
 
-        # Parse and structure the response
-        result = {
+def build_retrieve_product_info_batch_tool(custom: Dict[str, Any], aws_region: str):
+    """Build retrieve_product_info_batch tool - several product lookups in one call"""
+
+    # Get configuration from LaunchDarkly custom config
+    storage_dir_name = custom.get("llamaindex_storage_dir", "./storage")
+    similarity_top_k = int(custom.get("llamaindex_similarity_top_k", 5))
+    search_options = _vector_search_options(custom)
+    retrieval_mode = custom.get("llamaindex_retrieval_mode", "vector")
+    lexical_confidence = float(custom.get("llamaindex_lexical_confidence", 0.8))
+    context_options = _context_options(custom, retrieval_mode)
+    adaptive = _adaptive_options(custom)
+
+    product_fast_path = custom.get("product_fast_path", True)
+    if isinstance(product_fast_path, str):
+        product_fast_path = product_fast_path.lower() == "true"
+    product_catalog_file = resolve_storage_dir(custom.get("product_catalog_file", "./data/products.txt"))
+
+    storage_dir = resolve_storage_dir(storage_dir_name)
+
+    def search(engine, batch: List[str], filters: Optional[Dict[str, str]]) -> List[List[Any]]:
+        """Dense batch search in vector mode; hybrid/lexical rank each query as retrieve_product_info does"""
+        if retrieval_mode == "vector":
+            return engine.retrieve_batch(batch, _fetch_k(similarity_top_k, adaptive), filters=filters,
+                                         **search_options)
+        return [
+            engine.retrieve(query, _fetch_k(similarity_top_k, adaptive), mode=retrieval_mode,
+                            lexical_confidence=lexical_confidence, filters=filters, **search_options)
+            for query in batch
+        ]
+
+    @tool
+    def retrieve_product_info_batch(queries: List[str], species: Optional[str] = None) -> str:
+        """Retrieve product information for several products at once.
+
+        Use this instead of calling retrieve_product_info repeatedly when the
+        request mentions more than one product.
+
+        Args:
+            queries: One search query per product (name, SKU or description)
+            species: Optional animal all the products are for: dog, cat, small_pet or bird
+
+        Returns:
+            JSON string with one result entry per query, in the same order
+        """
+        answers: Dict[int, List[Dict[str, Any]]] = {}
+        structured: Dict[int, List[Dict[str, Any]]] = {}
+        if product_fast_path:
+            for position, query in enumerate(queries):
+                structured[position], complete = _structured_product_results(product_catalog_file, query)
+                if complete:
+                    answers[position], _ = build_payload([], "Pet Store Product Catalog (PDFs)",
+                                                         structured=structured[position], **context_options)
+
+        # Everything the catalog could not answer is searched together (one embedding round in vector mode)
+        pending = [position for position in range(len(queries)) if position not in answers]
+        if pending:
+            engine = get_retrieval_engine(storage_dir, aws_region)
+            filters = _metadata_filters(species)
+            batches = search(engine, [queries[p] for p in pending], filters)
+            empty = [i for i, nodes in enumerate(batches) if not nodes]
+            if empty and filters:
+                # Same fallback as retrieve_product_info: re-run the queries the filter emptied, unfiltered
+                retried = search(engine, [queries[pending[i]] for i in empty], None)
+                batches = list(batches)
+                for i, nodes in zip(empty, retried):
+                    batches[i] = nodes
+            for position, nodes in zip(pending, batches):
+                nodes = _adaptive_select(engine, queries[position], nodes, similarity_top_k, adaptive,
+                                         product_catalog_file)
+                answers[position], _ = build_payload(nodes, "Pet Store Product Catalog (PDFs)",
+                                                     structured=structured.get(position), **context_options)
+
+        return json.dumps({
             "results": [
-                {
-                    "content": content,
-                    "relevance_score": nodes[0].score if nodes and hasattr(nodes[0], "score") else 0.9,
-                    "source": "Pet Store Product Catalog (PDFs)"
-                }
+                {"query": query, "results": answers[position]}
+                for position, query in enumerate(queries)
             ]
-        }
+        })
 
-        return json.dumps(result)
-
-    return retrieve_product_info
+    return retrieve_product_info_batch
 
 
 def build_retrieve_pet_care_tool(custom: Dict[str, Any], aws_region: str):
@@ -94,27 +271,25 @@ def build_retrieve_pet_care_tool(custom: Dict[str, Any], aws_region: str):
     storage_dir_name = custom.get("llamaindex_storage_dir", "./storage")
     petcare_storage_dir_name = custom.get("llamaindex_petcare_storage_dir", "./storage_petcare")
     similarity_top_k = int(custom.get("llamaindex_similarity_top_k", 5))
+    search_options = _vector_search_options(custom)
+    context_options = _context_options(custom)
+    adaptive = _adaptive_options(custom)
+
+    petcare_storage = resolve_storage_dir(petcare_storage_dir_name)
+    main_storage = resolve_storage_dir(storage_dir_name)
 
     @tool
-    def retrieve_pet_care(query: str) -> str:
+    def retrieve_pet_care(query: str, species: Optional[str] = None) -> str:
         """Retrieve pet care advice using LlamaIndex RAG.
 
         Args:
             query: Search query for pet care information
+            species: Optional animal the advice is for: dog, cat, small_pet or bird
 
         Returns:
             JSON string with pet care advice from indexed content
         """
-        from llama_index.core import StorageContext, load_index_from_storage, Settings
-        from llama_index.embeddings.bedrock import BedrockEmbedding
-
-        # Get the correct path to storage directory from config
-        current_dir = Path(__file__).parent
-
         # Check if we have a separate pet care index, otherwise use main storage
-        petcare_storage = current_dir / petcare_storage_dir_name.lstrip("./")
-        main_storage = current_dir / storage_dir_name.lstrip("./")
-
         if petcare_storage.exists():
             storage_dir = petcare_storage
             source = "Pet Care Knowledge Base"
@@ -123,55 +298,62 @@ def build_retrieve_pet_care_tool(custom: Dict[str, Any], aws_region: str):
             storage_dir = main_storage
             source = "Pet Store Product Documentation"
 
-        # Set up Bedrock embeddings with AWS session
-        if os.environ.get('AWS_PROFILE'):
-            boto_session = boto3.Session(
-                profile_name=os.environ.get('AWS_PROFILE'),
-                region_name=aws_region
-            )
-            bedrock_client = boto_session.client('bedrock-runtime')
-        else:
-            bedrock_client = boto3.client(
-                'bedrock-runtime',
-                region_name=aws_region
-            )
-
-        embed_model = BedrockEmbedding(
-            model_name="amazon.titan-embed-text-v2:0",  # Same model used to create storage
-            client=bedrock_client
-        )
-        Settings.embed_model = embed_model
-
-        # Load index from storage
-        storage_context = StorageContext.from_defaults(persist_dir=str(storage_dir))
-        index = load_index_from_storage(storage_context)
+        engine = get_retrieval_engine(storage_dir, aws_region)
+        filters = _metadata_filters(species)
+        nodes = engine.retrieve(query, _fetch_k(similarity_top_k, adaptive), filters=filters, **search_options)
+        if not nodes and filters:
+            nodes = engine.retrieve(query, _fetch_k(similarity_top_k, adaptive), **search_options)
+        nodes = _adaptive_select(engine, query, nodes, similarity_top_k, adaptive)
 
-        # Use retriever directly to avoid LLM requirement
-        retriever = index.as_retriever(similarity_top_k=similarity_top_k)
-        nodes = retriever.retrieve(query)
-
-        # Combine the text from retrieved nodes
-        if nodes:
-            content = "\n".join([node.text for node in nodes])
-        else:
-            content = "No relevant pet care information found"
-
-        result = {
-            "results": [
-                {
-                    "topic": "Pet Care Advice",
-                    "content": content,
-                    "relevance_score": nodes[0].score if nodes and hasattr(nodes[0], "score") else 0.9,
-                    "source": source
-                }
-            ]
-        }
+        records, _ = build_payload(nodes, source, **context_options)
+        result: Dict[str, Any] = {"results": records}
+        if not records:
+            result["message"] = "No relevant pet care information found"
 
         return json.dumps(result)
 
     return retrieve_pet_care
 
 
+def _lambda_cache_options(custom: Dict[str, Any], ttl_key: str, default_ttl: float) -> Dict[str, float]:
+    """Per-tool Lambda result lifetimes (seconds) from LaunchDarkly custom config; ttl 0 disables caching"""
+    return {
+        "ttl": float(custom.get(ttl_key, default_ttl)),
+        "stale_ttl": float(custom.get("lambda_cache_stale_ttl", 120)),
+        "negative_ttl": float(custom.get("lambda_cache_negative_ttl", 30)),
+    }
+
+
+def _invoke_lambda(aws_region: str, function_name: str, function: str, parameters: Dict[str, str]) -> Any:
+    """Synchronous action-group style Lambda call; returns the decoded response payload.
+
+    Raises LambdaErrorResponse for statusCode >= 400 replies so they are never cached.
+    """
+    payload = {
+        "function": function,
+        "parameters": [{"name": name, "value": value} for name, value in parameters.items()]
+    }
+    response = get_client('lambda', aws_region).invoke(
+        FunctionName=function_name,
+        InvocationType='RequestResponse',
+        Payload=json.dumps(payload)
+    )
+    result = json.loads(response['Payload'].read())
+    if is_error_response(result):
+        raise LambdaErrorResponse(result)
+    return result
+
+
+def _inventory_items(result: Any) -> List[Dict[str, Any]]:
+    """Per-product records in a full inventory listing (empty if the shape is not recognised)"""
+    result = response_body(result)
+    if isinstance(result, dict):
+        result = result.get("products") or result.get("items") or result.get("inventory")
+    if not isinstance(result, list):
+        return []
+    return [item for item in result if isinstance(item, dict) and item.get("product_code")]
+
+
 def build_get_inventory_tool(custom: Dict[str, Any], aws_region: str):
     """Build get_inventory tool - calls real Lambda or uses mock for local testing"""
 
@@ -186,6 +368,24 @@ def build_get_inventory_tool(custom: Dict[str, Any], aws_region: str):
                            custom.get("lambda_arn") or \
                            os.environ.get("INVENTORY_LAMBDA", "team-PetStoreInventoryManagementFunction")
 
+    cache_options = _lambda_cache_options(custom, "lambda_inventory_cache_ttl", 60)
+    warmup = custom.get("lambda_inventory_warmup", False)
+    if isinstance(warmup, str):
+        warmup = warmup.lower() == "true"
+
+    if use_real_lambda and warmup:
+        def load_inventory():
+            # One full listing fills the "all products" entry and one entry per product code,
+            # each wrapped the way a getInventory(product_code) reply is
+            result = _invoke_lambda(aws_region, lambda_function_name, "getInventory", {})
+            entries = [(("get_inventory", lambda_function_name, "*"), result)]
+            entries.extend((("get_inventory", lambda_function_name, item["product_code"]), wrap_body(item))
+                           for item in _inventory_items(result))
+            return entries
+
+        get_lambda_cache().warm(f"inventory:{lambda_function_name}", load_inventory,
+                                cache_options["ttl"], cache_options["stale_ttl"])
+
     @tool
     def get_inventory(product_code: Optional[str] = None) -> str:
         """Get inventory information for products.
@@ -198,28 +398,17 @@ def build_get_inventory_tool(custom: Dict[str, Any], aws_region: str):
         """
         if use_real_lambda:
             try:
-                lambda_client = boto3.client('lambda', region_name=aws_region)
-
-                payload = {
-                    "function": "getInventory",
-                    "parameters": []
-                }
-
-                if product_code:
-                    payload["parameters"].append({
-                        "name": "product_code",
-                        "value": product_code
-                    })
-
-                response = lambda_client.invoke(
-                    FunctionName=lambda_function_name,
-                    InvocationType='RequestResponse',
-                    Payload=json.dumps(payload)
+                parameters = {"product_code": product_code} if product_code else {}
+                result = get_lambda_cache().get_or_load(
+                    ("get_inventory", lambda_function_name, product_code or "*"),
+                    lambda: _invoke_lambda(aws_region, lambda_function_name, "getInventory", parameters),
+                    **cache_options
                 )
-
-                result = json.loads(response['Payload'].read())
                 return json.dumps(result)
 
+            except LambdaErrorResponse as e:
+                logger.error(f"Lambda error response: {e}")
+                return json.dumps(e.payload)
             except Exception as e:
                 logger.error(f"Error calling Lambda: {e}")
                 # Fall through to mock data
@@ -325,6 +514,8 @@ def build_get_user_by_email_tool(custom: Dict[str, Any], aws_region: str):
                            custom.get("lambda_arn") or \
                            os.environ.get("USER_LAMBDA", "team-PetStoreUserManagementFunction")
 
+    cache_options = _lambda_cache_options(custom, "lambda_user_cache_ttl", 300)
+
     @tool
     def get_user_by_email(email: str) -> str:
         """Get user information by email address.
@@ -337,27 +528,20 @@ def build_get_user_by_email_tool(custom: Dict[str, Any], aws_region: str):
         """
         if use_real_lambda:
             try:
-                lambda_client = boto3.client('lambda', region_name=aws_region)
-
-                payload = {
-                    "function": "getUserByEmail",
-                    "parameters": [
-                        {
-                            "name": "user_email",
-                            "value": email
-                        }
-                    ]
-                }
-
-                response = lambda_client.invoke(
-                    FunctionName=lambda_function_name,
-                    InvocationType='RequestResponse',
-                    Payload=json.dumps(payload)
+                # Keyed by a hash and stored with the address replaced by a placeholder, so the cache
+                # never holds the email itself; the caller's address is put back on the way out
+                user_email = email.strip().lower()
+                result = get_lambda_cache().get_or_load(
+                    ("get_user_by_email", lambda_function_name, hash_key(user_email)),
+                    lambda: redact(_invoke_lambda(aws_region, lambda_function_name, "getUserByEmail",
+                                                  {"user_email": user_email}), user_email),
+                    **cache_options
                 )
+                return json.dumps(unredact(result, user_email))
 
-                result = json.loads(response['Payload'].read())
-                return json.dumps(result)
-
+            except LambdaErrorResponse as e:
+                logger.error(f"Lambda error response: {e}")
+                return json.dumps(e.payload)
             except Exception as e:
                 logger.error(f"Error calling Lambda: {e}")
                 # Fall through to mock data
@@ -409,6 +593,8 @@ def build_get_user_by_id_tool(custom: Dict[str, Any], aws_region: str):
                            custom.get("lambda_arn") or \
                            os.environ.get("USER_LAMBDA", "team-PetStoreUserManagementFunction")
 
+    cache_options = _lambda_cache_options(custom, "lambda_user_cache_ttl", 300)
+
     @tool
     def get_user_by_id(user_id: str) -> str:
         """Get user information by user ID.
@@ -421,27 +607,18 @@ def build_get_user_by_id_tool(custom: Dict[str, Any], aws_region: str):
         """
         if use_real_lambda:
             try:
-                lambda_client = boto3.client('lambda', region_name=aws_region)
-
-                payload = {
-                    "function": "getUserById",
-                    "parameters": [
-                        {
-                            "name": "user_id",
-                            "value": user_id
-                        }
-                    ]
-                }
-
-                response = lambda_client.invoke(
-                    FunctionName=lambda_function_name,
-                    InvocationType='RequestResponse',
-                    Payload=json.dumps(payload)
+                normalized_id = user_id.strip()
+                result = get_lambda_cache().get_or_load(
+                    ("get_user_by_id", lambda_function_name, normalized_id),
+                    lambda: _invoke_lambda(aws_region, lambda_function_name, "getUserById",
+                                           {"user_id": normalized_id}),
+                    **cache_options
                 )
-
-                result = json.loads(response['Payload'].read())
                 return json.dumps(result)
 
+            except LambdaErrorResponse as e:
+                logger.error(f"Lambda error response: {e}")
+                return json.dumps(e.payload)
             except Exception as e:
                 logger.error(f"Error calling Lambda: {e}")
                 # Fall through to mock data
@@ -496,10 +673,33 @@ def build_get_user_by_id_tool(custom: Dict[str, Any], aws_region: str):
 
 
 # Registry mapping tool names to their builder functions
+def _registry_tool(builder):
+    """Wrap a builder so the tool it builds reuses executions and can be awaited.
+
+    Calls repeated within one agent invocation are answered from the
+    invocation memo; concurrent identical calls across invocations share one
+    in-flight execution. The async version runs the same function on the
+    bounded tool executor, so several tool calls from one AI message overlap.
+    """
+
+    @functools.wraps(builder)
+    def build(custom: Dict[str, Any], aws_region: str):
+        tool_obj = builder(custom, aws_region)
+        coalescing = custom.get("tool_coalescing", True)
+        if isinstance(coalescing, str):
+            coalescing = coalescing.lower() == "true"
+        if coalescing:
+            coalesce_tool(tool_obj, call_key(aws_region, custom))
+        return add_async(memoize_tool(tool_obj))
+
+    return build
+
+
 TOOL_BUILDERS = {
-    "retrieve_product_info": build_retrieve_product_info_tool,
-    "retrieve_pet_care": build_retrieve_pet_care_tool,
-    "get_inventory": build_get_inventory_tool,
-    "get_user_by_email": build_get_user_by_email_tool,
-    "get_user_by_id": build_get_user_by_id_tool,
-}
\ No newline at end of file
+    "retrieve_product_info": _registry_tool(build_retrieve_product_info_tool),
+    "retrieve_product_info_batch": _registry_tool(build_retrieve_product_info_batch_tool),
+    "retrieve_pet_care": _registry_tool(build_retrieve_pet_care_tool),
+    "get_inventory": _registry_tool(build_get_inventory_tool),
+    "get_user_by_email": _registry_tool(build_get_user_by_email_tool),
+    "get_user_by_id": _registry_tool(build_get_user_by_id_tool),
+}
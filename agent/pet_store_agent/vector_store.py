@@ -0,0 +1,509 @@
+"""
+NumPy Vector Store for Pet Store Agent
+Keeps every embedding in one contiguous float32 matrix instead of a dict of Python float lists
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from pathlib import Path
+import json
+import logging
+import threading
+import numpy as np
+
+from ann_index import IVFFlatIndex
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Rows scored per block when upcasting quantized vectors, bounding scratch memory per query
+SCORE_BLOCK_ROWS = 1024
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so cosine similarity becomes a plain dot product"""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row indices of the k highest scores, best first"""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class QuantizedMatrix:
+    """Lower-precision copy of a normalized matrix: float16, or int8 with one scale per row"""
+
+    def __init__(self, matrix: np.ndarray, precision: str):
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unsupported vector precision: {precision}")
+        self.precision = precision
+        self.scales: Optional[np.ndarray] = None
+        if precision == "float16":
+            self.data = np.ascontiguousarray(matrix, dtype=np.float16)
+        else:
+            scales = np.abs(matrix).max(axis=1) / 127.0 if matrix.size else np.zeros(0, np.float32)
+            scales[scales == 0] = 1.0
+            self.data = np.ascontiguousarray(np.round(matrix / scales[:, None]), dtype=np.int8)
+            self.scales = scales.astype(np.float32)
+
+    @classmethod
+    def from_arrays(cls, precision: str, data: np.ndarray, scales: Optional[np.ndarray] = None) -> "QuantizedMatrix":
+        """Wrap already-quantized (e.g. memory-mapped) arrays without copying them"""
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"Unsupported vector precision: {precision}")
+        if (precision == "int8") != (scales is not None):
+            raise ValueError("int8 vectors need one scale per row; float16 vectors take none")
+        quantized = cls.__new__(cls)
+        quantized.precision = precision
+        quantized.data = data
+        quantized.scales = scales
+        return quantized
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, q: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate dot products with a normalized float32 query"""
+        data = self.data if rows is None else self.data[rows]
+        out = np.empty(data.shape[0], dtype=np.float32)
+        # Upcast block by block so BLAS does the math without a full float32 copy
+        for start in range(0, data.shape[0], SCORE_BLOCK_ROWS):
+            end = start + SCORE_BLOCK_ROWS
+            out[start:end] = data[start:end].astype(np.float32) @ q
+        if self.scales is not None:
+            out *= self.scales if rows is None else self.scales[rows]
+        return out
+
+
+def _posting_values(value: Any) -> List[Any]:
+    """Index keys for a metadata value: strings match case-insensitively, lists index every element"""
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return [v.casefold() if isinstance(v, str) else v for v in values if v is not None]
+
+
+class PostingIndex:
+    """Sorted row numbers per metadata value, built one key at a time on first use.
+
+    Filters become set operations on small integer arrays, so a filtered
+    query only scores the rows of its partition instead of checking every
+    row's metadata.
+    """
+
+    def __init__(self, ids: Sequence[str], ref_doc_ids: Sequence[Optional[str]],
+                 metadata: Sequence[Dict[str, Any]]):
+        self._ids = ids
+        self._ref_doc_ids = ref_doc_ids
+        self._metadata = metadata
+        self._keys: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._row_of: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+        self.count = len(ids)
+
+    def _postings(self, key: str) -> Dict[Any, np.ndarray]:
+        postings = self._keys.get(key)
+        if postings is None:
+            with self._lock:
+                postings = self._keys.get(key)
+                if postings is None:
+                    lists: Dict[Any, List[int]] = {}
+                    if key == "ref_doc_id":
+                        for row, ref in enumerate(self._ref_doc_ids):
+                            lists.setdefault(ref, []).append(row)
+                    else:
+                        for row, meta in enumerate(self._metadata):
+                            # Once per distinct value, so every posting list stays duplicate-free
+                            for value in dict.fromkeys(_posting_values(meta.get(key))):
+                                lists.setdefault(value, []).append(row)
+                    postings = {value: np.asarray(rows, dtype=np.int64) for value, rows in lists.items()}
+                    self._keys[key] = postings
+        return postings
+
+    def rows(self, key: str, values: Sequence[Any]) -> np.ndarray:
+        """Rows whose `key` equals any of `values`"""
+        postings = self._postings(key)
+        lists = [postings[v] for value in values for v in _posting_values(value) if v in postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        return lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+
+    def node_rows(self, node_ids: Sequence[str]) -> np.ndarray:
+        if self._row_of is None:
+            self._row_of = {node_id: row for row, node_id in enumerate(self._ids)}
+        return np.unique(np.asarray([self._row_of[i] for i in node_ids if i in self._row_of], dtype=np.int64))
+
+
+def _filter_values(f: Any) -> List[Any]:
+    """Values a filter matches; IN/NIN accept a single value as well as a list"""
+    if f.operator in (FilterOperator.IN, FilterOperator.NIN) and isinstance(f.value, (list, tuple, set)):
+        return list(f.value)
+    return [f.value]
+
+
+def _combine(row_sets: List[np.ndarray], condition: Any) -> np.ndarray:
+    result = row_sets[0]
+    for rows in row_sets[1:]:
+        if condition == FilterCondition.OR:
+            result = np.union1d(result, rows)
+        else:
+            result = np.intersect1d(result, rows, assume_unique=True)
+    return result
+
+
+@dataclass(frozen=True)
+class MatrixState:
+    """Embedding matrix plus node ids and metadata in parallel arrays (row i <-> ids[i])"""
+    ids: Tuple[str, ...]
+    ref_doc_ids: Tuple[Optional[str], ...]
+    metadata: Tuple[Dict[str, Any], ...]
+    matrix: np.ndarray
+    quantized: Dict[str, QuantizedMatrix] = field(default_factory=dict, compare=False, repr=False)
+    ann: Dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+    ann_lock: Any = field(default_factory=threading.Lock, compare=False, repr=False)
+    postings: Dict[str, PostingIndex] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def empty(cls, dim: int = 0) -> "MatrixState":
+        return cls((), (), (), np.zeros((0, dim), dtype=np.float32))
+
+    def ivf_index(self) -> Optional[IVFFlatIndex]:
+        """IVF index attached by the loader (persisted or built at load time), or None"""
+        return self.ann.get("ivf")
+
+    def build_ivf_index(self) -> IVFFlatIndex:
+        """Build and attach the IVF index if there is none; for loaders and CLIs, never the query path"""
+        with self.ann_lock:
+            index = self.ann.get("ivf")
+            if index is None:
+                index = IVFFlatIndex.build(self.matrix)
+                self.ann["ivf"] = index
+        return index
+
+    def posting_index(self) -> PostingIndex:
+        """Metadata filter index for this state (its key lists are built lazily)"""
+        index = self.postings.get("metadata")
+        if index is None:
+            with self.ann_lock:
+                index = self.postings.get("metadata")
+                if index is None:
+                    index = PostingIndex(self.ids, self.ref_doc_ids, self.metadata)
+                    self.postings["metadata"] = index
+        return index
+
+    def quantized_matrix(self, precision: str) -> QuantizedMatrix:
+        """Quantized form of this state's matrix.
+
+        The binary index loader attaches the memory-mapped copy persisted by
+        ``binary_index.py``; otherwise (a store parsed from JSON, or one just
+        written to) a private copy is built on first use.
+        """
+        quantized = self.quantized.get(precision)
+        if quantized is None:
+            with self.ann_lock:
+                quantized = self.quantized.get(precision)
+                if quantized is None:
+                    quantized = QuantizedMatrix(np.asarray(self.matrix), precision)
+                    self.quantized[precision] = quantized
+        return quantized
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """Drop-in replacement for SimpleVectorStore backed by a normalized float32 matrix.
+
+    Reads and writes the same ``default__vector_store.json`` layout, so a storage
+    directory stays loadable by stock LlamaIndex. Top-k is one matrix-vector
+    product plus ``argpartition``. Writers build a new ``MatrixState`` and swap it
+    in, so queries running concurrently always see a consistent snapshot.
+    """
+
+    stores_text: bool = False
+    is_embedding_query: bool = True
+
+    _state: MatrixState = PrivateAttr()
+    _write_lock: Any = PrivateAttr()
+
+    def __init__(self, state: Optional[MatrixState] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._state = state or MatrixState.empty()
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def state(self) -> MatrixState:
+        return self._state
+
+    def __len__(self) -> int:
+        return len(self._state.ids)
+
+    def __bool__(self) -> bool:
+        # StorageContext.from_defaults tests `if vector_store:`; an empty store must not be swapped out
+        return True
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NumpyVectorStore":
+        """Build from the SimpleVectorStore JSON layout"""
+        embedding_dict = data.get("embedding_dict", {})
+        text_id_to_ref_doc_id = data.get("text_id_to_ref_doc_id", {})
+        metadata_dict = data.get("metadata_dict", {}) or {}
+
+        ids = tuple(embedding_dict.keys())
+        if ids:
+            matrix = normalize_rows(np.asarray([embedding_dict[i] for i in ids], dtype=np.float32))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+
+        state = MatrixState(
+            ids=ids,
+            ref_doc_ids=tuple(text_id_to_ref_doc_id.get(i) for i in ids),
+            metadata=tuple(metadata_dict.get(i) or {} for i in ids),
+            matrix=matrix,
+        )
+        return cls(state=state)
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, fs: Any = None) -> "NumpyVectorStore":
+        if fs is not None:
+            with fs.open(persist_path, "rb") as f:
+                data = json.load(f)
+        else:
+            with open(persist_path, "r") as f:
+                data = json.load(f)
+        store = cls.from_dict(data)
+        logger.debug(f"Loaded {len(store)} embeddings from {persist_path}")
+        return store
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, namespace: str = "default", fs: Any = None) -> "NumpyVectorStore":
+        persist_path = Path(persist_dir) / f"{namespace}__vector_store.json"
+        return cls.from_persist_path(str(persist_path), fs=fs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "embedding_dict": {i: row.tolist() for i, row in zip(state.ids, state.matrix)},
+            "text_id_to_ref_doc_id": {i: r for i, r in zip(state.ids, state.ref_doc_ids) if r is not None},
+            "metadata_dict": {i: m for i, m in zip(state.ids, state.metadata) if m},
+        }
+
+    def persist(self, persist_path: str = None, fs: Any = None) -> None:
+        """Write the SimpleVectorStore-compatible JSON layout (vectors are stored normalized)"""
+        if persist_path is None:
+            return
+        data = self.to_dict()
+        if fs is not None:
+            with fs.open(persist_path, "w") as f:
+                json.dump(data, f)
+        else:
+            Path(persist_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(persist_path, "w") as f:
+                json.dump(data, f)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+        new_ids = [node.node_id for node in nodes]
+        new_rows = normalize_rows(np.asarray([node.get_embedding() for node in nodes], dtype=np.float32))
+        new_refs = [node.ref_doc_id for node in nodes]
+        new_meta = [
+            node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+            for node in nodes
+        ]
+
+        with self._write_lock:
+            state = self._state
+            replaced = set(new_ids)
+            keep = [row for row, node_id in enumerate(state.ids) if node_id not in replaced]
+            matrix = state.matrix[keep] if state.matrix.shape[0] else state.matrix.reshape(0, new_rows.shape[1])
+            new_state = MatrixState(
+                ids=tuple(state.ids[r] for r in keep) + tuple(new_ids),
+                ref_doc_ids=tuple(state.ref_doc_ids[r] for r in keep) + tuple(new_refs),
+                metadata=tuple(state.metadata[r] for r in keep) + tuple(new_meta),
+                matrix=np.ascontiguousarray(np.vstack([matrix, new_rows])),
+            )
+            ivf = state.ann.get("ivf")
+            if ivf is not None:
+                # Incremental insertion: keep the centroids, file new rows into their nearest lists
+                new_positions = np.arange(len(keep), len(new_state.ids))
+                new_state.ann["ivf"] = ivf.remap(self._row_mapping(state, keep)).add(new_positions, new_rows)
+            self._state = new_state
+        return new_ids
+
+    @staticmethod
+    def _row_mapping(state: MatrixState, keep: List[int]) -> np.ndarray:
+        old_to_new = np.full(len(state.ids), -1, dtype=np.int64)
+        old_to_new[keep] = np.arange(len(keep))
+        return old_to_new
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._write_lock:
+            state = self._state
+            keep = [row for row, ref in enumerate(state.ref_doc_ids) if ref != ref_doc_id]
+            new_state = MatrixState(
+                ids=tuple(state.ids[r] for r in keep),
+                ref_doc_ids=tuple(state.ref_doc_ids[r] for r in keep),
+                metadata=tuple(state.metadata[r] for r in keep),
+                matrix=np.ascontiguousarray(state.matrix[keep]),
+            )
+            ivf = state.ann.get("ivf")
+            if ivf is not None:
+                new_state.ann["ivf"] = ivf.remap(self._row_mapping(state, keep))
+            self._state = new_state
+
+    def _filter_rows(self, postings: PostingIndex, filters: MetadataFilters) -> np.ndarray:
+        row_sets = []
+        for f in filters.filters:
+            if isinstance(f, MetadataFilters):
+                row_sets.append(self._filter_rows(postings, f))
+            elif f.operator in (FilterOperator.EQ, FilterOperator.IN):
+                row_sets.append(postings.rows(f.key, _filter_values(f)))
+            elif f.operator in (FilterOperator.NE, FilterOperator.NIN):
+                values = _filter_values(f)
+                row_sets.append(np.setdiff1d(np.arange(postings.count), postings.rows(f.key, values),
+                                             assume_unique=True))
+            else:
+                raise ValueError(f"NumpyVectorStore does not support filter operator {f.operator}")
+        if not row_sets:
+            return np.arange(postings.count)
+        return _combine(row_sets, filters.condition)
+
+    def _candidate_rows(self, state: MatrixState, query: VectorStoreQuery) -> Optional[np.ndarray]:
+        """Rows allowed by node_ids/doc_ids/filters, or None when the whole matrix is searched"""
+        if not (query.node_ids or query.doc_ids or query.filters):
+            return None
+        postings = state.posting_index()
+        row_sets = []
+        if query.node_ids:
+            row_sets.append(postings.node_rows(query.node_ids))
+        if query.doc_ids:
+            row_sets.append(postings.rows("ref_doc_id", query.doc_ids))
+        if query.filters:
+            row_sets.append(self._filter_rows(postings, query.filters))
+        return _combine(row_sets, FilterCondition.AND)
+
+    def rows_matching(self, filters: Dict[str, Any], state: Optional[MatrixState] = None) -> Optional[np.ndarray]:
+        """Rows whose metadata equals every key/value in `filters` (None = no restriction)"""
+        if not filters:
+            return None
+        postings = (state or self._state).posting_index()
+        return _combine([postings.rows(key, [value]) for key, value in filters.items()], FilterCondition.AND)
+
+    def search(self, query_embedding: Sequence[float], similarity_top_k: int,
+               rows: Optional[np.ndarray] = None,
+               state: Optional[MatrixState] = None,
+               precision: str = "float32",
+               rescore_candidates: int = 0,
+               index_type: str = "flat",
+               nprobe: int = 8) -> Tuple[List[str], List[float]]:
+        """Cosine top-k over the matrix, optionally restricted to a subset of rows.
+
+        With ``precision`` float16/int8 the candidates are scored against a
+        quantized copy; ``rescore_candidates`` > 0 re-ranks that many of the
+        best approximate hits with exact float32 scores. ``index_type="ivf"``
+        only scores the rows in the ``nprobe`` inverted lists nearest the query.
+        """
+        state = state or self._state
+        if not state.ids:
+            return [], []
+        q = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+
+        if index_type == "ivf":
+            ivf = state.ivf_index()
+            if ivf is None:
+                # k-means is too slow to run under a request; exact search is always correct
+                logger.warning("No IVF index attached to this vector store; using flat search")
+            else:
+                probed = ivf.probe(q, nprobe)
+                rows = probed if rows is None else np.intersect1d(rows, probed, assume_unique=True)
+
+        if precision == "float32":
+            matrix = state.matrix if rows is None else state.matrix[rows]
+            scores = matrix @ q
+            best = top_k_rows(scores, similarity_top_k)
+        else:
+            scores = state.quantized_matrix(precision).scores(q, rows)
+            best = top_k_rows(scores, max(similarity_top_k, rescore_candidates))
+            if rescore_candidates > 0:
+                # Exact float32 scores for the shortlist; sorted rows keep mmap reads sequential
+                best = best[np.argsort(best if rows is None else rows[best])]
+                scores[best] = np.asarray(state.matrix[best if rows is None else rows[best]] @ q)
+            best = best[np.argsort(-scores[best], kind="stable")][:similarity_top_k]
+
+        best_rows = best if rows is None else rows[best]
+        return [state.ids[r] for r in best_rows], scores[best].tolist()
+
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], similarity_top_k: int,
+                     filters: Optional[Dict[str, Any]] = None,
+                     **search_options: Any) -> List[Tuple[List[str], List[float]]]:
+        """Top-k for several queries against one snapshot.
+
+        Exact float32 flat search scores the whole batch with a single
+        matrix-matrix product; other index types fall back to per-query search.
+        ``filters`` restricts every query to the rows with matching metadata.
+        """
+        state = self._state
+        if not state.ids or not len(query_embeddings):
+            return [([], []) for _ in query_embeddings]
+        rows = self.rows_matching(filters, state)
+        precision = search_options.get("precision", "float32")
+        index_type = search_options.get("index_type", "flat")
+        if precision != "float32" or index_type != "flat":
+            return [self.search(q, similarity_top_k, rows=rows, state=state, **search_options)
+                    for q in query_embeddings]
+
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        matrix = state.matrix if rows is None else state.matrix[rows]
+        scores = np.asarray(queries @ matrix.T)
+        results = []
+        for row_scores in scores:
+            best = top_k_rows(row_scores, similarity_top_k)
+            best_rows = best if rows is None else rows[best]
+            results.append(([state.ids[r] for r in best_rows], row_scores[best].tolist()))
+        return results
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Top-k query; search options (precision, index_type, ...) arrive via retriever vector_store_kwargs"""
+        if query.query_embedding is None:
+            raise ValueError("NumpyVectorStore requires a query embedding")
+        state = self._state
+        rows = self._candidate_rows(state, query)
+        ids, scores = self.search(
+            query.query_embedding,
+            query.similarity_top_k,
+            rows=rows,
+            state=state,
+            precision=kwargs.get("precision", "float32"),
+            rescore_candidates=int(kwargs.get("rescore_candidates", 0)),
+            index_type=kwargs.get("index_type", "flat"),
+            nprobe=int(kwargs.get("nprobe", 8)),
+        )
+        return VectorStoreQueryResult(similarities=scores, ids=ids)